@@ -1,7 +1,7 @@
 # app.py — DragTranscribe GUI with multi-file D&D queue, streaming logs, and Cmd+Q quit
 import os, sys, unicodedata, subprocess, threading, queue, objc
 from AppKit import (
-    NSApplication, NSApp, NSWindow, NSView, NSButton, NSTextField, NSTextView,
+    NSApplication, NSApp, NSWindow, NSView, NSButton, NSTextField, NSTextView, NSPopUpButton,
     NSScrollView, NSFont, NSAlert,
     NSMakeRect, NSBackingStoreBuffered,
     NSWindowStyleMaskTitled, NSWindowStyleMaskClosable, NSWindowStyleMaskResizable,
@@ -18,13 +18,25 @@ def _normalize(p: str) -> str:
     return unicodedata.normalize("NFC", p)
 
 
-def _run_transcribe_stream(cmd_argv, on_line, on_done):
-    """Run a subprocess and stream combined stdout/stderr line by line."""
+def _run_transcribe_stream(cmd_argv, on_line, on_done, on_event=None, env_extra=None, on_start=None):
+    """Run a subprocess and stream combined stdout/stderr line by line.
+    With on_event, the script's JSONL event stream (dragtranscribe.events) is delivered too.
+    env_extra is merged into the environment; on_start(proc) runs once the process exists.
+    """
+    pipe = None
+    started = False
     try:
         env = os.environ.copy()
         env.setdefault("LC_ALL", "en_US.UTF-8")
         env.setdefault("LANG", "en_US.UTF-8")
         env.setdefault("PYTHONIOENCODING", "utf-8")
+        env.update(env_extra or {})
+
+        pass_fds = ()
+        if on_event is not None and dt_events is not None:
+            pipe = dt_events.EventPipe()
+            env.update(pipe.env())
+            pass_fds = pipe.pass_fds
 
         p = subprocess.Popen(
             cmd_argv,
@@ -35,12 +47,22 @@ def _run_transcribe_stream(cmd_argv, on_line, on_done):
             errors="replace",
             bufsize=1,
             env=env,
+            pass_fds=pass_fds,
         )
+        if pipe is not None:
+            pipe.start(on_event)
+            started = True
+        if on_start is not None:
+            on_start(p)
         assert p.stdout is not None
         for line in p.stdout:
             on_line(line.rstrip("\n"))
         rc = p.wait()
+        if pipe is not None:
+            pipe.join()
     except Exception as e:
+        if pipe is not None and not started:
+            pipe.close()
         on_line(f"[exception] {e!r}")
         rc = 1
     finally:
@@ -69,9 +91,39 @@ def _detect_install_dir() -> str | None:
     return None
 
 
+# Shared helpers live in <install>/lib/dragtranscribe (also used by bin/transcribe.sh).
+_INSTALL_DIR = _detect_install_dir()
+if _INSTALL_DIR and os.path.join(_INSTALL_DIR, "lib") not in sys.path:
+    sys.path.insert(0, os.path.join(_INSTALL_DIR, "lib"))
+    # The helpers run the bundle's ffmpeg/ffprobe, as transcribe.sh does
+    os.environ["PATH"] = os.path.join(_INSTALL_DIR, "bin") + os.pathsep + os.environ.get("PATH", "")
+try:
+    from dragtranscribe import events as dt_events
+    from dragtranscribe import media as dt_media
+    from dragtranscribe import warmup as dt_warmup
+    from dragtranscribe import digest as dt_digest
+    from dragtranscribe import models as dt_models
+    from dragtranscribe import scheduler as dt_scheduler
+    from dragtranscribe import probe as dt_probe
+except ImportError:  # incomplete install; the worker reports it when a job runs
+    dt_events = dt_media = dt_warmup = dt_digest = dt_models = dt_scheduler = dt_probe = None
+
+STAGE_LABELS = {
+    "extract": "Extracting audio",
+    "detect": "Detecting language",
+    "transcribe": "Transcribing",
+    "mux": "Embedding subtitles",
+    "burnin": "Burning in subtitles",
+}
+
+
 class AppState:
+    MODEL_URL = "https://huggingface.co/ggerganov/whisper.cpp/resolve/main/ggml-large-v2.bin"
+
     def __init__(self):
         self.install_dir = _detect_install_dir()
+        self.warmup = None  # optional dragtranscribe.warmup.WarmupService
+        self.profile = None  # registry profile for jobs started from now on (None = default model)
 
     def transcribe_cmd(self):
         if not self.install_dir:
@@ -81,14 +133,181 @@ class AppState:
     def model_dir(self):
         return os.path.join(self.install_dir, "models") if self.install_dir else None
 
+    def model_name(self) -> str:
+        """Registry name of the model the selected profile runs (what download_model.sh takes)."""
+        if dt_models is None:
+            return "large-v2"
+        return dt_models.spec_for_profile(self.profile or dt_models.DEFAULT_MODEL).name
+
+    def model_url(self) -> str:
+        return dt_models.REGISTRY[self.model_name()].url if dt_models is not None else self.MODEL_URL
+
+    def model_size_gb(self) -> float:
+        return dt_models.REGISTRY[self.model_name()].size_mb / 1000 if dt_models is not None else 3.0
+
     def model_file(self):
         d = self.model_dir()
-        return os.path.join(d, "ggml-large-v2.bin") if d else None
+        return os.path.join(d, f"ggml-{self.model_name()}.bin") if d else None
+
+    def model_ready(self) -> bool:
+        """Hot-path check: model present and unchanged since it was verified (O(1) stat +
+        digest sidecar; see dragtranscribe.digest). Truncated or replaced files fail it.
+        """
+        model = self.model_file()
+        if not (model and os.path.isfile(model)):
+            return False
+        return dt_digest is None or dt_digest.check(model)
 
     def download_script(self):
         return os.path.join(self.install_dir, "bin", "download_model.sh") if self.install_dir else None
 
 
+def _fmt_gb(n) -> str:
+    return f"{(n or 0) / 1e9:.2f} GB"
+
+
+class ModelPreparer:
+    """App-level background task that makes the Whisper model available.
+
+    Started at launch (and again by a drop if it was canceled or failed). The queue worker
+    waits on it with live progress, so jobs dropped during the first-run download start
+    the moment the model is verified.
+    """
+
+    ACTIVE = ("verifying", "asking", "downloading")
+
+    def __init__(self, state, log, confirm):
+        self.state = state
+        self.log = log              # log(line) — append to the output view
+        self.confirm = confirm      # confirm() -> bool — OK-to-download alert on the main thread
+        self.cond = threading.Condition()
+        self.status = "idle"        # idle | verifying | asking | downloading | ready | failed | canceled
+        self.progress: dict = {}
+        self.model = None           # the model file the status refers to (follows the profile)
+        self.model_name = None
+        self.model_url = None
+
+    def model_present(self) -> bool:
+        return bool(self.model and os.path.isfile(self.model))
+
+    def _verify_existing(self) -> bool:
+        """Full verification for a model without a valid digest sidecar (legacy download,
+        or the file changed). Runs once; afterwards AppState.model_ready() is O(1).
+        """
+        model = self.model
+        if dt_digest is None:
+            return True
+        self.log("🔎 Verifying Whisper model (one-time check)…")
+        expected_sha = expected_size = None
+        if dt_digest.load(model) is None:
+            try:
+                from dragtranscribe import download as dt_download
+                info = dt_download.probe(self.model_url, timeout=10)
+                expected_sha, expected_size = info["sha256"], info["total"]
+            except Exception:
+                pass  # offline: record the current file as the baseline
+        try:
+            dt_digest.verify(model, expected_sha, expected_size)
+        except OSError as e:
+            # Unreadable is not corrupt: leave the file where it is
+            self.log(f"❌ Could not read the Whisper model: {e}")
+            return False
+        except dt_digest.VerificationError as e:
+            self.log(f"❌ Model failed verification ({e}); it will be downloaded again.")
+            # Delete it: a renamed copy would hold GBs forever and count against the store quota
+            for path in (model, dt_digest.sidecar_path(model)):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            return False
+        self.log("✅ Model verified.")
+        return True
+
+    def _set(self, status: str):
+        with self.cond:
+            self.status = status
+            self.cond.notify_all()
+
+    def start(self):
+        """Begin preparing in the background unless already running or done."""
+        with self.cond:
+            if self.status in self.ACTIVE:
+                return
+            if self.status == "ready" and self.model == self.state.model_file():
+                return
+            # A profile change can point at another model: prepare that one
+            self.model = self.state.model_file()
+            self.model_name = self.state.model_name()
+            self.model_url = self.state.model_url()
+            if self.state.model_ready():
+                self.status = "ready"
+                self.cond.notify_all()
+                return
+            self.status = "verifying" if self.model_present() else "asking"
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def wait(self, on_progress=None) -> bool:
+        """Start if needed and block until the model is ready (True) or preparation ends (False)."""
+        self.start()
+        with self.cond:
+            while self.status in self.ACTIVE:
+                self.cond.wait(1.0)
+                if on_progress is not None and self.status == "downloading":
+                    on_progress(dict(self.progress))
+            return self.status == "ready"
+
+    def _run(self):
+        if self.status == "verifying":
+            if self._verify_existing():
+                self._set("ready")
+                return
+            self._set("asking")
+        if not self.confirm():
+            self.log("Download canceled.")
+            self._set("canceled")
+            return
+
+        dl = self.state.download_script()
+        if not (dl and os.path.isfile(dl) and os.access(dl, os.X_OK)):
+            self.log(f"Error: download script not found or not executable:\n{dl}")
+            self._set("failed")
+            return
+
+        size = dt_models.REGISTRY[self.model_name].size_mb / 1000 if dt_models is not None else 3.0
+        self.log(f"Starting Whisper model download ({self.model_name}, ~{size:.1f} GB) to:\n"
+                 f"{self.state.model_dir()}\n$ {dl} {self.model_name}\n")
+        self._set("downloading")
+
+        def on_event(ev):
+            if ev.get("event") in ("download_started", "download_progress"):
+                with self.cond:
+                    self.progress.update(ev)
+
+        def on_done(rc):
+            if rc == 0 and os.path.isfile(self.model) and (dt_digest is None or dt_digest.check(self.model)):
+                self.log("✅ Model download complete.")
+                self._set("ready")
+            else:
+                self.log(
+                    f"❌ Download failed (exit {rc}). "
+                    "Please try again later or run 2-Download-Model.command."
+                )
+                self._set("failed")
+
+        _run_transcribe_stream([dl, self.model_name], self.log, on_done, on_event)
+
+    @staticmethod
+    def describe(progress: dict) -> str:
+        total = progress.get("total") or 0
+        done = progress.get("downloaded") or 0
+        if not total:
+            return "Downloading Whisper model…"
+        pct = 100 * done / total
+        rate = (progress.get("rate_bps") or 0) / 1e6
+        return f"Downloading Whisper model: {pct:.0f}% — {_fmt_gb(done)} of {_fmt_gb(total)}, {rate:.1f} MB/s"
+
+
 class DropView(NSView):
     DROP_TYPES = ["public.file-url", "public.url", "NSFilenamesPboardType"]
 
@@ -103,6 +322,16 @@ class DropView(NSView):
         self.worker_thread = None
         self.worker_lock = threading.Lock()
         self.stop_flag = False
+        self.producers = 0       # background drop validators still feeding the queue
+        self.drag_cache = None   # (pasteboard changeCount, paths) for the current drag session
+        self.model_prep = ModelPreparer(state, self.append_output_async, self._confirm_download_on_main)
+        self.max_jobs = max(1, int(os.environ.get("DRAGTRANSCRIBE_MAX_JOBS", "1") or 1))
+        # More than one job at a time only with the scheduler, which admits a job when its
+        # estimated peak memory fits (lib/dragtranscribe/scheduler.py). One instance for the
+        # app: a worker loop started while the previous one still waits on its jobs must see them.
+        self.admission = None
+        if self.max_jobs > 1 and dt_scheduler is not None:
+            self.admission = dt_scheduler.Admission(self.max_jobs)
         self.registerForDraggedTypes_(self.DROP_TYPES)
         return self
 
@@ -117,6 +346,16 @@ class DropView(NSView):
     def append_output_async(self, s: str):
         self.performSelectorOnMainThread_withObject_waitUntilDone_("appendOutput:", s, False)
 
+    def setStatus_(self, s):
+        self.text_field.setStringValue_(s)
+
+    def set_status_async(self, s: str):
+        self.performSelectorOnMainThread_withObject_waitUntilDone_("setStatus:", s, False)
+
+    def profileChanged_(self, sender):
+        title = str(sender.titleOfSelectedItem())
+        self.state.profile = title if dt_models is not None and title in dt_models.PROFILES else None
+
     def clearOutput_(self, _):
         self.output_view.setString_("")
 
@@ -141,7 +380,8 @@ class DropView(NSView):
             alert.setMessageText_("Whisper model required")
             alert.setInformativeText_(
                 "The Whisper AI model is missing.\n\n"
-                "Click OK and DragTranscribe will download it now (about 3 GB) and then continue."
+                f"Click OK and DragTranscribe will download it now (about {self.state.model_size_gb():.1f} GB) "
+                "and then continue."
             )
             alert.addButtonWithTitle_("OK")      # 1000
             alert.addButtonWithTitle_("Cancel")  # 1001
@@ -155,17 +395,18 @@ class DropView(NSView):
         return result["ok"]
 
     # ---------- DnD plumbing ----------
-    def _all_dropped_paths(self, sender) -> list[str]:
-        """Return a list of file paths from the drop — handles legacy + per-item modern drops."""
+    def _pasteboard_paths(self, pboard) -> list[str]:
+        """Return the file paths on a drag pasteboard — handles legacy + per-item modern drops.
+        No filesystem access: this runs on the main thread while the cursor moves.
+        """
         paths: list[str] = []
-        pboard = sender.draggingPasteboard()
 
         # 1) Legacy (Finder multi-select)
         try:
             files = pboard.propertyListForType_("NSFilenamesPboardType")
             if files and isinstance(files, (list, tuple)):
                 for f in files:
-                    if isinstance(f, str) and os.path.isfile(f):
+                    if isinstance(f, str):
                         paths.append(_normalize(f))
         except Exception:
             pass
@@ -182,9 +423,7 @@ class DropView(NSView):
                     continue
                 try:
                     if bool(url.isFileURL()):
-                        p = str(url.path())
-                        if os.path.isfile(p):
-                            paths.append(_normalize(p))
+                        paths.append(_normalize(str(url.path())))
                 except Exception:
                     continue
         except Exception:
@@ -198,17 +437,34 @@ class DropView(NSView):
                 seen.add(p)
         return unique
 
+    def _drag_paths(self, sender) -> list[str]:
+        """Pasteboard paths for the current drag session, read once per session.
+        draggingUpdated_ fires continuously, so results are cached by the pasteboard's change count.
+        """
+        pboard = sender.draggingPasteboard()
+        key = pboard.changeCount()
+        cached = self.drag_cache
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        paths = self._pasteboard_paths(pboard)
+        self.drag_cache = (key, paths)
+        return paths
+
     def draggingEntered_(self, sender):
-        return NSDragOperationCopy if self._all_dropped_paths(sender) else 0
+        return NSDragOperationCopy if self._drag_paths(sender) else 0
 
     def draggingUpdated_(self, sender):
-        return NSDragOperationCopy if self._all_dropped_paths(sender) else 0
+        return NSDragOperationCopy if self._drag_paths(sender) else 0
+
+    def draggingExited_(self, sender):
+        self.drag_cache = None
 
     def prepareForDragOperation_(self, sender):
         return True
 
     def performDragOperation_(self, sender):
-        paths = self._all_dropped_paths(sender)
+        paths = self._drag_paths(sender)
+        self.drag_cache = None
         if not paths:
             self.append_output_async("Drop ignored (no usable files).")
             return False
@@ -224,16 +480,49 @@ class DropView(NSView):
 
     # ---------- Queue & worker ----------
     def enqueue_paths(self, paths: list[str]):
+        """Validate dropped paths on a background thread, queueing each usable file as it is
+        found so the worker can start before a large drop has been fully checked.
+        Folders are walked recursively with the same rules as transcribe.sh.
+        """
+        with self.worker_lock:
+            self.producers += 1
+        threading.Thread(target=self._validate_and_enqueue, args=(paths,), daemon=True).start()
+
+    def _validate_and_enqueue(self, paths: list[str]):
         added = 0
-        for p in paths:
-            if os.path.isfile(p):
-                self.q.put(p)
-                added += 1
+        skipped = 0
+
+        def put(p):
+            nonlocal added
+            self.q.put(p)
+            added += 1
+            if added == 1:
+                self._start_worker_if_needed()
+
+        def on_skip(_p, _reason):
+            nonlocal skipped
+            skipped += 1
+
+        try:
+            for p in paths:
+                if os.path.isdir(p):
+                    if dt_media is None:
+                        self.append_output_async(f"Folder drops need the full install; ignored: {p}")
+                        continue
+                    self.append_output_async(f"📁 Scanning folder: {p}")
+                    for f in dt_media.walk_media(p, on_skip):
+                        put(f)
+                elif os.path.isfile(p):
+                    put(p)
+        finally:
+            with self.worker_lock:
+                self.producers -= 1
+        note = f" (skipped {skipped} already subtitled)" if skipped else ""
         if added == 0:
-            self.append_output_async("No valid files to enqueue.")
+            self.append_output_async(f"No valid files to enqueue{note}.")
             return
-        self.append_output_async(f"🧺 Queued {added} file(s). They will be processed sequentially.")
-        self._start_worker_if_needed()
+        how = "sequentially" if self.max_jobs == 1 else f"up to {self.max_jobs} at a time, as memory allows"
+        self.append_output_async(f"🧺 Queued {added} file(s){note}. They will be processed {how}.")
 
     def _start_worker_if_needed(self):
         with self.worker_lock:
@@ -242,56 +531,54 @@ class DropView(NSView):
                 self.worker_thread = threading.Thread(target=self._worker_loop, daemon=True)
                 self.worker_thread.start()
 
+    def _next_job(self) -> str | None:
+        """Next queued path; waits while drops are still being validated. None when drained."""
+        while not self.stop_flag:
+            try:
+                return self.q.get(timeout=0.2)
+            except queue.Empty:
+                pass
+            with self.worker_lock:
+                # Decide under the lock so a producer's put + _start_worker_if_needed
+                # either lands in this loop or starts a fresh worker.
+                if self.producers == 0 and self.q.empty():
+                    self.worker_thread = None
+                    return None
+        return None
+
     def _worker_loop(self):
-        # Ensure model exists first
-        gate = threading.Event()
-        ok = {"ready": False}
+        # Wait (as long as it takes) for the model; jobs keep queueing meanwhile.
+        prep = self.model_prep
+        if not self.state.model_ready():
+            self.append_output_async("⏳ Waiting for the Whisper model; queued files start as soon as it is ready.")
 
-        def after_model(ready: bool):
-            ok["ready"] = ready
-            gate.set()
+        def on_progress(p):
+            self.set_status_async(ModelPreparer.describe(p))
 
-        self._ensure_model_then(after_model)
-        if not gate.wait(60):  # safety timeout
-            self.append_output_async("❌ Timed out preparing model; queue aborted.")
-            return
-        if not ok["ready"]:
+        if not prep.wait(on_progress):
             self.append_output_async("❌ Model was not prepared; queue aborted.")
             return
 
-        processed = 0
-        failed = 0
+        counts = {"processed": 0, "skipped": 0, "failed": 0}
+        admission = self.admission
+        running = []
         first = True
 
-        while not self.stop_flag:
-            try:
-                path = self.q.get(timeout=0.2)
-            except queue.Empty:
+        while True:
+            path = self._next_job()
+            if path is None:
                 break
 
             if first:
                 self.clear_output_async()
                 first = False
 
-            self.append_output_async("\n" + "=" * 72)
-            self.append_output_async(f"▶️  Starting: {os.path.basename(path)}")
-            self.append_output_async("=" * 72)
-
-            rc_ev = threading.Event()
-            rc_holder = {"rc": 1}
-
-            def on_line(line):
-                self.append_output_async(line)
-
-            def on_done(rc):
-                rc_holder["rc"] = rc
-                rc_ev.set()
-
             script = self.state.transcribe_cmd()
             if not script or not os.path.isfile(script):
                 self.append_output_async("Error: Install folder not found. Please reinstall DragTranscribe to /Applications.")
                 self._show_reinstall_alert()
-                failed += 1
+                with self.worker_lock:
+                    counts["failed"] += 1
                 self.q.task_done()
                 continue
             if not os.access(script, os.X_OK):
@@ -299,32 +586,117 @@ class DropView(NSView):
                     f"Error: script is not executable:\n{script}\n"
                     "Run 1-Allow-Run.command once, then try again."
                 )
-                failed += 1
+                with self.worker_lock:
+                    counts["failed"] += 1
                 self.q.task_done()
                 continue
 
-            argv = [script, path]
-            self.append_output_async(f"$ {' '.join(argv)}")
-
-            threading.Thread(
-                target=_run_transcribe_stream, args=(argv, on_line, on_done), daemon=True
-            ).start()
-
-            rc_ev.wait()
-            if rc_holder["rc"] == 0:
-                processed += 1
-                self.append_output_async(f"✅ Done: {os.path.basename(path)}  [exit 0]")
-            else:
-                failed += 1
-                self.append_output_async(f"❌ Failed: {os.path.basename(path)}  [exit {rc_holder['rc']}]")
-
-            self.q.task_done()
+            profile = self.state.profile
+            if not self.state.model_ready():
+                # The profile was changed since the queue started and its model is not here yet
+                self.append_output_async(f"⏳ Waiting for the {self.state.model_name()} model…")
+                if not prep.wait(on_progress):
+                    self.append_output_async("❌ Model was not prepared; queue aborted.")
+                    with self.worker_lock:
+                        counts["failed"] += 1
+                    self.q.task_done()
+                    break
+
+            argv = [script] + (["-p", profile] if profile else []) + [path]
+            if admission is None:
+                self._run_job(path, argv, counts)
+                continue
+            duration = dt_probe.duration(path) or 0.0
+            est = dt_scheduler.estimate(duration, dt_scheduler.job_models(profile))
+            name = os.path.basename(path)
+            if not admission.acquire(path, est, duration, stop=lambda: self.stop_flag,
+                                     on_wait=lambda: self.set_status_async(
+                                         f"Waiting for memory ({est / 1e9:.1f} GB) — {name}")):
+                break
+            t = threading.Thread(target=self._run_job, args=(path, argv, counts, admission, duration), daemon=True)
+            t.start()
+            running.append(t)
 
+        for t in running:
+            t.join()
         self.append_output_async("\n" + "-" * 48)
-        self.append_output_async(f"Summary: processed={processed}  failed={failed}")
+        self.append_output_async(
+            f"Summary: processed={counts['processed']}  skipped={counts['skipped']}  failed={counts['failed']}")
         self.append_output_async("-" * 48 + "\n")
 
-    # ---------- Alerts & model prep ----------
+    def _run_job(self, path, argv, counts, admission=None, duration=0.0):
+        """Run transcribe.sh for one file and tally the outcome into counts."""
+        name = os.path.basename(path)
+        prefix = f"[{name}] " if admission is not None else ""
+        if not duration and dt_probe is not None:
+            duration = dt_probe.duration(path) or 0.0   # cached; for the live progress line
+        self.append_output_async("\n" + "=" * 72)
+        self.append_output_async(f"▶️  Starting: {name}")
+        self.append_output_async("=" * 72)
+
+        rc_ev = threading.Event()
+        rc_holder = {"rc": 1, "skip": None, "model": None}
+
+        def on_line(line):
+            self.append_output_async(prefix + line)
+
+        def on_event(ev):
+            kind = ev.get("event")
+            if kind == "stage_started":
+                label = STAGE_LABELS.get(ev.get("stage"), ev.get("stage"))
+                self.set_status_async(f"{label}… — {name}")
+            elif kind == "language_detected" and not ev.get("forced"):
+                self.set_status_async(f"Detected language: {ev.get('language')} — {name}")
+            elif kind == "segment":
+                # Live feed: the latest subtitle as whisper-cli decodes it (file stays .srt.partial)
+                at = int(ev.get("end_ms") or 0) / 1000
+                pct = f"{min(99, int(at * 100 / duration))}% " if duration else ""
+                self.set_status_async(f"{pct}{at // 60:.0f}:{at % 60:02.0f} “{ev.get('text', '')}” — {name}")
+            elif kind == "model_selected":
+                # English routing also loaded the multilingual model to detect: credit the larger
+                rc_holder["model"] = (dt_scheduler.peak_model((ev.get("model"), ev.get("detect_model")))
+                                      if dt_scheduler is not None else ev.get("model"))
+            elif kind == "skipped":
+                rc_holder["skip"] = ev.get("reason")
+
+        def on_done(rc):
+            rc_holder["rc"] = rc
+            rc_ev.set()
+
+        env = None
+        on_start = None
+        if admission is not None:
+            env = {"WCLI_THREADS": str(max(1, (os.cpu_count() or 4) // admission.max_jobs))}
+            on_start = lambda proc: admission.attach(path, proc.pid)
+        self.append_output_async(f"$ {' '.join(argv)}")
+
+        threading.Thread(
+            target=_run_transcribe_stream, args=(argv, on_line, on_done, on_event, env, on_start), daemon=True
+        ).start()
+
+        rc_ev.wait()
+        if admission is not None:
+            peak = admission.release(path)
+            if rc_holder["rc"] == 0 and rc_holder["model"] and not rc_holder["skip"]:
+                dt_scheduler.learn(rc_holder["model"], peak, duration)
+        with self.worker_lock:
+            if rc_holder["rc"] == 0 and rc_holder["skip"]:
+                counts["skipped"] += 1
+            elif rc_holder["rc"] == 0:
+                counts["processed"] += 1
+            else:
+                counts["failed"] += 1
+        if rc_holder["rc"] == 0 and rc_holder["skip"]:
+            self.append_output_async(f"⏭️  Skipped: {name}  [{rc_holder['skip']}]")
+        elif rc_holder["rc"] == 0:
+            self.append_output_async(f"✅ Done: {name}  [exit 0]")
+        else:
+            self.append_output_async(f"❌ Failed: {name}  [exit {rc_holder['rc']}]")
+        self.set_status_async(name)
+
+        self.q.task_done()
+
+    # ---------- Alerts ----------
     def _show_reinstall_alert(self):
         def _show():
             alert = NSAlert.alloc().init()
@@ -339,50 +711,6 @@ class DropView(NSView):
         # Ensure main-thread execution
         self.performSelectorOnMainThread_withObject_waitUntilDone_("runBlock:", _show, True)
 
-    def _ensure_model_then(self, cont_fn):
-        """Ensure model exists. If missing, show OK dialog and auto-download on OK.
-        Calls cont_fn(True) when ready, cont_fn(False) on cancel/failure.
-        """
-        model_path = self.state.model_file()
-        if model_path and os.path.isfile(model_path):
-            cont_fn(True)
-            return
-
-        # Ask once; auto-download if OK
-        if not self._confirm_download_on_main():
-            self.append_output_async("Download canceled.")
-            cont_fn(False)
-            return
-
-        dl = self.state.download_script()
-        if not (dl and os.path.isfile(dl) and os.access(dl, os.X_OK)):
-            self.append_output_async(f"Error: download script not found or not executable:\n{dl}")
-            cont_fn(False)
-            return
-
-        self.append_output_async(
-            f"Starting Whisper model download (~3 GB) to:\n{self.state.model_dir()}\n$ {dl}\n"
-        )
-
-        def bg_download():
-            def on_line(line):
-                self.append_output_async(line)
-
-            def on_done(rc):
-                if rc == 0 and os.path.isfile(self.state.model_file()):
-                    self.append_output_async("✅ Model download complete.")
-                    cont_fn(True)
-                else:
-                    self.append_output_async(
-                        f"❌ Download failed (exit {rc}). "
-                        "Please try again later or run 2-Download-Model.command."
-                    )
-                    cont_fn(False)
-
-            _run_transcribe_stream([dl], on_line, on_done)
-
-        threading.Thread(target=bg_download, daemon=True).start()
-
 
 # ---------- App scaffolding ----------
 
@@ -426,6 +754,18 @@ def build_ui():
     quit_btn.setKeyEquivalentModifierMask_(NSEventModifierFlagCommand)
     quit_btn.setAutoresizingMask_(NSViewMinYMargin)
 
+    # Speed/quality profile, applied per job (see lib/dragtranscribe/models.py)
+    profile_popup = NSPopUpButton.alloc().initWithFrame_pullsDown_(NSMakeRect(
+        margin,
+        margin,
+        200.0, 28.0
+    ), False)
+    profile_popup.addItemWithTitle_("Default model")
+    if dt_models is not None:
+        for name in dt_models.PROFILES:
+            profile_popup.addItemWithTitle_(name)
+    profile_popup.setAutoresizingMask_(NSViewMinYMargin)
+
     output_top = path_field.frame().origin.y - 12.0
     output_height = output_top - (margin + 32)
     scroll_frame = NSMakeRect(margin, margin + 36, bounds.size.width - (margin * 2), output_height)
@@ -447,14 +787,31 @@ def build_ui():
         scroll_frame, path_field, text_view, state
     )
     drop_view.setAutoresizingMask_(NSViewWidthSizable | NSViewHeightSizable)
+    profile_popup.setTarget_(drop_view)
+    profile_popup.setAction_("profileChanged:")
 
     content.registerForDraggedTypes_(DropView.DROP_TYPES)
     content.addSubview_(scroll)
     content.addSubview_(path_field)
     content.addSubview_(quit_btn)
+    content.addSubview_(profile_popup)
     content.addSubview_(drop_view)
 
     window.makeKeyAndOrderFront_(None)
+
+    # Start fetching the model at launch so a first-run download overlaps the first drop.
+    if state.install_dir and os.environ.get("DRAGTRANSCRIBE_PREPARE_AT_LAUNCH", "1") != "0":
+        drop_view.model_prep.start()
+
+    # Optional: keep the model in the page cache so the first job after boot starts warm.
+    if state.model_file() and dt_warmup is not None and os.environ.get("DRAGTRANSCRIBE_WARMUP") == "1":
+        def on_warm(st):
+            if "warmed_bytes" in st and st.get("fraction") is not None:
+                drop_view.append_output_async(
+                    f"🔥 Model cache warmed: {100 * st['fraction']:.0f}% resident "
+                    f"({st['warmed_bytes'] / 1e9:.2f} GB read in {st['duration_ms'] / 1000:.1f}s)"
+                )
+        state.warmup = dt_warmup.WarmupService(state.model_file(), on_status=on_warm).start()
     return app
 
 
@@ -1,12 +1,26 @@
 #!/bin/bash
-# download_model.sh — Download ggml-large-v2.bin model into the bundle's models/ directory
+# download_model.sh — Download a Whisper model (default ggml-large-v2.bin) into the bundle's models/ directory
+#
+# Usage: ./download_model.sh [<model or profile>]   e.g. large-v2-q5_0, small.en, balanced
+#
+# Uses the bundle's resumable downloader (bin/dragtranscribe download): parallel ranges into
+# <model>.part, SHA-256 verified, renamed into place only when complete. Re-run to resume.
+# Peers listed in $DRAGTRANSCRIBE_PEERS (other nodes running `dragtranscribe peer serve`)
+# are tried before the internet.
+# Falls back to curl (resuming into <model>.curl.part, no checksum) if no Python is available.
 set -euo pipefail
 
 BIN_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
 BUNDLE_DIR="$(cd "$BIN_DIR/.." && pwd)"
 MODEL_DIR="$BUNDLE_DIR/models"
-MODEL_FILE="$MODEL_DIR/ggml-large-v2.bin"
-MODEL_URL="https://huggingface.co/ggerganov/whisper.cpp/resolve/main/ggml-large-v2.bin"
+MODEL_NAME="${1:-large-v2}"
+MODEL_FILE="$MODEL_DIR/ggml-$MODEL_NAME.bin"
+MODEL_URL="https://huggingface.co/ggerganov/whisper.cpp/resolve/main/ggml-$MODEL_NAME.bin"
+
+# Registry lookup (accepts profiles too); falls back to the ggml-<name>.bin naming above.
+if resolved="$(MODEL_DIR="$MODEL_DIR" "$BIN_DIR/dragtranscribe" models url "$MODEL_NAME" 2>/dev/null)"; then
+    IFS=$'\t' read -r MODEL_URL MODEL_FILE <<< "$resolved"
+fi
 
 echo "📦 Model directory: $MODEL_DIR"
 mkdir -p "$MODEL_DIR"
@@ -16,7 +30,15 @@ if [ -f "$MODEL_FILE" ]; then
     exit 0
 fi
 
-echo "🌐 Downloading ggml-large-v2.bin (~2.9 GB) ..."
-curl -L -o "$MODEL_FILE" "$MODEL_URL"
+echo "🌐 Downloading $(basename "$MODEL_FILE") ..."
+status=0
+"$BIN_DIR/dragtranscribe" download "$MODEL_URL" "$MODEL_FILE" || status=$?
+if [ $status -eq 127 ]; then
+    echo "⚠️ Python not available; downloading with curl (no checksum verification) ..."
+    curl -L -C - -o "$MODEL_FILE.curl.part" "$MODEL_URL"
+    mv -f "$MODEL_FILE.curl.part" "$MODEL_FILE"
+elif [ $status -ne 0 ]; then
+    exit $status
+fi
 
 echo "✅ Download complete: $MODEL_FILE"
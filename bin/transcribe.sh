@@ -1,14 +1,55 @@
 #!/bin/bash
 # transcribe.sh — Batch-or-single transcription with whisper-cli.
 # - FILE: transcribe that one file (unless it already has .srt or *_subbed.*).
-# - DIR or no arg: scan for videos and transcribe only those WITHOUT a matching .srt,
-#   skipping any filename containing "_subbed".
-# Always embeds QuickTime-friendly soft subtitles into <name>_subbed.mp4 after creating .srt.
+# - DIR or no arg: scan for videos and audio files (.wav .mp3 .m4a .flac) and transcribe
+#   only those WITHOUT a matching .srt, skipping any filename containing "_subbed".
+# For videos, embeds soft subtitles into <name>_subbed.mp4 (or <name>_subbed.mkv when the
+# codecs can't go into MP4) after creating .srt; audio files get the .srt only. A WAV that
+# is already 16 kHz mono 16-bit PCM goes to whisper-cli as is, with no extraction or copy.
 #
 # Usage:
-#   ./transcribe.sh [-l <lang>] [<file_or_dir>]
+#   ./transcribe.sh [-l <lang>] [-p <profile>] [-o <formats>] [<file_or_dir>]
 #   -l en     -> force English transcription
 #   -l xx     -> force translation from <lang code> -> English
+#   -p fast|balanced|accurate (or a model name such as large-v2-q5_0)
+#             -> pick the model from the registry (default: $DRAGTRANSCRIBE_PROFILE);
+#                a missing model is fetched on demand within $DRAGTRANSCRIBE_MODEL_QUOTA_GB
+#   -o srt,vtt,json,txt,hls
+#             -> subtitle/transcript formats written next to the input, all from the same
+#                inference pass (default: $DRAGTRANSCRIBE_FORMATS, else srt; SRT is always
+#                written). json is whisper-cli's full JSON with token timestamps; hls is
+#                <name>_hls/ with segmented WebVTT and subtitles.m3u8 (lib/dragtranscribe/hls.py,
+#                $DRAGTRANSCRIBE_HLS_SEGMENT_S, $DRAGTRANSCRIBE_HLS_MPEGTS).
+#
+# Language routing: English audio is transcribed with an English-only model when one is
+# available — $DRAGTRANSCRIBE_MODEL_EN (model/profile name or path, "none" to disable), else
+# the best installed *.en model unless -p chose a single model. Everything else goes to the
+# multilingual model with -tr. The route taken is recorded in <name>.manifest.json
+# (set DRAGTRANSCRIBE_MANIFEST=0 to skip writing it).
+#
+# Live subtitles: while whisper-cli runs, the segments it prints are appended to
+# <name>.srt.partial (and sent as `segment` events); at the end the finished SRT replaces
+# it and is renamed to <name>.srt in one step (lib/dragtranscribe/live.py).
+#
+# Very long media: DRAGTRANSCRIBE_CHUNKED=1 (or a peak-memory target in
+# DRAGTRANSCRIBE_PEAK_MB) transcribes window by window from the decoder, so memory use
+# does not grow with the media's length (lib/dragtranscribe/chunked.py).
+#
+# Machine-readable progress (opt-in): set DRAGTRANSCRIBE_EVENT_FD=<fd> to write JSONL
+# events to an inherited file descriptor, or DRAGTRANSCRIBE_EVENT_FILE=<path> to append
+# them to a file/FIFO. See lib/dragtranscribe/events.py for the event vocabulary.
+#
+# Hard subtitles (opt-in): DRAGTRANSCRIBE_BURNIN=1 also writes <name>_burned.mp4 with the
+# subtitles drawn into the picture, rendered in parallel segments ($DRAGTRANSCRIBE_BURNIN_JOBS).
+#
+# Transcript search: each finished SRT is added to the full-text index searched by
+# `dragtranscribe index search` ($DRAGTRANSCRIBE_INDEX; set it to 0 to skip).
+#
+# Audio cache (opt-in): DRAGTRANSCRIBE_AUDIO_CACHE=<dir> keeps each source's extracted audio
+# as FLAC (LRU, $DRAGTRANSCRIBE_AUDIO_CACHE_GB, default 10) so re-runs skip the video decode.
+#
+# Temp audio goes to a per-run scratch directory: RAM-backed when it fits
+# ($DRAGTRANSCRIBE_RAM_SCRATCH, default /dev/shm), else $DRAGTRANSCRIBE_SCRATCH_DIR or $TMPDIR.
 #
 # Self-contained bundle expectations:
 #   ./bin/ffmpeg, ./bin/whisper-cli, ./models/ggml-large-v2.bin (or ggml-small.en.bin)
@@ -17,13 +58,18 @@ set -euo pipefail
 
 # ---------- Global quit-safe cleanup ----------
 # We track all temp files created during this run and remove them on normal exit,
-# Ctrl-C (SIGINT), or app-initiated termination (SIGTERM). Note: SIGKILL (-9) cannot be trapped.
+# Ctrl-C (SIGINT), or app-initiated termination (SIGTERM). Note: SIGKILL (-9) cannot be trapped;
+# its per-PID scratch directory is reclaimed by the next run's janitor (dragtranscribe scratch clean).
 TMP_FILES=()
+TMP_DIRS=()
 
 cleanup_all() {
   for f in "${TMP_FILES[@]:-}"; do
     [ -n "${f:-}" ] && [ -f "$f" ] && rm -f "$f" || true
   done
+  for d in "${TMP_DIRS[@]:-}"; do
+    case "$d" in */dragtranscribe-$$) rm -rf "$d" ;; esac
+  done
 }
 trap cleanup_all EXIT INT TERM
 
@@ -32,32 +78,161 @@ BIN_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
 BUNDLE_DIR="$(cd "$BIN_DIR/.." && pwd)"
 
 export PATH="$BIN_DIR:$PATH"
-export WHISPER_BIN="${WHISPER_BIN:-whisper-cli}"
 
-# Choose model
-: "${MODEL_DIR:="$BUNDLE_DIR/models"}"
-if [ -z "${MODEL_LARGE_V2:-}" ]; then
-  if [ -f "$MODEL_DIR/ggml-large-v2.bin" ]; then
-    export MODEL_LARGE_V2="$MODEL_DIR/ggml-large-v2.bin"
-  elif [ -f "$MODEL_DIR/ggml-small.en.bin" ]; then
-    export MODEL_LARGE_V2="$MODEL_DIR/ggml-small.en.bin"
+# ---------- Event stream (JSONL, opt-in) ----------
+EVENT_FD=""
+if [ -n "${DRAGTRANSCRIBE_EVENT_FD:-}" ]; then
+  case "$DRAGTRANSCRIBE_EVENT_FD" in
+    *[!0-9]*) echo "Warn: ignoring non-numeric DRAGTRANSCRIBE_EVENT_FD" >&2 ;;
+    *) EVENT_FD="$DRAGTRANSCRIBE_EVENT_FD" ;;
+  esac
+elif [ -n "${DRAGTRANSCRIBE_EVENT_FILE:-}" ]; then
+  if exec 9>>"$DRAGTRANSCRIBE_EVENT_FILE"; then
+    EVENT_FD=9
   else
-    echo "Error: No model found in $MODEL_DIR" >&2
-    echo "Expected one of: ggml-large-v2.bin or ggml-small.en.bin" >&2
-    exit 1
+    echo "Warn: cannot open event file: $DRAGTRANSCRIBE_EVENT_FILE" >&2
   fi
 fi
 
+CUR_FILE=""      # file the current job is working on (added to every job-level event)
+JOB_T0=""
+STAGE_T0=""
+
+now_ms() {
+  perl -MTime::HiRes=time -e 'printf "%d\n", time() * 1000' 2>/dev/null \
+    || echo "$(( $(date +%s) * 1000 ))"
+}
+
+# Sets JSON_ESCAPED (no subshell, so emitting stays cheap).
+json_escape() {
+  local s="$1"
+  s="${s//\\/\\\\}"
+  s="${s//\"/\\\"}"
+  s="${s//$'\n'/\\n}"
+  s="${s//$'\r'/\\r}"
+  s="${s//$'\t'/\\t}"
+  JSON_ESCAPED="$s"
+}
+
+# json_fields [s:<key> <string> | n:<key> <json-literal>] ...
+# Sets JSON_FIELDS to the matching ',"key":value' object members.
+json_fields() {
+  JSON_FIELDS=""
+  while [ $# -ge 2 ]; do
+    case "$1" in
+      s:*) json_escape "$2"; JSON_FIELDS="$JSON_FIELDS,\"${1#s:}\":\"$JSON_ESCAPED\"" ;;
+      n:*) JSON_FIELDS="$JSON_FIELDS,\"${1#n:}\":${2:-null}" ;;
+    esac
+    shift 2
+  done
+}
+
+# emit_event <event> [s:<key> <string> | n:<key> <json-literal>] ...
+emit_event() {
+  [ -n "$EVENT_FD" ] || return 0
+  local line
+  line="{\"event\":\"$1\",\"ts_ms\":$(now_ms),\"pid\":$$"
+  shift
+  if [ -n "$CUR_FILE" ]; then
+    json_escape "$CUR_FILE"; line="$line,\"file\":\"$JSON_ESCAPED\""
+  fi
+  json_fields "$@"
+  printf '%s%s}\n' "$line" "$JSON_FIELDS" >&"$EVENT_FD" 2>/dev/null || true
+}
+
+stage_start() {
+  [ -n "$EVENT_FD" ] || return 0
+  STAGE_T0="$(now_ms)"
+  emit_event stage_started s:stage "$1"
+}
+
+# stage_finish <stage> <exit status>
+stage_finish() {
+  [ -n "$EVENT_FD" ] || return 0
+  emit_event stage_finished s:stage "$1" n:status "$2" n:duration_ms "$(( $(now_ms) - ${STAGE_T0:-0} ))"
+}
+
+# job_skip <file> <reason> <message>
+job_skip() {
+  echo "Skip ($3): $(basename "$1")"
+  CUR_FILE="$1" emit_event skipped s:reason "$2"
+}
+
+# job_fail <stage> <exit status>
+job_fail() {
+  emit_event failed s:stage "$1" n:exit_code "$2"
+}
+export WHISPER_BIN="${WHISPER_BIN:-whisper-cli}"
+
 # ---------- Args ----------
 LANG_OVERRIDE=""
-while getopts ":l:" opt; do
+PROFILE="${DRAGTRANSCRIBE_PROFILE:-}"
+FORMATS="${DRAGTRANSCRIBE_FORMATS:-srt}"
+while getopts ":l:p:o:" opt; do
   case "$opt" in
     l) LANG_OVERRIDE="$(printf '%s' "$OPTARG" | tr '[:upper:]' '[:lower:]')" ;;
+    p) PROFILE="$OPTARG" ;;
+    o) FORMATS="$OPTARG" ;;
     \?) echo "Invalid option: -$OPTARG" >&2; exit 1 ;;
     :)  echo "Option -$OPTARG requires an argument." >&2; exit 1 ;;
   esac
 done
 shift $((OPTIND - 1))
+# The store's eviction pins this profile's model (store.pinned), so fetching the English
+# model below can't evict the one just resolved
+export DRAGTRANSCRIBE_PROFILE="$PROFILE"
+
+# Output formats: whisper-cli writes them all from one inference pass (SRT always, since
+# the skip check and the mux depend on it)
+OUTPUT_FORMATS="srt"
+WHISPER_FORMAT_ARGS="-osrt"
+HLS_OUTPUT=0
+for fmt in $(printf '%s' "$FORMATS" | tr '[:upper:],' '[:lower:] '); do
+  case " $OUTPUT_FORMATS " in *" $fmt "*) continue ;; esac
+  case "$fmt" in
+    vtt)  WHISPER_FORMAT_ARGS="$WHISPER_FORMAT_ARGS -ovtt" ;;
+    json) WHISPER_FORMAT_ARGS="$WHISPER_FORMAT_ARGS -ojf" ;;
+    txt)  WHISPER_FORMAT_ARGS="$WHISPER_FORMAT_ARGS -otxt" ;;
+    hls)  HLS_OUTPUT=1; continue ;;   # cut from the final SRT, not a whisper-cli format
+    *) echo "Error: unknown output format '$fmt' (expected srt, vtt, json, txt, hls)" >&2; exit 1 ;;
+  esac
+  OUTPUT_FORMATS="$OUTPUT_FORMATS $fmt"
+done
+
+# Choose model: a named profile/model from the registry (lib/dragtranscribe/models.py),
+# else $MODEL_LARGE_V2, else whichever of large-v2 / small.en is installed.
+: "${MODEL_DIR:="$BUNDLE_DIR/models"}"
+export MODEL_DIR
+if [ -n "$PROFILE" ]; then
+  MODEL_LARGE_V2="$("$BIN_DIR/dragtranscribe" models resolve --fetch "$PROFILE")" || exit 1
+  export MODEL_LARGE_V2
+  echo "Profile: $PROFILE -> $(basename "$MODEL_LARGE_V2")"
+elif [ -z "${MODEL_LARGE_V2:-}" ]; then
+  if [ -f "$MODEL_DIR/ggml-large-v2.bin" ]; then
+    export MODEL_LARGE_V2="$MODEL_DIR/ggml-large-v2.bin"
+  elif [ -f "$MODEL_DIR/ggml-small.en.bin" ]; then
+    export MODEL_LARGE_V2="$MODEL_DIR/ggml-small.en.bin"
+  else
+    echo "Error: No model found in $MODEL_DIR" >&2
+    echo "Expected one of: ggml-large-v2.bin or ggml-small.en.bin" >&2
+    exit 1
+  fi
+fi
+
+# English route (models.ENGLISH_ROUTE): explicit model, else best installed *.en model
+# unless a profile pinned a single model. Empty = English uses the model above too.
+MODEL_EN="${DRAGTRANSCRIBE_MODEL_EN:-}"
+if [ "$MODEL_EN" = "none" ]; then
+  MODEL_EN=""
+elif [ -n "$MODEL_EN" ]; then
+  if [ ! -f "$MODEL_EN" ]; then
+    MODEL_EN="$("$BIN_DIR/dragtranscribe" models resolve --fetch "$MODEL_EN")" || exit 1
+  fi
+elif [ -z "$PROFILE" ]; then
+  MODEL_EN="$("$BIN_DIR/dragtranscribe" models english 2>/dev/null)" || MODEL_EN=""
+fi
+[ "$MODEL_EN" = "$MODEL_LARGE_V2" ] && MODEL_EN=""
+[ -n "$MODEL_EN" ] && echo "English route: $(basename "$MODEL_EN")"
 
 TARGET_PATH="${1:-"$BUNDLE_DIR/video"}"
 
@@ -72,6 +247,26 @@ if ! command -v ffmpeg >/dev/null 2>&1; then
   exit 1
 fi
 
+# ---------- Model integrity ----------
+# O(1) against the digest sidecar; a full (one-time) verification only when it is missing
+# or the file changed. Skipped when no Python is available (exit 127).
+check_model() {
+  local verify_status=0
+  "$BIN_DIR/dragtranscribe" digest check "$1" 2>/dev/null && return 0
+  "$BIN_DIR/dragtranscribe" digest verify "$1" || verify_status=$?
+  if [ $verify_status -ne 0 ] && [ $verify_status -ne 127 ]; then
+    echo "Error: model failed verification (truncated or corrupt?): $1" >&2
+    echo "Delete it and run download_model.sh again." >&2
+    exit 1
+  fi
+}
+check_model "$MODEL_LARGE_V2"
+[ -z "$MODEL_EN" ] || check_model "$MODEL_EN"
+
+# ---------- Scratch janitor ----------
+# Reclaim scratch directories left behind by runs that were killed (best effort).
+"$BIN_DIR/dragtranscribe" scratch clean 2>/dev/null || true
+
 # ---------- Threads ----------
 if command -v sysctl >/dev/null 2>&1; then
   DEFAULT_THREADS="$(sysctl -n hw.ncpu)"
@@ -89,11 +284,25 @@ is_video_file() {
   esac
 }
 
+is_audio_file() {
+  local name_lc
+  name_lc="$(printf '%s' "$1" | tr '[:upper:]' '[:lower:]')"
+  case "$name_lc" in
+    *.wav|*.mp3|*.m4a|*.flac) return 0 ;; *) return 1 ;;
+  esac
+}
+
+is_media_file() {
+  is_video_file "$1" || is_audio_file "$1"
+}
+
 should_skip_file() {
   local base_lc
   base_lc="$(basename "$1" | tr '[:upper:]' '[:lower:]')"
   case "$base_lc" in
-    *_subbed.mp4|*_subbed.mov|*_subbed.m4v|*_subbed.mkv|*_subbed.webm|*_subbed.avi) return 0 ;; *) return 1 ;;
+    *_subbed.mp4|*_subbed.mov|*_subbed.m4v|*_subbed.mkv|*_subbed.webm|*_subbed.avi) return 0 ;;
+    *_burned.mp4|*_burned.mov|*_burned.m4v|*_burned.mkv|*_burned.webm|*_burned.avi) return 0 ;;
+    *) return 1 ;;
   esac
 }
 
@@ -103,20 +312,77 @@ detect_lang_simple() {
     | sed -n 's/.*auto-detected language: \([a-z][a-z]\) (p = \([0-9.]*\)).*/\1 \2/p' | tail -n1
 }
 
+# record_model_run <model> <wav> <t0 ms>
+# Feed the registry's measured real-time factor: audio seconds (16 kHz mono s16 WAV)
+# vs wall time since t0. Best effort.
+record_model_run() {
+  local bytes elapsed
+  bytes=$(( $(wc -c < "$2") ))
+  elapsed=$(( $(now_ms) - $3 ))
+  "$BIN_DIR/dragtranscribe" models record "$1" \
+    --audio-seconds $(( (bytes - 44) / 32000 )) \
+    --wall-seconds "$(printf '%d.%03d' $(( elapsed / 1000 )) $(( elapsed % 1000 )))" >/dev/null 2>&1 || true
+}
+
+# place_output <temp file> <final path> [<staging path next to it>]
+# Atomic even when scratch is on another filesystem (e.g. /dev/shm): copy next to the final
+# path (to $3 when given, e.g. the live .srt.partial), then rename over it, so readers never
+# see a partial file.
+place_output() {
+  local tmp="${3:-$2.tmp.$$}"
+  TMP_FILES+=("$tmp")
+  if cp -f "$1" "$tmp" && mv -f "$tmp" "$2"; then
+    rm -f "$1"
+    return 0
+  fi
+  rm -f "$tmp"
+  return 1
+}
+
+# ---------- Job manifest ----------
+# <stem>.manifest.json next to the outputs: how the job was run (language, route, model)
+# and what it wrote. Built up with manifest_add / manifest_output during process_one.
+JOB_MANIFEST=""
+JOB_OUTPUTS=""
+
+manifest_add() {
+  json_fields "$@"
+  JOB_MANIFEST="$JOB_MANIFEST$JSON_FIELDS"
+}
+
+# manifest_output <kind> <path>
+manifest_output() {
+  json_fields s:"$1" "$2"
+  JOB_OUTPUTS="$JOB_OUTPUTS$JSON_FIELDS"
+}
+
+# write_manifest <path>  (atomic: temp file in the same directory, then rename)
+write_manifest() {
+  [ "${DRAGTRANSCRIBE_MANIFEST:-1}" != "0" ] || return 0
+  local tmp="$1.tmp.$$"
+  if printf '{"version":1%s,"outputs":{%s}}\n' "$JOB_MANIFEST" "${JOB_OUTPUTS#,}" > "$tmp"; then
+    mv -f "$tmp" "$1"
+  else
+    rm -f "$tmp"
+    echo "Warn: could not write manifest: $1" >&2
+  fi
+}
+
 # ---------- Core per-file processor ----------
 process_one() {
   local VIDEO_FILE="$1"
+  CUR_FILE="$VIDEO_FILE"
 
   if [ ! -f "$VIDEO_FILE" ]; then
-    echo "Skip (not a regular file): $VIDEO_FILE"
+    job_skip "$VIDEO_FILE" not_regular_file "not a regular file"
     return 0
   fi
   if should_skip_file "$VIDEO_FILE"; then
-    echo "Skip (_subbed file): $(basename "$VIDEO_FILE")"
+    job_skip "$VIDEO_FILE" subbed_file "_subbed file"
     return 0
   fi
-  if ! is_video_file "$VIDEO_FILE"; then
-    echo "Skip (not a recognized video): $(basename "$VIDEO_FILE")"
+  if ! is_media_file "$VIDEO_FILE"; then
+    job_skip "$VIDEO_FILE" not_video "not a recognized video or audio file"
     return 0
   fi
 
@@ -126,125 +392,299 @@ process_one() {
   STEM="${BASENAME%.*}"
 
   OUTPUT_SRT="$FULLDIR/$STEM.srt"
-  SUBBED_OUTPUT="$FULLDIR/${STEM}_subbed.mp4"
+  SUBBED_OUTPUT=""
+  is_video_file "$VIDEO_FILE" && SUBBED_OUTPUT="$FULLDIR/${STEM}_subbed.mp4"
 
   # Skip if .srt already exists
   if [ -f "$OUTPUT_SRT" ]; then
-    echo "Skip (SRT exists): $BASENAME"
+    job_skip "$VIDEO_FILE" srt_exists "SRT exists"
     return 0
   fi
 
   echo "==> Processing: $BASENAME"
+  emit_event job_started
+  JOB_MANIFEST=""; JOB_OUTPUTS=""
+  manifest_add s:source "$VIDEO_FILE" s:created_at "$(date -u +%Y-%m-%dT%H:%M:%SZ)" s:profile "$PROFILE"
+
+  # Chunked mode decodes while transcribing; only a short clip is extracted for detection
+  # and scratch holds at most one window (chunked.MAX_WINDOW_S)
+  local CHUNKED=0 EXTRACT_SECS="" SCRATCH_SECS=""
+  if [ "${DRAGTRANSCRIBE_CHUNKED:-0}" = "1" ] || [ -n "${DRAGTRANSCRIBE_PEAK_MB:-}" ]; then
+    CHUNKED=1; EXTRACT_SECS=60; SCRATCH_SECS=3600
+  fi
+
+  # Fast path: a 16 kHz mono s16 WAV is read by whisper-cli in place (no extract, no copy)
+  local DIRECT_WAV=0
+  if [ $CHUNKED -eq 0 ] && is_audio_file "$VIDEO_FILE" \
+     && "$BIN_DIR/dragtranscribe" probe --whisper-wav "$VIDEO_FILE" 2>/dev/null; then
+    DIRECT_WAV=1; SCRATCH_SECS=1
+  fi
+
+  # Scratch dir (RAM-backed or disk) after a free-space preflight sized from the duration
+  local SCRATCH prep_status=0
+  SCRATCH="$("$BIN_DIR/dragtranscribe" scratch prepare --pid $$ ${SCRATCH_SECS:+--seconds "$SCRATCH_SECS"} "$VIDEO_FILE")" \
+    || prep_status=$?
+  if [ $prep_status -eq 127 ]; then
+    SCRATCH="/tmp"
+  elif [ $prep_status -ne 0 ]; then
+    echo "Error: no scratch space for $BASENAME; free some disk space or set DRAGTRANSCRIBE_SCRATCH_DIR." >&2
+    job_fail preflight 4
+    return 4
+  fi
+  TMP_DIRS+=("$SCRATCH")
 
   # Temp files (PID-suffixed) + pre-clean
-  local TEMP_AUDIO OUT_PREFIX TEMP_SRT
-  TEMP_AUDIO="/tmp/${STEM}_$$.wav"
-  OUT_PREFIX="/tmp/${STEM}_$$"
+  local TEMP_AUDIO OUT_PREFIX TEMP_SRT LIVE_SRT
+  TEMP_AUDIO="$SCRATCH/${STEM}_$$.wav"
+  OUT_PREFIX="$SCRATCH/${STEM}_$$"
   TEMP_SRT="${OUT_PREFIX}.srt"
+  LIVE_SRT="$OUTPUT_SRT.partial"   # next to the input: growing while whisper-cli runs
   rm -f "$TEMP_AUDIO" "$TEMP_SRT"
+  local AUDIO_IN="$TEMP_AUDIO"
+  [ $DIRECT_WAV -eq 1 ] && AUDIO_IN="$VIDEO_FILE"
+
+  # Register temp files globally for quit-safe cleanup; after a SIGKILL the next run's
+  # scratch janitor removes the live .srt.partial listed in this run's scratch dir
+  TMP_FILES+=("$TEMP_AUDIO" "$TEMP_SRT" "$LIVE_SRT")
+  if [ $prep_status -eq 0 ]; then
+    { printf '%s\n' "$LIVE_SRT" > "$SCRATCH/.outputs"; } 2>/dev/null || true
+  fi
 
-  # Register temp files globally for quit-safe cleanup
-  TMP_FILES+=("$TEMP_AUDIO" "$TEMP_SRT")
+  # Function-local cleanup (runs when this function returns, then disarms itself so
+  # the caller's own return doesn't re-run it with these locals out of scope); the scratch
+  # bookkeeping files only when SCRATCH is ours, not the shared /tmp fallback
+  trap 'rm -f "$TEMP_AUDIO" "$TEMP_SRT" "$LIVE_SRT" "$OUT_PREFIX".*
+        [ $prep_status -ne 0 ] || rm -f "$SCRATCH/.reserved" "$SCRATCH/.outputs"; trap - RETURN' RETURN
 
-  # Function-local cleanup (runs when this function returns)
-  trap 'rm -f "$TEMP_AUDIO" "$TEMP_SRT"' RETURN
+  local status=0
+  if [ $DIRECT_WAV -eq 1 ]; then
+    echo "Input is 16 kHz mono PCM; passing it to whisper-cli as is."
+  else
+    # Audio cache (opt-in): a hit decodes the cached FLAC instead of demuxing the video; a full
+    # extraction on a miss also writes the FLAC entry from the same decode
+    local AUDIO_SRC="$VIDEO_FILE" CACHE_ENTRY="" CACHE_PART="" cache_status=0
+    if [ -n "${DRAGTRANSCRIBE_AUDIO_CACHE:-}" ]; then
+      # exit 0 = hit, 1 = miss (prints the entry to fill), anything else = cache unavailable
+      CACHE_ENTRY="$("$BIN_DIR/dragtranscribe" audiocache lookup "$VIDEO_FILE")" || cache_status=$?
+      if [ $cache_status -eq 0 ]; then
+        AUDIO_SRC="$CACHE_ENTRY"
+        echo "Audio cache hit: $(basename "$CACHE_ENTRY")"
+      elif [ $cache_status -eq 1 ] && [ $CHUNKED -eq 0 ]; then
+        CACHE_PART="$CACHE_ENTRY.part$$"
+        TMP_FILES+=("$CACHE_PART")
+      fi
+    fi
 
-  # Extract mono 16 kHz PCM
-  echo "Extracting audio -> '$TEMP_AUDIO' ..."
-  if ! ffmpeg -hide_banner -loglevel error -y -i "$VIDEO_FILE" -vn -acodec pcm_s16le -ar 16000 -ac 1 "$TEMP_AUDIO"; then
-    echo "Error: ffmpeg failed to extract audio: $BASENAME" >&2
-    return 2
+    # Extract mono 16 kHz PCM
+    echo "Extracting audio -> '$TEMP_AUDIO' ..."
+    stage_start extract
+    ffmpeg -hide_banner -loglevel error -y -i "$AUDIO_SRC" ${EXTRACT_SECS:+-t "$EXTRACT_SECS"} \
+      -vn -acodec pcm_s16le -ar 16000 -ac 1 "$TEMP_AUDIO" \
+      ${CACHE_PART:+-vn -acodec flac -ar 16000 -ac 1 -f flac "$CACHE_PART"} || status=$?
+    stage_finish extract $status
+    if [ $status -ne 0 ]; then
+      [ -z "$CACHE_PART" ] || rm -f "$CACHE_PART"
+      echo "Error: ffmpeg failed to extract audio: $BASENAME" >&2
+      job_fail extract 2
+      return 2
+    fi
+    if [ -n "$CACHE_PART" ]; then
+      "$BIN_DIR/dragtranscribe" audiocache commit "$CACHE_PART" "$CACHE_ENTRY" || rm -f "$CACHE_PART"
+    fi
   fi
 
   # Language detect / override
-  local DET_LANG="" DET_PROB=""
+  local DET_LANG="" DET_PROB="" DETECT_MODEL=""
   if [ -n "$LANG_OVERRIDE" ]; then
     DET_LANG="$LANG_OVERRIDE"
     echo "Forcing language: $DET_LANG"
+    emit_event language_detected s:language "$DET_LANG" n:probability null n:forced true
   else
     echo "Auto-detecting language ..."
-    read DET_LANG DET_PROB < <(detect_lang_simple "$TEMP_AUDIO" || true)
+    DETECT_MODEL="$(basename "$MODEL_LARGE_V2")"
+    stage_start detect
+    read DET_LANG DET_PROB < <(detect_lang_simple "$AUDIO_IN" || true)
+    stage_finish detect 0
     if [ -z "${DET_LANG:-}" ]; then
       echo "Warn: detection inconclusive; defaulting to translate -> English." >&2
       DET_LANG="auto"
+      emit_event language_detected s:language auto n:probability null n:forced false
     else
       echo "Detected language: $DET_LANG (p=${DET_PROB:-?})"
+      emit_event language_detected s:language "$DET_LANG" n:probability "${DET_PROB:-null}" n:forced false
     fi
   fi
 
-  # Transcribe vs translate
-  local status=0
+  # Route: English -> English-only model (when configured/installed); else multilingual + -tr
+  local JOB_MODEL="$MODEL_LARGE_V2" ROUTE=multilingual TASK=translate
   if [ "$DET_LANG" = "en" ]; then
-    echo "Transcribing English -> '$OUTPUT_SRT' ..."
-    "$WHISPER_BIN" -m "$MODEL_LARGE_V2" -f "$TEMP_AUDIO" -l en -osrt -of "$OUT_PREFIX" -t "$WCLI_THREADS" || status=$?
+    TASK=transcribe
+    if [ -n "$MODEL_EN" ]; then JOB_MODEL="$MODEL_EN"; ROUTE=en; fi
+  fi
+  emit_event model_selected s:route "$ROUTE" s:model "$(basename "$JOB_MODEL")" s:task "$TASK" \
+    s:detect_model "$DETECT_MODEL"
+  manifest_add n:chunked "$([ $CHUNKED -eq 1 ] && echo true || echo false)"
+  manifest_add s:language "$DET_LANG" n:language_probability "${DET_PROB:-null}" \
+    n:language_forced "$([ -n "$LANG_OVERRIDE" ] && echo true || echo false)" \
+    s:route "$ROUTE" s:model "$(basename "$JOB_MODEL")" s:model_path "$JOB_MODEL" s:task "$TASK"
+
+  # Transcribe vs translate
+  local T_INFER LANG_ARGS
+  if [ "$TASK" = "transcribe" ]; then
+    LANG_ARGS="-l en"
+    echo "Transcribing English ($(basename "$JOB_MODEL")) -> '$OUTPUT_SRT' ..."
   else
+    LANG_ARGS="-tr"
+    [ "$DET_LANG" = "auto" ] || LANG_ARGS="-l $DET_LANG -tr"
     echo "Translating from '$DET_LANG' -> English -> '$OUTPUT_SRT' ..."
-    if [ "$DET_LANG" = "auto" ]; then
-      "$WHISPER_BIN" -m "$MODEL_LARGE_V2" -f "$TEMP_AUDIO" -tr -osrt -of "$OUT_PREFIX" -t "$WCLI_THREADS" || status=$?
-    else
-      "$WHISPER_BIN" -m "$MODEL_LARGE_V2" -f "$TEMP_AUDIO" -l "$DET_LANG" -tr -osrt -of "$OUT_PREFIX" -t "$WCLI_THREADS" || status=$?
-    fi
   fi
+  T_INFER="$(now_ms)"
+  stage_start transcribe
+  if [ $CHUNKED -eq 1 ]; then
+    "$BIN_DIR/dragtranscribe" chunked --input "$AUDIO_SRC" --output "$TEMP_SRT" --model "$JOB_MODEL" \
+      --formats "$(printf '%s' "$OUTPUT_FORMATS" | tr ' ' ',')" \
+      ${DRAGTRANSCRIBE_PEAK_MB:+--peak-mb "$DRAGTRANSCRIBE_PEAK_MB"} \
+      -- $LANG_ARGS -t "$WCLI_THREADS" || status=$?
+  else
+    # Segments printed while decoding go to the live <stem>.srt.partial (and segment events)
+    "$WHISPER_BIN" -m "$JOB_MODEL" -f "$AUDIO_IN" $LANG_ARGS $WHISPER_FORMAT_ARGS -of "$OUT_PREFIX" -t "$WCLI_THREADS" \
+      | { "$BIN_DIR/dragtranscribe" live --partial "$LIVE_SRT" || cat; } || status=$?
+  fi
+  stage_finish transcribe $status
   if [ $status -ne 0 ]; then
     echo "Error: whisper-cli failed for $BASENAME (exit $status)." >&2
+    job_fail transcribe $status
     return $status
   fi
-
-  # Move SRT into place
-  if [ -f "$TEMP_SRT" ]; then
-    mv -f "$TEMP_SRT" "$OUTPUT_SRT"
+  # (chunked mode records its own run)
+  [ $CHUNKED -eq 1 ] || record_model_run "$JOB_MODEL" "$AUDIO_IN" "$T_INFER"
+
+  # Move outputs into place; the SRT last, since its presence marks the job as done
+  local fmt
+  for fmt in $OUTPUT_FORMATS; do
+    [ "$fmt" = "srt" ] && continue
+    if [ -f "$OUT_PREFIX.$fmt" ] && place_output "$OUT_PREFIX.$fmt" "$FULLDIR/$STEM.$fmt"; then
+      echo "$(printf '%s' "$fmt" | tr '[:lower:]' '[:upper:]') created: $FULLDIR/$STEM.$fmt"
+      emit_event output_written s:kind "$fmt" s:path "$FULLDIR/$STEM.$fmt"
+      manifest_output "$fmt" "$FULLDIR/$STEM.$fmt"
+    else
+      echo "Warn: whisper-cli wrote no $fmt output for $BASENAME" >&2
+    fi
+  done
+  if [ -f "$TEMP_SRT" ] && place_output "$TEMP_SRT" "$OUTPUT_SRT" "$LIVE_SRT"; then
     echo "SRT created: $OUTPUT_SRT"
+    emit_event output_written s:kind srt s:path "$OUTPUT_SRT"
+    manifest_output srt "$OUTPUT_SRT"
   else
     echo "Error: Expected SRT not found at $TEMP_SRT" >&2
+    job_fail transcribe 3
     return 3
   fi
 
-  # Embed QuickTime-friendly soft subtitles
-  echo "Embedding soft subtitles into '$SUBBED_OUTPUT' ..."
-  if ffmpeg -hide_banner -loglevel error \
-       -i "$VIDEO_FILE" -i "$OUTPUT_SRT" \
-       -c:v copy -c:a copy -c:s mov_text \
-       -metadata:s:s:0 language=eng \
-       -metadata:s:s:0 title="English" \
-       "$SUBBED_OUTPUT"; then
-    echo "✅ Subtitled file created: $SUBBED_OUTPUT"
-  else
-    echo "⚠️ Warning: failed to embed subtitles into video: $BASENAME" >&2
+  # Segmented WebVTT + subtitle playlist for HLS (-o hls), covering the media's duration
+  if [ $HLS_OUTPUT -eq 1 ]; then
+    local HLS_PLAYLIST
+    if HLS_PLAYLIST="$("$BIN_DIR/dragtranscribe" hls "$OUTPUT_SRT" --media "$VIDEO_FILE" \
+        --output "$FULLDIR/${STEM}_hls")"; then
+      echo "HLS subtitles created: $HLS_PLAYLIST"
+      emit_event output_written s:kind hls s:path "$HLS_PLAYLIST"
+      manifest_output hls "$HLS_PLAYLIST"
+    else
+      echo "Warn: could not write HLS subtitles for $BASENAME" >&2
+    fi
+  fi
+
+  # Embed soft subtitles (videos only; audio inputs get the SRT alone). The container and
+  # copy-vs-transcode per stream are chosen from the probe before writing (mux.py):
+  # MP4 + mov_text when the codecs allow it, else MKV + SRT. Written to a temp name with the
+  # index up front (fast start), fsynced and renamed, so no partial _subbed file is left.
+  if [ -n "$SUBBED_OUTPUT" ]; then
+    echo "Embedding soft subtitles into '${SUBBED_OUTPUT%.*}' (.mp4/.mkv) ..."
+    stage_start mux
+    SUBBED_OUTPUT="$("$BIN_DIR/dragtranscribe" mux "$VIDEO_FILE" "$OUTPUT_SRT" --stem "${SUBBED_OUTPUT%.*}")" \
+      || status=$?
+    stage_finish mux $status
+    if [ $status -eq 0 ]; then
+      echo "✅ Subtitled file created: $SUBBED_OUTPUT"
+      emit_event output_written s:kind subbed s:path "$SUBBED_OUTPUT"
+      manifest_output subbed "$SUBBED_OUTPUT"
+    else
+      echo "⚠️ Warning: failed to embed subtitles into video: $BASENAME" >&2
+    fi
   fi
 
+  # Optional hard-subtitled copy for players without soft-subtitle support
+  # (DRAGTRANSCRIBE_BURNIN=1): rendered in parallel keyframe-aligned segments (burnin.py)
+  if [ "${DRAGTRANSCRIBE_BURNIN:-0}" = "1" ] && is_video_file "$VIDEO_FILE"; then
+    local BURNED_OUTPUT burn_status=0
+    echo "Burning subtitles into '$FULLDIR/${STEM}_burned.mp4' ..."
+    stage_start burnin
+    BURNED_OUTPUT="$("$BIN_DIR/dragtranscribe" burnin "$VIDEO_FILE" "$OUTPUT_SRT" \
+      --output "$FULLDIR/${STEM}_burned.mp4")" || burn_status=$?
+    stage_finish burnin $burn_status
+    if [ $burn_status -eq 0 ]; then
+      echo "✅ Burned-in copy created: $BURNED_OUTPUT"
+      emit_event output_written s:kind burned s:path "$BURNED_OUTPUT"
+      manifest_output burned "$BURNED_OUTPUT"
+    else
+      echo "⚠️ Warning: failed to burn subtitles into video: $BASENAME" >&2
+    fi
+  fi
+
+  # Searchable library: add this job's segments to the FTS5 index (DRAGTRANSCRIBE_INDEX=0: off)
+  "$BIN_DIR/dragtranscribe" index add "$OUTPUT_SRT" || echo "Warn: transcript index not updated" >&2
+
+  write_manifest "$FULLDIR/$STEM.manifest.json"
+
   return 0
 }
 
+# Wraps process_one with job timing and a terminal job_finished event.
+run_job() {
+  local rc=0
+  [ -n "$EVENT_FD" ] && JOB_T0="$(now_ms)"
+  process_one "$1" || rc=$?
+  if [ -n "$JOB_T0" ]; then
+    emit_event job_finished n:exit_code $rc n:duration_ms "$(( $(now_ms) - JOB_T0 ))"
+  fi
+  CUR_FILE=""; JOB_T0=""
+  return $rc
+}
+
 # ---------- Batch or single ----------
 processed=0; skipped=0; failed=0
+emit_event run_started s:target "$TARGET_PATH"
 
 if [ -d "$TARGET_PATH" ]; then
   echo "Scanning directory: $TARGET_PATH"
   while IFS= read -r -d '' f; do
     [ -f "$f" ] || continue
     if should_skip_file "$f"; then
-      echo "Skip (_subbed file): $(basename "$f")"; skipped=$((skipped+1)); continue; fi
-    if ! is_video_file "$f"; then continue; fi
+      job_skip "$f" subbed_file "_subbed file"; skipped=$((skipped+1)); continue; fi
+    if ! is_media_file "$f"; then continue; fi
     stem="${f%.*}"; srt="${stem}.srt"
     if [ -f "$srt" ]; then
-      echo "Skip (SRT exists): $(basename "$f")"; skipped=$((skipped+1)); continue; fi
-    if process_one "$f"; then processed=$((processed+1)); else failed=$((failed+1)); fi
+      job_skip "$f" srt_exists "SRT exists"; skipped=$((skipped+1)); continue; fi
+    if run_job "$f"; then processed=$((processed+1)); else failed=$((failed+1)); fi
   done < <(find "$TARGET_PATH" -type f -print0)
 else
   if should_skip_file "$TARGET_PATH"; then
-    echo "Skip (_subbed file): $(basename "$TARGET_PATH")"; skipped=$((skipped+1))
-  elif ! is_video_file "$TARGET_PATH"; then
-    echo "Error: Not a recognized video file: $TARGET_PATH" >&2; exit 1
+    job_skip "$TARGET_PATH" subbed_file "_subbed file"; skipped=$((skipped+1))
+  elif ! is_media_file "$TARGET_PATH"; then
+    echo "Error: Not a recognized video or audio file: $TARGET_PATH" >&2
+    CUR_FILE="$TARGET_PATH" emit_event failed s:stage preflight n:exit_code 1
+    exit 1
   else
     stem="${TARGET_PATH%.*}"; srt="${stem}.srt"
     if [ -f "$srt" ]; then
-      echo "Skip (SRT exists): $(basename "$TARGET_PATH")"; skipped=$((skipped+1))
+      job_skip "$TARGET_PATH" srt_exists "SRT exists"; skipped=$((skipped+1))
     else
-      if process_one "$TARGET_PATH"; then processed=$((processed+1)); else failed=$((failed+1)); fi
+      if run_job "$TARGET_PATH"; then processed=$((processed+1)); else failed=$((failed+1)); fi
     fi
   fi
 fi
 
 echo
 echo "Summary: processed=$processed  skipped=$skipped  failed=$failed"
+emit_event run_finished n:processed $processed n:skipped $skipped n:failed $failed
 exit $(( failed > 0 ))
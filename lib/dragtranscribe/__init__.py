@@ -0,0 +1 @@
+# dragtranscribe — Python helpers shared by bin/transcribe.sh and DragTranscribe.app
@@ -0,0 +1,146 @@
+# audiocache.py — keep extracted 16 kHz mono audio as FLAC so re-runs skip the video decode
+#
+# Re-running a file with another model, language or profile used to demux and decode the
+# whole video again, which for 4K sources is most of the non-inference cost. With
+# $DRAGTRANSCRIBE_AUDIO_CACHE set to a directory, the first extraction also writes
+# <cache>/<fingerprint>.flac (same ffmpeg pass, lossless, ~half the size of the WAV) and
+# later runs decode that instead of the video. The fingerprint samples the source (size
+# plus 1 MiB from its start, middle and end), so renamed or copied files still hit without
+# reading gigabytes. Entries are evicted least recently used first once the cache exceeds
+# $DRAGTRANSCRIBE_AUDIO_CACHE_GB (default 10).
+import hashlib
+import os
+import sys
+import time
+
+CACHE_ENV = "DRAGTRANSCRIBE_AUDIO_CACHE"
+LIMIT_ENV = "DRAGTRANSCRIBE_AUDIO_CACHE_GB"
+DEFAULT_LIMIT_GB = 10.0
+SAMPLE = 1024 * 1024
+
+
+def cache_dir() -> str | None:
+    return os.environ.get(CACHE_ENV) or None
+
+
+def limit_bytes() -> int:
+    try:
+        return int(float(os.environ.get(LIMIT_ENV) or DEFAULT_LIMIT_GB) * 1e9)
+    except ValueError:
+        return int(DEFAULT_LIMIT_GB * 1e9)
+
+
+def fingerprint(path: str) -> str:
+    size = os.path.getsize(path)
+    h = hashlib.sha256(f"dragtranscribe-audio-v1:{size}:".encode())
+    with open(path, "rb") as f:
+        for off in sorted({0, max(0, size // 2 - SAMPLE // 2), max(0, size - SAMPLE)}):
+            f.seek(off)
+            h.update(f.read(SAMPLE))
+    return h.hexdigest()[:32]
+
+
+def entry_path(src: str, directory: str) -> str:
+    return os.path.join(directory, fingerprint(src) + ".flac")
+
+
+def lookup(src: str, directory: str) -> tuple[str, bool]:
+    """(entry path, hit). A hit is marked as used now for the LRU order."""
+    path = entry_path(src, directory)
+    if os.path.isfile(path):
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return path, True
+    return path, False
+
+
+def entries(directory: str) -> list[tuple[float, int, str]]:
+    """(last use, size, path) for every entry, least recently used first."""
+    out = []
+    try:
+        with os.scandir(directory) as it:
+            for e in it:
+                if e.name.endswith(".flac") and e.is_file(follow_symlinks=False):
+                    st = e.stat(follow_symlinks=False)
+                    out.append((st.st_mtime, st.st_size, e.path))
+    except OSError:
+        pass
+    out.sort()
+    return out
+
+
+def evict(directory: str, limit: int, keep: str | None = None) -> int:
+    """Drop least recently used entries until the cache fits limit; returns bytes freed."""
+    current = entries(directory)
+    total = sum(size for _, size, _ in current)
+    freed = 0
+    for _, size, path in current:
+        if total - freed <= limit:
+            break
+        if path == keep:
+            continue
+        try:
+            os.remove(path)
+            freed += size
+        except OSError:
+            pass
+    return freed
+
+
+def commit(part: str, entry: str) -> None:
+    """Move a freshly encoded entry into place and enforce the size limit."""
+    os.replace(part, entry)
+    evict(os.path.dirname(entry), limit_bytes(), keep=entry)
+
+
+# ---------- CLI ----------
+
+def _cmd_lookup(args) -> int:
+    directory = cache_dir()
+    if not directory:
+        return 2
+    try:
+        os.makedirs(directory, exist_ok=True)
+        path, hit = lookup(args.source, directory)
+    except OSError as e:
+        print(f"Warn: audio cache unavailable: {e}", file=sys.stderr)
+        return 2
+    print(path)
+    return 0 if hit else 1
+
+
+def _cmd_commit(args) -> int:
+    try:
+        commit(args.part, args.entry)
+    except OSError as e:
+        print(f"Warn: could not store audio in the cache: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+def _cmd_status(args) -> int:
+    directory = cache_dir()
+    if not directory:
+        print(f"Audio cache disabled (set {CACHE_ENV})")
+        return 0
+    current = entries(directory)
+    total = sum(size for _, size, _ in current)
+    newest = time.strftime("%Y-%m-%d %H:%M", time.localtime(current[-1][0])) if current else "-"
+    print(f"{directory}: {len(current)} entries, {total / 1e9:.2f} of {limit_bytes() / 1e9:.2f} GB, "
+          f"last used {newest}")
+    return 0
+
+
+def register(sub) -> None:
+    p = sub.add_parser("audiocache", help="FLAC cache of extracted audio (opt-in)")
+    asub = p.add_subparsers(dest="audiocache_command", required=True)
+    lk = asub.add_parser("lookup", help="print the entry path for a source; exit 0 on hit, 1 on miss")
+    lk.add_argument("source")
+    lk.set_defaults(func=_cmd_lookup)
+    c = asub.add_parser("commit", help="move an encoded entry into place and evict down to the limit")
+    c.add_argument("part")
+    c.add_argument("entry")
+    c.set_defaults(func=_cmd_commit)
+    asub.add_parser("status", help="entries and size").set_defaults(func=_cmd_status)
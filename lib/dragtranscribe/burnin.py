@@ -0,0 +1,206 @@
+# burnin.py — optional hard-subtitled copy (<stem>_burned.mp4), rendered in parallel segments
+#
+# Some players can't show soft mov_text tracks, so the subtitles have to be drawn into the
+# picture, which means re-encoding the video. One ffmpeg process does that at a fraction of
+# a many-core machine's throughput, so the video is split at keyframes into N segments
+# (N = $DRAGTRANSCRIBE_BURNIN_JOBS, default: one per core, at least MIN_SEGMENT_S each).
+# Worker processes each render their segment with the subtitles filter (timestamps shifted
+# back to the source's so cues line up), and the segments are joined with the concat demuxer
+# without re-encoding (-c copy). Every segment starts on a source keyframe and is encoded
+# with identical settings, so the joins need no re-encode and no frame is repeated or lost:
+# each worker renders exactly the frames between its keyframe and the next segment's.
+# Audio is copied from the source (AAC when MP4 can't hold it). The output is finalized
+# like the soft-subtitle mux: temp name in the same directory, fast start, fsync, rename.
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+
+from . import events, mux, probe
+
+JOBS_ENV = "DRAGTRANSCRIBE_BURNIN_JOBS"
+MIN_SEGMENT_S = 10.0
+X264_ARGS = ["-c:v", "libx264", "-preset", "veryfast", "-crf", "18", "-pix_fmt", "yuv420p"]
+
+
+class BurnInError(Exception):
+    pass
+
+
+def video_packets(source: str) -> tuple[list[float], list[float]]:
+    """(all frame times, keyframe times) of the first video stream, relative to the container's
+    start_time: the origin input -ss seeks from (earlier than the first frame when another
+    stream starts first, as audio often does in MPEG-TS/MKV).
+
+    Reads packet headers only (no decoding). Empty lists when ffprobe is unavailable.
+    """
+    if not shutil.which("ffprobe"):
+        return [], []
+    out = subprocess.run(["ffprobe", "-v", "error", "-select_streams", "v:0",
+                          "-show_entries", "packet=pts_time,flags", "-of", "csv=p=0", source],
+                         capture_output=True, text=True)
+    if out.returncode != 0:
+        return [], []
+    frames, keys = [], []
+    for line in out.stdout.splitlines():
+        pts, _, flags = line.partition(",")
+        try:
+            t = float(pts)
+        except ValueError:
+            continue
+        frames.append(t)
+        if "K" in flags:
+            keys.append(t)
+    if not frames:
+        return [], []
+    info = probe.probe(source)
+    origin = info.get("start_time") if info else None
+    if origin is None:
+        origin = min(frames)
+    frames = sorted(t - origin for t in frames)
+    return frames, sorted(t - origin for t in keys)
+
+
+def split(frames: list[float], keys: list[float], jobs: int) -> list[tuple[float, int]]:
+    """(start time, frame count) per segment; starts are keyframes near equal-length cut points.
+
+    [(0.0, 0)] (one segment, no frame limit) when the frames aren't known.
+    """
+    if not frames or not keys:
+        return [(0.0, 0)]
+    total = frames[-1]
+    jobs = max(1, min(jobs, int(total // MIN_SEGMENT_S) or 1))
+    starts = [0.0]
+    for i in range(1, jobs):
+        target = total * i / jobs
+        later = [k for k in keys if k >= target and k > starts[-1]]
+        if later:
+            starts.append(later[0])
+    starts = sorted(set(starts))
+    bounds = starts + [float("inf")]
+    return [(bounds[i], sum(1 for t in frames if bounds[i] <= t < bounds[i + 1])) for i in range(len(starts))]
+
+
+class _Workers:
+    """The segment ffmpeg processes, so a failure or Stop can kill all of them at once."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._procs: list[subprocess.Popen] = []
+        self.cancelled = False
+
+    def run(self, cmd: list[str], cwd: str) -> int:
+        with self._lock:
+            if self.cancelled:
+                return -1
+            proc = subprocess.Popen(cmd, cwd=cwd)
+            self._procs.append(proc)
+        return proc.wait()
+
+    def kill_all(self) -> None:
+        with self._lock:
+            self.cancelled = True
+            for proc in self._procs:
+                if proc.poll() is None:
+                    proc.kill()
+            for proc in self._procs:
+                proc.wait()
+
+
+def _render(workers: _Workers, source: str, workdir: str, index: int, start: float, frames: int,
+            threads: int) -> str:
+    out = os.path.join(workdir, f"seg{index:04d}.mp4")
+    # subtitles.srt is a relative name inside workdir: no filter-graph escaping of user paths
+    vf = f"setpts=PTS+{start:.6f}/TB,subtitles=subtitles.srt,setpts=PTS-STARTPTS"
+    cmd = ["ffmpeg", "-hide_banner", "-loglevel", "error", "-y", "-ss", f"{start:.6f}", "-i", source,
+           "-map", "0:v:0", "-an", "-sn", "-vf", vf, *X264_ARGS, "-threads", str(threads)]
+    if frames:
+        cmd += ["-frames:v", str(frames)]
+    t0 = time.monotonic()
+    rc = workers.run([*cmd, "-f", "mp4", out], workdir)
+    if rc != 0:
+        raise BurnInError(f"segment {index} (from {start:.2f}s) failed: ffmpeg exited {rc}")
+    events.emit("burnin_segment", index=index, start_s=round(start, 3), frames=frames,
+                duration_ms=int((time.monotonic() - t0) * 1000))
+    return out
+
+
+def burn_in(source: str, srt: str, output: str, jobs: int | None = None) -> dict:
+    """Write output = source with srt drawn into the picture; returns timing stats."""
+    cpus = os.cpu_count() or 4
+    jobs = jobs or int(os.environ.get(JOBS_ENV) or cpus)
+    t0 = time.monotonic()
+    frames, keys = video_packets(source)
+    segments = split(frames, keys, jobs)
+    threads = max(1, cpus // len(segments))
+    mux.remove_stale_parts(output)
+    workdir = f"{output}.part{os.getpid()}"
+    os.makedirs(workdir)
+    workers = _Workers()
+    pool = ThreadPoolExecutor(max_workers=len(segments))
+    try:
+        shutil.copyfile(srt, os.path.join(workdir, "subtitles.srt"))
+        futures = [pool.submit(_render, workers, source, workdir, i, start, n, threads)
+                   for i, (start, n) in enumerate(segments)]
+        try:
+            wait(futures, return_when=FIRST_EXCEPTION)
+            for f in futures:
+                if f.done() and f.exception():
+                    raise f.exception()
+            parts = [f.result() for f in futures]
+        except BaseException:
+            workers.kill_all()  # one failed segment (or Stop) fails them all; don't wait for the rest
+            raise
+        finally:
+            pool.shutdown(wait=True)
+        t1 = time.monotonic()
+        listing = os.path.join(workdir, "segments.txt")
+        with open(listing, "w", encoding="utf-8") as f:
+            f.writelines(f"file '{os.path.basename(p)}'\n" for p in parts)
+        audio = []
+        for i, s in enumerate(probe.streams(source, "audio")):
+            audio += ["-map", f"1:{s['index']}", f"-c:a:{i}", "copy" if s["codec"] in mux.MP4_AUDIO else "aac"]
+        joined = os.path.join(workdir, "joined.mp4")
+        rc = subprocess.run(["ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
+                             "-f", "concat", "-safe", "0", "-i", listing, "-i", source,
+                             "-map", "0:v", "-c:v", "copy", *audio, "-movflags", "+faststart",
+                             "-f", "mp4", joined]).returncode
+        if rc != 0:
+            raise BurnInError(f"joining {len(parts)} segments failed: ffmpeg exited {rc}")
+        mux.commit(joined, output)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    t2 = time.monotonic()
+    return {"segments": len(segments), "threads": threads, "render_s": round(t1 - t0, 2),
+            "join_s": round(t2 - t1, 2), "media_s": frames[-1] if frames else None}
+
+
+# ---------- CLI ----------
+
+def _cmd_burnin(args) -> int:
+    mux.exit_on_sigterm()
+    try:
+        stats = burn_in(args.source, args.srt, args.output, args.jobs)
+    except (BurnInError, OSError) as e:
+        print(f"Error: burn-in failed: {e}", file=sys.stderr)
+        return 1
+    speed = ""
+    if stats["media_s"] and stats["render_s"]:
+        speed = f", {stats['media_s'] / stats['render_s']:.1f}x real time"
+    print(f"Burn-in: {stats['segments']} segment(s) x {stats['threads']} thread(s), "
+          f"render {stats['render_s']}s + join {stats['join_s']}s{speed}", file=sys.stderr)
+    print(args.output)
+    return 0
+
+
+def register(sub) -> None:
+    p = sub.add_parser("burnin", help="render a hard-subtitled copy in parallel keyframe-aligned segments")
+    p.add_argument("source")
+    p.add_argument("srt")
+    p.add_argument("--output", required=True, help="MP4 to write (atomically); printed when done")
+    p.add_argument("-j", "--jobs", type=int, default=None,
+                   help=f"parallel segments (default: ${JOBS_ENV}, else one per core)")
+    p.set_defaults(func=_cmd_burnin)
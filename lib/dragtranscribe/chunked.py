@@ -0,0 +1,250 @@
+# chunked.py — bounded-memory transcription of very long media
+#
+# whisper-cli loads its whole input as float32 (230 MB per hour of audio) on top of the
+# model, so a 10-hour recording needs well over 2 GB before inference starts. Chunked mode
+# streams 16 kHz mono PCM from ffmpeg one window at a time, runs whisper-cli on that window,
+# appends its segments (shifted by the window's offset) to the output SRT, and reuses the
+# buffer for the next window: peak memory depends on the window length, not the media's.
+# Each window ends at the quietest 100 ms of its last few seconds, so cuts rarely split words.
+# Besides the SRT, it can write the other output formats next to it (<output stem>.vtt/.txt
+# from the same cues, .json by merging whisper-cli's per-window -ojf output, with offsets
+# shifted), streamed window by window like the SRT.
+import json
+import os
+import subprocess
+import sys
+import time
+import wave
+
+from . import events, models, scheduler
+from .transcript import read_cues, srt_ts, write_srt, write_vtt
+
+RATE = 16000
+BYTES_PER_SECOND = RATE * 2            # s16le mono
+DEFAULT_WINDOW_S = 20 * 60
+MIN_WINDOW_S = 60
+MAX_WINDOW_S = 60 * 60
+CUT_SEARCH_S = 5.0
+CUT_FRAME = RATE // 10                 # 100 ms
+# Per second of window: our s16 buffer + the window WAV read back + whisper's float32 copy
+WINDOW_COST_PER_S = BYTES_PER_SECOND * 2 + scheduler.SAMPLE_BYTES_PER_SECOND
+
+FORMATS = ("srt", "vtt", "json", "txt")
+
+
+def window_for_target(peak_bytes: int, model: str) -> int:
+    """Longest window (seconds) that keeps model + window under peak_bytes."""
+    try:
+        base = scheduler.model_rss(model)
+    except models.UnknownModel:
+        base = os.path.getsize(model) if os.path.isfile(model) else 0
+    budget = peak_bytes - base - scheduler.JOB_OVERHEAD
+    return int(max(MIN_WINDOW_S, min(MAX_WINDOW_S, budget // WINDOW_COST_PER_S)))
+
+
+def quietest_cut(buf: memoryview, start: int, end: int) -> int:
+    """Byte offset (sample-aligned) of the quietest 100 ms frame's middle in buf[start:end]."""
+    samples = buf[start:end].cast("h")
+    best, best_energy = end, None
+    for i in range(0, len(samples) - CUT_FRAME + 1, CUT_FRAME):
+        energy = sum(map(abs, samples[i:i + CUT_FRAME]))
+        if best_energy is None or energy < best_energy:
+            best, best_energy = start + 2 * (i + CUT_FRAME // 2), energy
+    samples.release()
+    return best
+
+
+def _shift_json(item: dict, offset_ms: int) -> dict:
+    """A whisper-cli -ojf segment or token moved offset_ms later (offsets and timestamps)."""
+    if "offsets" in item:
+        item["offsets"] = {k: v + offset_ms for k, v in item["offsets"].items()}
+        item["timestamps"] = {k: srt_ts(v) for k, v in item["offsets"].items()}
+    for token in item.get("tokens", []):
+        _shift_json(token, offset_ms)
+    return item
+
+
+class ChunkedTranscriber:
+    """Transcribe input into an SRT at output, one window at a time."""
+
+    def __init__(self, input_path: str, output: str, model: str, whisper_args: list[str], *,
+                 window_s: int = DEFAULT_WINDOW_S, whisper_bin: str | None = None,
+                 formats: tuple[str, ...] = ("srt",)):
+        self.input = input_path
+        self.output = output
+        self.model = model
+        self.whisper_args = whisper_args
+        self.window_bytes = window_s * BYTES_PER_SECOND
+        self.whisper_bin = whisper_bin or os.environ.get("WHISPER_BIN", "whisper-cli")
+        self.scratch = output + ".chunk"
+        self.formats = tuple(dict.fromkeys(("srt", *formats)))
+        self.cues = 0
+        self._files: dict = {}
+        self._json_segments = 0
+
+    def _open_outputs(self) -> None:
+        stem = os.path.splitext(self.output)[0]
+        for fmt in self.formats:
+            self._files[fmt] = open(self.output if fmt == "srt" else f"{stem}.{fmt}", "w", encoding="utf-8")
+        if "vtt" in self._files:
+            self._files["vtt"].write("WEBVTT\n\n")
+
+    def _close_outputs(self) -> None:
+        if "json" in self._files:
+            if self._json_segments == 0:
+                self._files["json"].write('{"transcription": [')
+            self._files["json"].write("]}\n")
+        for f in self._files.values():
+            f.close()
+
+    def run(self) -> float:
+        """Returns the seconds of audio transcribed; raises ChildProcessError on failure."""
+        decoder = subprocess.Popen(
+            ["ffmpeg", "-hide_banner", "-loglevel", "error", "-i", self.input, "-vn",
+             "-f", "s16le", "-acodec", "pcm_s16le", "-ar", str(RATE), "-ac", "1", "-"],
+            stdout=subprocess.PIPE)
+        buf = bytearray(self.window_bytes)
+        view = memoryview(buf)
+        filled = 0
+        offset_bytes = 0
+        index = 0
+        rc = None
+        self._open_outputs()
+        try:
+            while True:
+                eof = False
+                while filled < self.window_bytes:
+                    n = decoder.stdout.readinto(view[filled:])
+                    if not n:
+                        eof = True
+                        break
+                    filled += n
+                filled -= filled % 2
+                if filled == 0:
+                    break
+                cut = filled
+                if not eof:
+                    search = min(filled, int(CUT_SEARCH_S * BYTES_PER_SECOND))
+                    cut = quietest_cut(view, filled - search - (filled - search) % 2, filled)
+                self._transcribe_window(view[:cut], offset_bytes, index)
+                # Carry the audio after the cut into the next window
+                view[:filled - cut] = view[cut:filled]
+                filled -= cut
+                offset_bytes += cut
+                index += 1
+                if eof and filled == 0:
+                    break
+            rc = decoder.wait()  # before the cleanup below, so our own kill is never blamed on ffmpeg
+        finally:
+            self._close_outputs()
+            view.release()
+            if decoder.poll() is None:
+                decoder.kill()
+            decoder.wait()
+            for ext in (".wav", ".srt", ".json"):
+                try:
+                    os.remove(self.scratch + ext)
+                except FileNotFoundError:
+                    pass
+        if rc != 0:
+            # Also mid-file: a decode error after some windows must not pass for a short file
+            raise ChildProcessError(f"ffmpeg could not decode {self.input} (exit {rc})")
+        return offset_bytes / BYTES_PER_SECOND
+
+    def _transcribe_window(self, pcm: memoryview, offset_bytes: int, index: int) -> None:
+        offset_ms = offset_bytes * 1000 // BYTES_PER_SECOND
+        with wave.open(self.scratch + ".wav", "wb") as w:
+            w.setnchannels(1)
+            w.setsampwidth(2)
+            w.setframerate(RATE)
+            w.writeframes(pcm)
+        t0 = time.monotonic()
+        fmt_args = ["-osrt", "-ojf"] if "json" in self.formats else ["-osrt"]
+        rc = subprocess.run([self.whisper_bin, "-m", self.model, "-f", self.scratch + ".wav",
+                             *self.whisper_args, *fmt_args, "-of", self.scratch]).returncode
+        if rc != 0:
+            raise ChildProcessError(f"whisper-cli failed on window {index} (exit {rc})")
+        n = 0
+        vtt, txt = self._files.get("vtt"), self._files.get("txt")
+        try:
+            with open(self.scratch + ".srt", encoding="utf-8", errors="replace") as f:
+                for start, end, body in read_cues(f):
+                    cue = [(start + offset_ms, end + offset_ms, body.strip())]
+                    write_srt(self._files["srt"], cue, first=self.cues + 1)
+                    if vtt:
+                        write_vtt(vtt, cue, header=False)
+                    if txt:
+                        txt.write(cue[0][2] + "\n")
+                    self.cues += 1
+                    n += 1
+        except FileNotFoundError:
+            pass
+        if "json" in self._files:
+            self._append_json(offset_ms)
+        for f in self._files.values():
+            f.flush()
+        seconds = len(pcm) / BYTES_PER_SECOND
+        events.emit("chunk_finished", index=index, offset_s=round(offset_ms / 1000, 3),
+                    duration_s=round(seconds, 3), segments=n,
+                    duration_ms=int((time.monotonic() - t0) * 1000))
+        print(f"Window {index + 1}: {srt_ts(offset_ms)} +{seconds / 60:.1f} min -> {n} segment(s)", flush=True)
+
+
+    def _append_json(self, offset_ms: int) -> None:
+        """Stream this window's -ojf segments into the merged JSON (header from the first window)."""
+        try:
+            with open(self.scratch + ".json", encoding="utf-8", errors="replace") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        out = self._files["json"]
+        if self._json_segments == 0:
+            head = {k: v for k, v in data.items() if k != "transcription"}
+            out.write(json.dumps(head, ensure_ascii=False)[:-1] + (", " if head else "") + '"transcription": [')
+        for seg in data.get("transcription", []):
+            seg = json.dumps(_shift_json(seg, offset_ms), ensure_ascii=False)
+            out.write(("," if self._json_segments else "") + seg)
+            self._json_segments += 1
+
+
+# ---------- CLI ----------
+
+def _cmd_chunked(args) -> int:
+    whisper_args = args.whisper_args[1:] if args.whisper_args[:1] == ["--"] else args.whisper_args
+    if args.window_s:
+        window = args.window_s
+    elif args.peak_mb:
+        window = window_for_target(int(args.peak_mb * 1024 * 1024), args.model)
+    else:
+        window = DEFAULT_WINDOW_S
+    formats = tuple(f for f in args.formats.split(",") if f)
+    unknown = set(formats) - set(FORMATS)
+    if unknown:
+        print(f"Error: unknown output format(s): {', '.join(sorted(unknown))}", file=sys.stderr)
+        return 2
+    print(f"Chunked mode: {window // 60} min windows", flush=True)
+    t0 = time.monotonic()
+    try:
+        seconds = ChunkedTranscriber(args.input, args.output, args.model, whisper_args, window_s=window,
+                                     formats=formats).run()
+    except ChildProcessError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    try:
+        models.record_run(args.model, seconds, time.monotonic() - t0)
+    except (models.UnknownModel, OSError):
+        pass
+    return 0
+
+
+def register(sub) -> None:
+    p = sub.add_parser("chunked", help="transcribe long media window by window with bounded memory")
+    p.add_argument("--input", required=True, help="media file (decoded by ffmpeg)")
+    p.add_argument("--output", required=True, help="SRT to write; other formats go next to it (<stem>.vtt, ...)")
+    p.add_argument("--formats", default="srt", help=f"comma-separated subset of {','.join(FORMATS)}")
+    p.add_argument("--model", required=True, help="ggml model path")
+    p.add_argument("--window-s", type=int, default=None, help="window length in seconds")
+    p.add_argument("--peak-mb", type=float, default=None,
+                   help="peak memory target; picks the longest window that fits with the model")
+    p.add_argument("whisper_args", nargs="*", help="after --: extra whisper-cli args (-l, -tr, -t ...)")
+    p.set_defaults(func=_cmd_chunked)
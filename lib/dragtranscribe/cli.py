@@ -0,0 +1,15 @@
+# cli.py — `bin/dragtranscribe <command>` entry point; each module registers its own subcommand
+import argparse
+
+from . import audiocache, burnin, chunked, digest, download, events, hls, index, live, models, mux, peers, probe, scheduler, scratch, store, transcript, warmup
+
+COMMAND_MODULES = (events, download, digest, models, store, peers, warmup, scheduler, chunked, scratch, audiocache, probe, mux, burnin, hls, index, transcript, live)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="dragtranscribe")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for mod in COMMAND_MODULES:
+        mod.register(sub)
+    args = parser.parse_args(argv)
+    return args.func(args) or 0
@@ -0,0 +1,215 @@
+# digest.py — cached integrity digests for model files (<model>.digest.json sidecar)
+#
+# Hashing a 3 GB model on every launch or job is too slow, so a verified model gets a
+# sidecar recording its size, mtime and inode together with two digests:
+#   sha256       plain SHA-256 of the file (what Hugging Face advertises; checked at download)
+#   tree_sha256  SHA-256 over the SHA-256 of each fixed-size leaf, computable in parallel
+# check() is the O(1) hot-path test: the sidecar exists and the file's stat still matches.
+# When the stat changed (touch, copy, restore) verify() recomputes the tree hash across all
+# cores and only falls back to a sequential full SHA-256 when there is nothing to compare to.
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+LEAF_SIZE = 64 * 1024 * 1024
+READ_SIZE = 4 * 1024 * 1024
+
+
+class VerificationError(Exception):
+    pass
+
+
+def sidecar_path(path: str) -> str:
+    return path + ".digest.json"
+
+
+def _stat_key(st: os.stat_result) -> dict:
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "inode": st.st_ino}
+
+
+def load(path: str) -> dict | None:
+    try:
+        with open(sidecar_path(path), encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return data if isinstance(data, dict) and "sha256" in data else None
+
+
+def check(path: str) -> bool:
+    """O(1): True if path has a sidecar whose size/mtime/inode match the file.
+    A truncated or replaced file fails because its stat no longer matches.
+    """
+    data = load(path)
+    if data is None:
+        return False
+    try:
+        st = os.stat(path)
+    except OSError:
+        return False
+    return all(data.get(k) == v for k, v in _stat_key(st).items())
+
+
+def record(path: str, sha256: str, tree_sha256: str) -> dict:
+    st = os.stat(path)
+    data = {**_stat_key(st), "sha256": sha256, "tree_sha256": tree_sha256,
+            "leaf_size": LEAF_SIZE, "verified_at": int(time.time())}
+    tmp = sidecar_path(path) + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=1)
+    os.replace(tmp, sidecar_path(path))
+    return data
+
+
+def _try_record(path: str, sha256: str, tree_sha256: str) -> None:
+    """record(), but a sidecar that cannot be written (read-only models dir) only costs speed."""
+    try:
+        record(path, sha256, tree_sha256)
+    except OSError as e:
+        print(f"Warn: digest not cached ({e}); the next check will rehash", file=sys.stderr)
+
+
+# ---------- Hashing ----------
+
+class TreeHasher:
+    """Incremental tree hash: feed bytes in order, get the same value as tree_hash()."""
+
+    def __init__(self, leaf_size: int = LEAF_SIZE):
+        self.leaf_size = leaf_size
+        self._leaf = hashlib.sha256()
+        self._leaf_len = 0
+        self._leaves: list[bytes] = []
+        self._size = 0
+
+    def update(self, data) -> None:
+        mv = memoryview(data)
+        self._size += len(mv)
+        while mv:
+            take = min(len(mv), self.leaf_size - self._leaf_len)
+            self._leaf.update(mv[:take])
+            self._leaf_len += take
+            mv = mv[take:]
+            if self._leaf_len == self.leaf_size:
+                self._leaves.append(self._leaf.digest())
+                self._leaf = hashlib.sha256()
+                self._leaf_len = 0
+
+    def hexdigest(self) -> str:
+        leaves = list(self._leaves)
+        if self._leaf_len or not leaves:
+            leaves.append(self._leaf.digest())
+        return _combine(leaves, self._size)
+
+
+def _combine(leaves: list[bytes], size: int) -> str:
+    return hashlib.sha256(b"".join(leaves) + size.to_bytes(8, "big")).hexdigest()
+
+
+def _hash_leaf(fd: int, offset: int, length: int) -> bytes:
+    h = hashlib.sha256()
+    while length:
+        buf = os.pread(fd, min(READ_SIZE, length), offset)
+        if not buf:
+            raise VerificationError("file shrank while hashing")
+        h.update(buf)  # hashlib releases the GIL for large buffers
+        offset += len(buf)
+        length -= len(buf)
+    return h.digest()
+
+
+def tree_hash(path: str, workers: int | None = None) -> str:
+    """Parallel tree hash: leaves are hashed concurrently across threads."""
+    size = os.path.getsize(path)
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        offsets = range(0, size, LEAF_SIZE) if size else [0]
+        with ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 4) as pool:
+            leaves = list(pool.map(lambda off: _hash_leaf(fd, off, min(LEAF_SIZE, size - off)), offsets))
+    finally:
+        os.close(fd)
+    return _combine(leaves, size)
+
+
+def full_hash(path: str) -> tuple[str, str]:
+    """One sequential pass computing (sha256, tree_sha256)."""
+    h = hashlib.sha256()
+    tree = TreeHasher()
+    with open(path, "rb", buffering=0) as f:
+        while True:
+            buf = f.read(READ_SIZE)
+            if not buf:
+                break
+            h.update(buf)
+            tree.update(buf)
+    return h.hexdigest(), tree.hexdigest()
+
+
+def verify(path: str, expected_sha256: str | None = None, expected_size: int | None = None) -> str:
+    """Return the model's SHA-256, using the sidecar when possible; raises VerificationError.
+
+    Without a sidecar or an expected digest the current content is recorded as the baseline
+    (after the expected_size check, when one is known).
+    """
+    st = os.stat(path)
+    if expected_size is not None and st.st_size != expected_size:
+        raise VerificationError(f"size {st.st_size} != expected {expected_size} (truncated?)")
+    data = load(path)
+    if data is not None and data.get("size") not in (None, st.st_size):
+        raise VerificationError(f"size {st.st_size} != verified size {data['size']} (truncated?)")
+    if data is not None and check(path):
+        sha = data["sha256"]
+    elif data is not None and data.get("tree_sha256") and data.get("leaf_size") == LEAF_SIZE:
+        if tree_hash(path) != data["tree_sha256"]:
+            raise VerificationError("content changed since it was verified")
+        sha = data["sha256"]
+        _try_record(path, sha, data["tree_sha256"])
+    else:
+        sha, tree = full_hash(path)
+        if data is not None and data.get("sha256") not in (None, sha):
+            raise VerificationError("content changed since it was verified")
+        if expected_sha256 is None or expected_sha256.lower() == sha:
+            _try_record(path, sha, tree)
+    if expected_sha256 is not None and expected_sha256.lower() != sha:
+        raise VerificationError(f"SHA-256 {sha} != expected {expected_sha256}")
+    return sha
+
+
+# ---------- CLI ----------
+
+def _cmd_check(args) -> int:
+    return 0 if check(args.file) else 1
+
+
+def _cmd_verify(args) -> int:
+    expected_sha, expected_size = args.sha256, None
+    if args.url and not (expected_sha or check(args.file)):
+        from . import download
+        try:
+            info = download.probe(args.url)
+            expected_sha, expected_size = info["sha256"], info["total"]
+        except OSError as e:
+            print(f"Warn: could not reach {args.url} for the reference digest: {e}", file=sys.stderr)
+    t0 = time.monotonic()
+    try:
+        sha = verify(args.file, expected_sha, expected_size)
+    except (VerificationError, OSError) as e:
+        print(f"Error: {args.file} failed verification: {e}", file=sys.stderr)
+        return 1
+    print(f"{sha}  {args.file}  ({time.monotonic() - t0:.2f}s)")
+    return 0
+
+
+def register(sub) -> None:
+    p = sub.add_parser("digest", help="cached model integrity checks")
+    dsub = p.add_subparsers(dest="digest_command", required=True)
+    c = dsub.add_parser("check", help="O(1) check against the digest sidecar (exit 1 if stale/missing)")
+    c.add_argument("file")
+    c.set_defaults(func=_cmd_check)
+    v = dsub.add_parser("verify", help="verify (rehashing only when needed) and refresh the sidecar")
+    v.add_argument("file")
+    v.add_argument("--sha256", help="expected SHA-256")
+    v.add_argument("--url", help="source URL to fetch the advertised digest and size from")
+    v.set_defaults(func=_cmd_verify)
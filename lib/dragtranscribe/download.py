@@ -0,0 +1,555 @@
+# download.py — resumable, parallel-range model downloader with SHA-256 verification
+#
+# The file is fetched as fixed-size chunks over several connections into <dest>.part.
+# <dest>.part.json (the journal) records which chunks are complete, so an interrupted
+# download resumes where it stopped. A hasher thread follows the contiguous completed
+# prefix of the .part file, so SHA-256 verification finishes moments after the last byte
+# arrives. Only a verified file is renamed (atomically) to <dest>; a truncated or corrupt
+# download never appears under the final name. The same pass computes the tree hash for
+# the <dest>.digest.json sidecar (see digest.py), so later checks need no rehash.
+import hashlib
+import http.client
+import json
+import os
+import re
+import sys
+import threading
+import time
+import urllib.request
+from collections.abc import Callable
+
+from . import events
+from .digest import TreeHasher, record as record_digest
+
+DEFAULT_CONNECTIONS = 4
+DEFAULT_CHUNK_SIZE = 16 * 1024 * 1024
+READ_SIZE = 256 * 1024
+USER_AGENT = "DragTranscribe-downloader/1.0"
+
+_SHA256_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+class DownloadError(Exception):
+    pass
+
+
+class ChecksumMismatch(DownloadError):
+    pass
+
+
+def part_path(dest: str) -> str:
+    return dest + ".part"
+
+
+def journal_path(dest: str) -> str:
+    return dest + ".part.json"
+
+
+# ---------- HTTP helpers ----------
+
+class _RecordingRedirectHandler(urllib.request.HTTPRedirectHandler):
+    """Keeps the headers of every redirect hop (Hugging Face puts X-Linked-Etag there)."""
+
+    def __init__(self):
+        self.hops: list = []
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        self.hops.append(headers)
+        return super().redirect_request(req, fp, code, msg, headers, newurl)
+
+
+def _advertised_sha256(header_sets) -> str | None:
+    for headers in header_sets:
+        for name in ("X-Linked-Etag", "ETag"):
+            value = (headers.get(name) or "").strip().strip('"').lower()
+            if value.startswith("w/"):
+                continue
+            if _SHA256_RE.match(value):
+                return value
+    return None
+
+
+def _open(url: str, start: int | None = None, end: int | None = None, timeout: float = 30.0,
+          handler: _RecordingRedirectHandler | None = None):
+    req = urllib.request.Request(url, headers={"User-Agent": USER_AGENT})
+    if start is not None:
+        req.add_header("Range", f"bytes={start}-{'' if end is None else end}")
+    opener = urllib.request.build_opener(handler or urllib.request.HTTPRedirectHandler())
+    return opener.open(req, timeout=timeout)
+
+
+def probe(url: str, timeout: float = 30.0) -> dict:
+    """Learn total size, range support, validator and advertised SHA-256 with a 1-byte GET."""
+    handler = _RecordingRedirectHandler()
+    with _open(url, 0, 0, timeout, handler) as resp:
+        status = resp.status
+        headers = resp.headers
+    total = None
+    ranges = False
+    if status == 206:
+        m = re.match(r"bytes\s+\d+-\d+/(\d+)", headers.get("Content-Range", ""))
+        if m:
+            total = int(m.group(1))
+            ranges = True
+    if total is None and headers.get("Content-Length"):
+        total = int(headers["Content-Length"])
+    return {
+        "url": url,
+        "total": total,
+        "ranges": ranges,
+        "validator": headers.get("ETag") or headers.get("Last-Modified") or "",
+        "sha256": _advertised_sha256(handler.hops + [headers]),
+    }
+
+
+# ---------- Journal ----------
+
+def _load_journal(dest: str) -> dict | None:
+    try:
+        with open(journal_path(dest), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _save_journal(dest: str, journal: dict) -> None:
+    tmp = journal_path(dest) + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(journal, f)
+    os.replace(tmp, journal_path(dest))
+
+
+def _fsync_dir(path: str) -> None:
+    try:
+        fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+# ---------- Downloader ----------
+
+class Downloader:
+    """One download of url -> dest. Call run(); it returns the verified SHA-256 hex digest.
+
+    on_progress receives dicts with downloaded/total/hashed bytes and the current rate.
+    """
+
+    def __init__(self, url: str, dest: str, *, sha256: str | None = None,
+                 connections: int = DEFAULT_CONNECTIONS, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 timeout: float = 30.0, retries: int = 8, retry_delay: float = 1.0,
+                 on_progress: Callable[[dict], None] | None = None, progress_interval: float = 0.5):
+        self.url = url
+        self.dest = dest
+        self.expected = sha256.lower() if sha256 else None
+        self.connections = max(1, connections)
+        self.chunk_size = chunk_size
+        self.timeout = timeout
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.on_progress = on_progress
+        self.progress_interval = progress_interval
+
+        self._cond = threading.Condition()
+        self._done: set[int] = set()
+        self._pending: list[int] = []
+        self._received = 0
+        self._hashed = 0
+        self._error: BaseException | None = None
+        self._last_progress = 0.0
+        self._report_lock = threading.Lock()
+        self._rate_mark = (time.monotonic(), 0)
+        self.rate_bps = 0.0
+
+    # -- public --
+
+    def run(self) -> str:
+        info = probe(self.url, self.timeout)
+        total = info["total"]
+        if self.expected is None:
+            self.expected = info["sha256"]
+        if not info["ranges"] or not total:
+            return self._run_single(total)
+
+        self.total = total
+        self.nchunks = (total + self.chunk_size - 1) // self.chunk_size
+        journal = _load_journal(self.dest)
+        part = part_path(self.dest)
+        resumable = (
+            journal is not None
+            and os.path.exists(part)
+            # same URL, or any source naming the same content (a SHA-256 ETag: LAN peers)
+            and (journal.get("url") == self.url or _SHA256_RE.match(info["validator"].strip('"')))
+            and journal.get("total") == total
+            and journal.get("chunk_size") == self.chunk_size
+            and journal.get("validator") == info["validator"]
+        )
+        if resumable:
+            self._done = {i for i in journal.get("done", []) if 0 <= i < self.nchunks}
+        else:
+            self._done = set()
+            with open(part, "wb") as f:
+                f.truncate(total)
+        self.journal = {"url": self.url, "total": total, "chunk_size": self.chunk_size,
+                        "validator": info["validator"], "done": sorted(self._done)}
+        _save_journal(self.dest, self.journal)
+
+        self._pending = [i for i in range(self.nchunks) if i not in self._done]
+        self._received = sum(self._chunk_len(i) for i in self._done)
+        self._rate_mark = (time.monotonic(), self._received)
+        events.emit("download_started", url=self.url, path=self.dest, total=total,
+                    resumed_bytes=self._received, connections=self.connections)
+
+        fd = os.open(part, os.O_RDWR)
+        try:
+            hasher = threading.Thread(target=self._hash_loop, args=(part,), daemon=True)
+            hasher.start()
+            workers = [threading.Thread(target=self._worker, args=(fd,), daemon=True)
+                       for _ in range(min(self.connections, max(1, len(self._pending))))]
+            for w in workers:
+                w.start()
+            for w in workers:
+                w.join()
+            if self._error is None and len(self._done) < self.nchunks:
+                self._fail(DownloadError("download incomplete"))
+            hasher.join()
+            if self._error is not None:
+                raise self._error
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        return self._finish(part, self._digest, self._tree)
+
+    # -- chunked path --
+
+    def _chunk_len(self, i: int) -> int:
+        return min(self.chunk_size, self.total - i * self.chunk_size)
+
+    def _fail(self, exc: BaseException) -> None:
+        with self._cond:
+            if self._error is None:
+                self._error = exc
+            self._cond.notify_all()
+
+    def _worker(self, fd: int) -> None:
+        while True:
+            with self._cond:
+                if self._error is not None or not self._pending:
+                    return
+                i = self._pending.pop(0)
+            try:
+                self._fetch_chunk(fd, i)
+            except BaseException as e:
+                self._fail(e)
+                return
+            try:
+                os.fsync(fd)  # the journal must never count bytes that are not on disk yet
+            except OSError as e:
+                self._fail(e)
+                return
+            with self._cond:
+                self._done.add(i)
+                self.journal["done"] = sorted(self._done)
+                _save_journal(self.dest, self.journal)
+                self._cond.notify_all()
+
+    def _fetch_chunk(self, fd: int, i: int) -> None:
+        start = i * self.chunk_size
+        end = start + self._chunk_len(i) - 1
+        pos = start
+        failures = 0
+        while pos <= end:
+            try:
+                with _open(self.url, pos, end, self.timeout) as resp:
+                    if resp.status != 206:
+                        raise DownloadError(f"server ignored range request (HTTP {resp.status})")
+                    cr = resp.headers.get("Content-Range", "")
+                    if not cr.startswith(f"bytes {pos}-"):
+                        raise DownloadError(f"unexpected Content-Range {cr!r} for offset {pos}")
+                    while pos <= end:
+                        buf = resp.read(min(READ_SIZE, end - pos + 1))
+                        if not buf:
+                            break
+                        os.pwrite(fd, buf, pos)
+                        pos += len(buf)
+                        failures = 0
+                        self._add_received(len(buf))
+                if pos <= end:
+                    raise ConnectionError("connection closed mid-range")
+            except (OSError, http.client.HTTPException) as e:
+                if self._error is not None:
+                    raise  # another worker already failed; never journal this chunk as done
+                failures += 1
+                if failures > self.retries:
+                    raise DownloadError(f"chunk {i} failed after {self.retries} retries: {e}") from e
+                time.sleep(min(self.retry_delay * 2 ** (failures - 1), 30.0))
+
+    def _hash_loop(self, part: str) -> None:
+        h = hashlib.sha256()
+        tree = TreeHasher()
+        with open(part, "rb", buffering=0) as f:
+            for i in range(self.nchunks):
+                with self._cond:
+                    while i not in self._done and self._error is None:
+                        self._cond.wait(1.0)
+                    if self._error is not None:
+                        return
+                f.seek(i * self.chunk_size)
+                remaining = self._chunk_len(i)
+                while remaining:
+                    buf = f.read(min(1024 * 1024, remaining))
+                    if not buf:
+                        self._fail(DownloadError("short read while hashing"))
+                        return
+                    h.update(buf)
+                    tree.update(buf)
+                    remaining -= len(buf)
+                    with self._cond:
+                        self._hashed += len(buf)
+                self._report()
+        self._digest = h.hexdigest()
+        self._tree = tree.hexdigest()
+        self._report(force=True)
+
+    # -- single-stream path (no range support) --
+
+    def _run_single(self, total: int | None) -> str:
+        self.total = total or 0
+        part = part_path(self.dest)
+        h = hashlib.sha256()
+        tree = TreeHasher()
+        events.emit("download_started", url=self.url, path=self.dest, total=total,
+                    resumed_bytes=0, connections=1)
+        with _open(self.url, timeout=self.timeout) as resp, open(part, "wb") as f:
+            while True:
+                buf = resp.read(READ_SIZE)
+                if not buf:
+                    break
+                f.write(buf)
+                h.update(buf)
+                tree.update(buf)
+                self._hashed += len(buf)
+                self._add_received(len(buf))
+            f.flush()
+            os.fsync(f.fileno())
+        if total and self._received != total:
+            os.remove(part)
+            raise DownloadError(f"short download: {self._received} of {total} bytes")
+        self.total = self._received
+        return self._finish(part, h.hexdigest(), tree.hexdigest())
+
+    # -- shared --
+
+    def _add_received(self, n: int) -> None:
+        with self._cond:
+            self._received += n
+        self._report()
+
+    def _report(self, force: bool = False) -> None:
+        with self._report_lock:
+            now = time.monotonic()
+            if not force and now - self._last_progress < self.progress_interval:
+                return
+            self._last_progress = now
+            t0, b0 = self._rate_mark
+            if now - t0 >= 1.0:
+                self.rate_bps = (self._received - b0) / (now - t0)
+                self._rate_mark = (now, self._received)
+            info = {"downloaded": self._received, "total": self.total,
+                    "hashed": self._hashed, "rate_bps": int(self.rate_bps)}
+            events.emit("download_progress", **info)
+            if self.on_progress is not None:
+                self.on_progress(info)
+
+    def _finish(self, part: str, digest: str, tree: str) -> str:
+        if self.expected and digest != self.expected:
+            for p in (part, journal_path(self.dest)):
+                try:
+                    os.remove(p)
+                except OSError:
+                    pass
+            raise ChecksumMismatch(f"SHA-256 mismatch: got {digest}, expected {self.expected}")
+        os.replace(part, self.dest)
+        _fsync_dir(self.dest)
+        record_digest(self.dest, digest, tree)
+        try:
+            os.remove(journal_path(self.dest))
+        except OSError:
+            pass
+        events.emit("download_finished", path=self.dest, sha256=digest, verified=bool(self.expected))
+        return digest
+
+
+def download(url: str, dest: str, **kwargs) -> str:
+    return Downloader(url, dest, **kwargs).run()
+
+
+# ---------- Self-test (local flaky server) ----------
+
+def _flaky_server(data: bytes, state: dict):
+    """Range-capable, throttled HTTP server on localhost. state["mode"] "half" cuts every
+    response off halfway through, "dead" right after the headers."""
+    import http.server
+    digest = hashlib.sha256(data).hexdigest()
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            m = re.match(r"bytes=(\d+)-(\d*)", self.headers.get("Range", ""))
+            start = int(m.group(1)) if m else 0
+            end = int(m.group(2)) if m and m.group(2) else len(data) - 1
+            body = data[start:end + 1]
+            self.send_response(206 if m else 200)
+            if m:
+                self.send_header("Content-Range", f"bytes {start}-{end}/{len(data)}")
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("ETag", f'"{digest}"')
+            self.end_headers()
+            with state["lock"]:
+                mode = state["mode"] if len(body) > 1 else None
+            sent = 0
+            limit = {"half": len(body) // 2, "dead": 0}.get(mode, len(body))
+            while sent < limit:
+                piece = body[sent:min(limit, sent + 16 * 1024)]
+                self.wfile.write(piece)
+                sent += len(piece)
+                time.sleep(0.001)  # throttle
+            with state["lock"]:
+                state["served"] += sent
+            if mode:
+                self.close_connection = True
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def selftest() -> list[str]:
+    """Interrupted download -> resume -> verified file, against a local dropping server.
+
+    Returns the failed checks (empty when everything passed).
+    """
+    import tempfile
+    data = os.urandom(3 * 1024 * 1024 + 12345)
+    expected = hashlib.sha256(data).hexdigest()
+    state = {"lock": threading.Lock(), "mode": None, "served": 0}
+    server = _flaky_server(data, state)
+    url = f"http://127.0.0.1:{server.server_address[1]}/model.bin"
+    failures = []
+    try:
+        with tempfile.TemporaryDirectory(prefix="dragtranscribe-dl-test-") as d:
+            dest = os.path.join(d, "model.bin")
+            opts = {"connections": 4, "chunk_size": 256 * 1024, "retry_delay": 0.01}
+
+            # 1. The server goes dead partway: retries run out, .part + journal remain
+            class Interrupted(Downloader):
+                def _fetch_chunk(self, fd, i):
+                    if len(self._done) >= 4:
+                        state["mode"] = "dead"
+                    super()._fetch_chunk(fd, i)
+            try:
+                Interrupted(url, dest, sha256=expected, retries=1, **opts).run()
+                failures.append("download through a dropping server should have failed")
+            except DownloadError:
+                pass
+            journal = _load_journal(dest) or {}
+            done = len(journal.get("done", []))
+            if not done or not os.path.exists(part_path(dest)):
+                failures.append("no resumable state (journal/.part) after the interruption")
+
+            # 2. Resume; the first ranges are cut off mid-way and must be re-requested from there
+            state.update(mode=None, served=0)
+            drops = {"left": 3}
+
+            class Flaky(Downloader):
+                def _fetch_chunk(self, fd, i):
+                    with state["lock"]:
+                        state["mode"] = "half" if drops["left"] > 0 else None
+                        drops["left"] -= 1
+                    super()._fetch_chunk(fd, i)
+            digest = Flaky(url, dest, sha256=expected, **opts).run()
+            if digest != expected:
+                failures.append(f"SHA-256 {digest} != {expected}")
+            with open(dest, "rb") as f:
+                if f.read() != data:
+                    failures.append("downloaded bytes differ from the source")
+            if state["served"] >= len(data):
+                failures.append(f"resume re-fetched {state['served']} of {len(data)} bytes")
+            if os.path.exists(part_path(dest)) or os.path.exists(journal_path(dest)):
+                failures.append(".part/journal left behind after success")
+    finally:
+        server.shutdown()
+        server.server_close()
+    return failures
+
+
+# ---------- CLI ----------
+
+def _fmt_bytes(n: float) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if n < 1024 or unit == "GB":
+            return f"{n:.1f} {unit}" if unit != "B" else f"{int(n)} B"
+        n /= 1024
+    return f"{n:.1f} GB"
+
+
+def _cmd_download(args) -> int:
+    if args.selftest:
+        failures = selftest()
+        for f in failures:
+            print(f"FAIL: {f}", file=sys.stderr)
+        print("download self-test: " + ("failed" if failures else "ok"))
+        return 1 if failures else 0
+    if not args.url or not args.dest:
+        print("Error: url and dest are required", file=sys.stderr)
+        return 2
+    last = {"t": 0.0}
+
+    def on_progress(p):
+        now = time.monotonic()
+        if now - last["t"] < args.print_interval and p["downloaded"] < p["total"]:
+            return
+        last["t"] = now
+        pct = f" ({100 * p['downloaded'] / p['total']:.0f}%)" if p["total"] else ""
+        print(f"⬇️  {_fmt_bytes(p['downloaded'])} / {_fmt_bytes(p['total'])}{pct}  "
+              f"{_fmt_bytes(p['rate_bps'])}/s  verified {_fmt_bytes(p['hashed'])}", flush=True)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.dest)), exist_ok=True)
+    from . import peers
+    try:
+        digest = peers.fetch(args.url, args.dest, sha256=args.sha256 or os.environ.get("MODEL_SHA256"),
+                             peers=[] if args.no_peers else None, connections=args.connections,
+                             chunk_size=args.chunk_mb * 1024 * 1024, on_progress=on_progress)
+    except ChecksumMismatch as e:
+        events.emit("failed", stage="download", exit_code=3, error=str(e))
+        print(f"Error: {e}", file=sys.stderr)
+        return 3
+    except (DownloadError, OSError, http.client.HTTPException) as e:
+        events.emit("failed", stage="download", exit_code=2, error=str(e))
+        print(f"Error: download failed: {e} (run again to resume)", file=sys.stderr)
+        return 2
+    print(f"SHA-256: {digest}")
+    return 0
+
+
+def register(sub) -> None:
+    p = sub.add_parser("download", help="resumable parallel download with SHA-256 verification")
+    p.add_argument("url", nargs="?")
+    p.add_argument("dest", nargs="?")
+    p.add_argument("--sha256", help="expected digest (default: $MODEL_SHA256 or the server's advertised one)")
+    p.add_argument("--connections", type=int, default=DEFAULT_CONNECTIONS)
+    p.add_argument("--chunk-mb", type=int, default=DEFAULT_CHUNK_SIZE // (1024 * 1024))
+    p.add_argument("--print-interval", type=float, default=2.0, help="seconds between progress lines")
+    p.add_argument("--no-peers", action="store_true", help="skip $DRAGTRANSCRIBE_PEERS; use the URL only")
+    p.add_argument("--selftest", action="store_true",
+                   help="interrupt, resume and verify a download from a local throttling, dropping server")
+    p.set_defaults(func=_cmd_download)
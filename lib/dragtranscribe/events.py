@@ -0,0 +1,235 @@
+# events.py — JSONL event stream written by bin/transcribe.sh (opt-in)
+#
+# transcribe.sh emits one JSON object per line when DRAGTRANSCRIBE_EVENT_FD (an inherited
+# file descriptor) or DRAGTRANSCRIBE_EVENT_FILE (a file or FIFO) is set. Every event has
+# "event", "ts_ms" and "pid"; job-level events also carry "file". Event vocabulary:
+#
+#   run_started      target
+#   job_started
+#   stage_started    stage
+#   stage_finished   stage, status, duration_ms
+#   language_detected language, probability (null when forced/unknown), forced
+#   model_selected   route ("en" or "multilingual"), model, task ("transcribe"/"translate"),
+#                    detect_model (model the language detection ran on; "" when forced)
+#   output_written   kind, path
+#   skipped          reason
+#   failed           stage, exit_code
+#   job_finished     exit_code, duration_ms
+#   run_finished     processed, skipped, failed
+#   download_started url, path, total, resumed_bytes, connections
+#   download_progress downloaded, total, hashed, rate_bps
+#   download_finished path, sha256, verified
+#   model_evicted    model, path, size
+#   chunk_finished   index, offset_s, duration_s, segments, duration_ms (chunked mode)
+#   job_admitted     estimate_bytes, running (dragtranscribe batch / the app's scheduler)
+#   mux_finished     path, container, bytes, mux_ms, fsync_ms, faststart
+#   burnin_segment   index, start_s, frames, duration_ms (dragtranscribe burnin workers)
+#   first_segment    after_ms (time from whisper-cli start to its first printed segment)
+#   segment          index, start_ms, end_ms, text (live, as whisper-cli prints them)
+#
+# Consumers (the GUI, metrics exporters, benchmarks) should read this instead of
+# scraping the human-readable stdout.
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from collections.abc import Callable, Iterable, Iterator
+
+EVENT_FD_ENV = "DRAGTRANSCRIBE_EVENT_FD"
+EVENT_FILE_ENV = "DRAGTRANSCRIBE_EVENT_FILE"
+
+
+# ---------- Emitting (Python helpers run by transcribe.sh / download_model.sh) ----------
+
+_emit_lock = threading.Lock()
+_emit_stream = None
+_emit_opened = False
+
+
+def _event_stream():
+    global _emit_stream, _emit_opened
+    if not _emit_opened:
+        _emit_opened = True
+        try:
+            if os.environ.get(EVENT_FD_ENV, "").isdigit():
+                _emit_stream = os.fdopen(int(os.environ[EVENT_FD_ENV]), "w", encoding="utf-8", closefd=False)
+            elif os.environ.get(EVENT_FILE_ENV):
+                _emit_stream = open(os.environ[EVENT_FILE_ENV], "a", encoding="utf-8")
+        except OSError:
+            _emit_stream = None
+    return _emit_stream
+
+
+def emit(event: str, **fields) -> None:
+    """Write one event in the same shape as transcribe.sh's emit_event; no-op unless enabled."""
+    stream = _event_stream()
+    if stream is None:
+        return
+    forward({"event": event, "ts_ms": int(time.time() * 1000), "pid": os.getpid(), **fields})
+
+
+def forward(record: dict) -> None:
+    """Pass an already-built event (e.g. from a child's EventPipe) on to this process's stream."""
+    stream = _event_stream()
+    if stream is None:
+        return
+    with _emit_lock:
+        try:
+            stream.write(json.dumps(record) + "\n")
+            stream.flush()
+        except (OSError, ValueError):
+            pass
+
+
+# ---------- Reading ----------
+
+def parse_line(line: str) -> dict | None:
+    """Decode one JSONL line; returns None for blank or malformed lines."""
+    line = line.strip()
+    if not line:
+        return None
+    try:
+        ev = json.loads(line)
+    except ValueError:
+        return None
+    return ev if isinstance(ev, dict) and "event" in ev else None
+
+
+def iter_events(stream: Iterable[str]) -> Iterator[dict]:
+    for line in stream:
+        ev = parse_line(line)
+        if ev is not None:
+            yield ev
+
+
+class EventPipe:
+    """A pipe whose write end is handed to a child process as DRAGTRANSCRIBE_EVENT_FD.
+
+    Usage: build the child env with ``env()``, pass ``pass_fds`` to Popen, then call
+    ``start(on_event)`` right after spawning; ``join()`` once the child has exited.
+    """
+
+    def __init__(self):
+        self._r, self._w = os.pipe()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def pass_fds(self) -> tuple[int, ...]:
+        return (self._w,)
+
+    def env(self) -> dict[str, str]:
+        return {EVENT_FD_ENV: str(self._w)}
+
+    def start(self, on_event: Callable[[dict], None]) -> None:
+        # The parent must drop its copy of the write end, or EOF never arrives.
+        os.close(self._w)
+        self._thread = threading.Thread(target=self._read_loop, args=(on_event,), daemon=True)
+        self._thread.start()
+
+    def _read_loop(self, on_event):
+        with os.fdopen(self._r, "r", encoding="utf-8", errors="replace") as f:
+            for ev in iter_events(f):
+                try:
+                    on_event(ev)
+                except Exception:
+                    pass
+
+    def close(self) -> None:
+        """Release both ends when the child could not be started."""
+        for fd in (self._r, self._w):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+    def join(self, timeout: float | None = 5.0) -> None:
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+
+# ---------- Summaries (benchmarks / metrics) ----------
+
+def summarize(events: Iterable[dict]) -> dict:
+    """Aggregate stage durations and job outcomes from an event stream."""
+    stages: dict[str, list[int]] = {}
+    jobs = {"finished": 0, "failed": 0, "skipped": 0}
+    skip_reasons: dict[str, int] = {}
+    languages: dict[str, int] = {}
+    routes: dict[str, int] = {}
+    mux = {"files": 0, "bytes": 0, "mux_ms": 0, "fsync_ms": 0}
+    first_segment: list[int] = []
+    for ev in events:
+        kind = ev.get("event")
+        if kind == "stage_finished":
+            stages.setdefault(ev.get("stage", "?"), []).append(int(ev.get("duration_ms") or 0))
+        elif kind == "job_finished":
+            jobs["finished"] += 1
+        elif kind == "failed":
+            jobs["failed"] += 1
+        elif kind == "skipped":
+            jobs["skipped"] += 1
+            reason = ev.get("reason", "?")
+            skip_reasons[reason] = skip_reasons.get(reason, 0) + 1
+        elif kind == "language_detected":
+            lang = ev.get("language", "?")
+            languages[lang] = languages.get(lang, 0) + 1
+        elif kind == "model_selected":
+            route = f"{ev.get('route', '?')}:{ev.get('model', '?')}"
+            routes[route] = routes.get(route, 0) + 1
+        elif kind == "mux_finished":
+            mux["files"] += 1
+            for key in ("bytes", "mux_ms", "fsync_ms"):
+                mux[key] += int(ev.get(key) or 0)
+        elif kind == "first_segment":
+            first_segment.append(int(ev.get("after_ms") or 0))
+
+    stage_stats = {
+        name: {
+            "count": len(ds),
+            "total_ms": sum(ds),
+            "mean_ms": round(statistics.fmean(ds), 1),
+            "median_ms": statistics.median(ds),
+            "max_ms": max(ds),
+        }
+        for name, ds in stages.items()
+    }
+    if mux["bytes"]:
+        gb = mux["bytes"] / 1e9
+        mux["s_per_gb"] = round(mux["mux_ms"] / 1000 / gb, 2)
+        mux["fsync_s_per_gb"] = round(mux["fsync_ms"] / 1000 / gb, 2)
+    return {"stages": stage_stats, "jobs": jobs, "skip_reasons": skip_reasons, "languages": languages,
+            "routes": routes, "mux": mux,
+            "first_segment_ms": statistics.median(first_segment) if first_segment else None}
+
+
+def _cmd_summary(args) -> int:
+    with (open(args.file, encoding="utf-8") if args.file != "-" else sys.stdin) as f:
+        summary = summarize(iter_events(f))
+    if args.json:
+        print(json.dumps(summary, indent=2))
+        return 0
+    j = summary["jobs"]
+    print(f"jobs: finished={j['finished']}  failed={j['failed']}  skipped={j['skipped']}")
+    for name, st in summary["stages"].items():
+        print(f"{name:<12} n={st['count']:<5} total={st['total_ms']}ms  "
+              f"mean={st['mean_ms']}ms  median={st['median_ms']}ms  max={st['max_ms']}ms")
+    for route, n in summary["routes"].items():
+        print(f"route {route}: {n}")
+    m = summary["mux"]
+    if m["files"] and m["bytes"]:
+        print(f"mux: {m['files']} file(s), {m['bytes'] / 1e9:.2f} GB, {m['s_per_gb']} s/GB "
+              f"(fsync {m['fsync_s_per_gb']} s/GB)")
+    if summary["first_segment_ms"] is not None:
+        print(f"time to first subtitle: median {summary['first_segment_ms'] / 1000:.1f}s")
+    return 0
+
+
+def register(sub) -> None:
+    p = sub.add_parser("events", help="inspect a transcribe.sh JSONL event log")
+    esub = p.add_subparsers(dest="events_command", required=True)
+    s = esub.add_parser("summary", help="per-stage timing and job outcome summary")
+    s.add_argument("file", help="event log written via DRAGTRANSCRIBE_EVENT_FILE ('-' for stdin)")
+    s.add_argument("--json", action="store_true", help="print the summary as JSON")
+    s.set_defaults(func=_cmd_summary)
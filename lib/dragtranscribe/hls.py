@@ -0,0 +1,123 @@
+# hls.py — subtitles as segmented WebVTT + a subtitle playlist, for serving outputs over HLS
+#
+# An HLS player given one big .vtt downloads all of it before showing the first cue. Here
+# the SRT is cut into <dir>/subs_00000.vtt, subs_00001.vtt, ... of $DRAGTRANSCRIBE_HLS_SEGMENT_S
+# seconds each (default 6, Apple's recommendation; match the video's segment length), with
+# <dir>/subtitles.m3u8 listing them, so players fetch only the segments around the playhead.
+# A cue that spans a boundary is repeated in every segment it overlaps, as the HLS spec
+# asks. Cue times stay on the media timeline, and each segment carries
+#   X-TIMESTAMP-MAP=MPEGTS:<ts>,LOCAL:00:00:00.000
+# mapping media time 0 to the video's first 90 kHz timestamp: 900000 (10 s, what Apple's
+# segmenters use) unless $DRAGTRANSCRIBE_HLS_MPEGTS says otherwise; it must match the PTS
+# the video segments start at. The SRT is read cue by cue and segments are written as they
+# fill, so memory holds only the cues overlapping the current segment, whatever the length.
+# The directory is built under <dir>.part<pid> and renamed into place when complete.
+import math
+import os
+import shutil
+import sys
+
+from . import mux, probe
+from .transcript import read_cues, vtt_ts
+
+SEGMENT_ENV = "DRAGTRANSCRIBE_HLS_SEGMENT_S"
+MPEGTS_ENV = "DRAGTRANSCRIBE_HLS_MPEGTS"
+DEFAULT_SEGMENT_S = 6.0
+DEFAULT_MPEGTS = 900000
+PLAYLIST = "subtitles.m3u8"
+
+
+def segment(srt: str, workdir: str, segment_s: float, duration_s: float | None = None,
+            mpegts: int = DEFAULT_MPEGTS) -> int:
+    """Write the segments and playlist into workdir; returns the number of segments.
+
+    Segments cover max(duration_s, last cue end), at least one segment.
+    """
+    seg_ms = int(segment_s * 1000)
+    media_ms = int((duration_s or 0) * 1000)
+    header = f"WEBVTT\nX-TIMESTAMP-MAP=MPEGTS:{mpegts},LOCAL:00:00:00.000\n\n"
+    index = 0
+    last_end = 0
+    pending: list[tuple[int, int, str]] = []   # cues overlapping this segment or later ones
+    with open(srt, encoding="utf-8", errors="replace") as f, \
+            open(os.path.join(workdir, PLAYLIST), "w", encoding="utf-8") as playlist:
+        playlist.write("#EXTM3U\n#EXT-X-VERSION:3\n#EXT-X-PLAYLIST-TYPE:VOD\n"
+                       f"#EXT-X-TARGETDURATION:{math.ceil(segment_s)}\n#EXT-X-MEDIA-SEQUENCE:0\n")
+        cues = read_cues(f)
+        nxt = next(cues, None)
+        while True:
+            start, end = index * seg_ms, (index + 1) * seg_ms
+            while nxt is not None and nxt[0] < end:
+                if nxt[1] > nxt[0]:
+                    pending.append(nxt)
+                    last_end = max(last_end, nxt[1])
+                nxt = next(cues, None)
+            name = f"subs_{index:05d}.vtt"
+            with open(os.path.join(workdir, name), "w", encoding="utf-8") as seg:
+                seg.write(header)
+                for c_start, c_end, text in pending:
+                    if c_end > start:
+                        seg.write(f"{vtt_ts(c_start)} --> {vtt_ts(c_end)}\n{text}\n\n")
+            pending = [c for c in pending if c[1] > end]
+            index += 1
+            last = nxt is None and not pending and end >= media_ms
+            length = min(end, max(media_ms, last_end)) - start if last else seg_ms
+            playlist.write(f"#EXTINF:{max(length, 1) / 1000:.3f},\n{name}\n")
+            if last:
+                break
+        playlist.write("#EXT-X-ENDLIST\n")
+    return index
+
+
+def write(srt: str, output_dir: str, segment_s: float, duration_s: float | None = None,
+          mpegts: int = DEFAULT_MPEGTS) -> int:
+    """Build output_dir (segments + playlist) from srt, replacing it atomically."""
+    mux.remove_stale_parts(output_dir)
+    workdir = f"{output_dir}.part{os.getpid()}"
+    os.makedirs(workdir)
+    try:
+        count = segment(srt, workdir, segment_s, duration_s, mpegts)
+        old = f"{output_dir}.old{os.getpid()}"
+        if os.path.isdir(output_dir):
+            os.rename(output_dir, old)
+        os.rename(workdir, output_dir)
+        shutil.rmtree(old, ignore_errors=True)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return count
+
+
+# ---------- CLI ----------
+
+def _cmd_hls(args) -> int:
+    try:
+        segment_s = args.segment or float(os.environ.get(SEGMENT_ENV) or DEFAULT_SEGMENT_S)
+        mpegts = args.mpegts if args.mpegts is not None else int(os.environ.get(MPEGTS_ENV) or DEFAULT_MPEGTS)
+    except ValueError:
+        print(f"Error: ${SEGMENT_ENV} / ${MPEGTS_ENV} must be numbers", file=sys.stderr)
+        return 2
+    if segment_s <= 0:
+        print("Error: the segment duration must be positive", file=sys.stderr)
+        return 2
+    duration = probe.duration(args.media) if args.media else None
+    mux.exit_on_sigterm()
+    try:
+        count = write(args.srt, args.output, segment_s, duration, mpegts)
+    except OSError as e:
+        print(f"Error: HLS subtitles failed: {e}", file=sys.stderr)
+        return 1
+    print(f"HLS subtitles: {count} segment(s) of {segment_s:g}s", file=sys.stderr)
+    print(os.path.join(args.output, PLAYLIST))
+    return 0
+
+
+def register(sub) -> None:
+    p = sub.add_parser("hls", help="segmented WebVTT + subtitle playlist for HLS")
+    p.add_argument("srt")
+    p.add_argument("--output", required=True, help="directory to write; prints the playlist path")
+    p.add_argument("--media", help="source media: segments cover its whole duration (cached probe)")
+    p.add_argument("--segment", type=float, default=None,
+                   help=f"segment duration in seconds (default: ${SEGMENT_ENV}, else {DEFAULT_SEGMENT_S:g})")
+    p.add_argument("--mpegts", type=int, default=None,
+                   help=f"90 kHz timestamp of media time 0 (default: ${MPEGTS_ENV}, else {DEFAULT_MPEGTS})")
+    p.set_defaults(func=_cmd_hls)
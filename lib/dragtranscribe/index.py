@@ -0,0 +1,318 @@
+# index.py — full-text search over every transcript in the library (SQLite FTS5)
+#
+# Finding "which video mentions X" used to mean grepping tens of thousands of .srt files on
+# the NAS. `index update <folders>` ingests every .srt (and whisper-cli .json, i.e. a top-level
+# "transcription" array, whose .srt is missing) into an FTS5 table of segments with their file and start/end times, and
+# `index search <words>` answers from it with millisecond timecodes, best matches first.
+# Updates are incremental: a file is re-read only when its size or mtime changed since it
+# was indexed, and files that disappeared from the scanned folders are dropped. transcribe.sh
+# adds each job's SRT as it finishes. The database is $DRAGTRANSCRIBE_INDEX (default:
+# <user cache dir>/dragtranscribe/transcripts.db); DRAGTRANSCRIBE_INDEX=0 turns the per-job
+# updates off. Files that turned out not to be transcripts (other JSON, no segments) are
+# remembered by size and mtime in `skipped`, so they are not reopened either. A file's segments get rowids file_id << 20 | n, so replacing one file's
+# segments deletes a rowid range instead of scanning the whole table.
+import json
+import os
+import sqlite3
+import sys
+import time
+
+from . import probe, transcript
+
+INDEX_ENV = "DRAGTRANSCRIBE_INDEX"
+SEGMENT_BITS = 20                      # up to ~1M segments per file
+COMMIT_EVERY = 200                     # files per transaction while scanning (jobs can interleave)
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    cues INTEGER NOT NULL,
+    indexed_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS skipped (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS segments USING fts5(
+    text, file_id UNINDEXED, start_ms UNINDEXED, end_ms UNINDEXED,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+"""
+
+
+class IndexUnavailable(Exception):
+    pass
+
+
+def db_path() -> str:
+    value = os.environ.get(INDEX_ENV)
+    if value and value != "0":
+        return value
+    return os.path.join(probe.user_cache_dir(), "transcripts.db")
+
+
+def connect(path: str | None = None) -> sqlite3.Connection:
+    path = path or db_path()
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    con = sqlite3.connect(path, timeout=30)
+    try:
+        con.execute("PRAGMA journal_mode=WAL")
+        con.executescript(SCHEMA)
+    except sqlite3.OperationalError as e:
+        con.close()
+        raise IndexUnavailable(f"{path}: {e} (this Python's SQLite needs FTS5)") from e
+    return con
+
+
+def _candidate(path: str) -> bool:
+    """The by-name half of is_transcript(): an .srt, or a .json (not a manifest) with no .srt."""
+    if path.endswith(".srt"):
+        return True
+    return (path.endswith(".json") and not path.endswith((".manifest.json", ".digest.json"))
+            and not os.path.exists(path[:-5] + ".srt"))
+
+
+def is_transcript(path: str) -> bool:
+    """An .srt, or whisper-cli JSON with no .srt beside it (manifests, sidecars etc. are not)."""
+    if not _candidate(path):
+        return False
+    if path.endswith(".srt"):
+        return True
+    try:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            return transcript.is_whisper_json(f)
+    except OSError:
+        return False
+
+
+def read_segments(path: str):
+    """(start ms, end ms, text) for each segment of an SRT or whisper-cli JSON."""
+    if path.endswith(".srt"):
+        with open(path, encoding="utf-8", errors="replace") as f:
+            for start, end, text in transcript.read_cues(f):
+                yield start, end, " ".join(text.split())
+        return
+    with open(path, encoding="utf-8", errors="replace") as f:
+        for seg in transcript.read_whisper_json(f):
+            cue = transcript.json_cue(seg) if isinstance(seg, dict) else None
+            if cue:
+                yield cue
+
+
+def _unchanged(con: sqlite3.Connection, table: str, path: str, st: os.stat_result) -> bool:
+    """path has a row in table (files or skipped) for its current size and mtime."""
+    row = con.execute(f"SELECT size, mtime_ns FROM {table} WHERE path = ?", (path,)).fetchone()
+    return row is not None and row[0] == st.st_size and row[1] == st.st_mtime_ns
+
+
+def _skip(con: sqlite3.Connection, path: str, st: os.stat_result) -> None:
+    con.execute("INSERT OR REPLACE INTO skipped (path, size, mtime_ns) VALUES (?, ?, ?)",
+                (path, st.st_size, st.st_mtime_ns))
+
+
+def _forget(con: sqlite3.Connection, file_id: int) -> None:
+    con.execute("DELETE FROM segments WHERE rowid BETWEEN ? AND ?",
+                (file_id << SEGMENT_BITS, ((file_id + 1) << SEGMENT_BITS) - 1))
+
+
+def add(con: sqlite3.Connection, path: str, st: os.stat_result | None = None) -> bool:
+    """(Re)index one file if it changed since last time; returns True if the index changed.
+
+    A file without segments gets no row (and loses the one it had); it is listed in skipped
+    until it changes.
+    """
+    path = os.path.abspath(path)
+    st = st or os.stat(path)
+    row = con.execute("SELECT id, size, mtime_ns FROM files WHERE path = ?", (path,)).fetchone()
+    if row and row[1] == st.st_size and row[2] == st.st_mtime_ns:
+        return False
+    try:
+        segs = list(read_segments(path))[:1 << SEGMENT_BITS]
+    except (OSError, ValueError):
+        segs = []
+    if not segs:
+        _skip(con, path, st)
+        if row:
+            remove(con, path)
+        return row is not None
+    con.execute("DELETE FROM skipped WHERE path = ?", (path,))
+    if row:
+        file_id = row[0]
+        _forget(con, file_id)
+        con.execute("UPDATE files SET size = ?, mtime_ns = ?, cues = ?, indexed_at = ? WHERE id = ?",
+                    (st.st_size, st.st_mtime_ns, len(segs), time.time(), file_id))
+    else:
+        file_id = con.execute("INSERT INTO files (path, size, mtime_ns, cues, indexed_at) "
+                              "VALUES (?, ?, ?, ?, ?)",
+                              (path, st.st_size, st.st_mtime_ns, len(segs), time.time())).lastrowid
+    base = file_id << SEGMENT_BITS
+    con.executemany("INSERT INTO segments (rowid, text, file_id, start_ms, end_ms) VALUES (?, ?, ?, ?, ?)",
+                    ((base + n, text, file_id, start, end) for n, (start, end, text) in enumerate(segs)))
+    return True
+
+
+def remove(con: sqlite3.Connection, path: str) -> None:
+    row = con.execute("SELECT id FROM files WHERE path = ?", (os.path.abspath(path),)).fetchone()
+    if row:
+        _forget(con, row[0])
+        con.execute("DELETE FROM files WHERE id = ?", (row[0],))
+
+
+def update(con: sqlite3.Connection, roots: list[str]) -> dict:
+    """Index new/changed transcripts under roots and drop vanished ones; returns counts."""
+    stats = {"seen": 0, "indexed": 0, "removed": 0}
+    pending = 0
+    for root in roots:
+        root = os.path.abspath(root)
+        if os.path.isfile(root):
+            if is_transcript(root):
+                stats["seen"] += 1
+                stats["indexed"] += add(con, root)
+            continue
+        seen = set()
+        candidates = set()
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames[:] = [d for d in dirnames if not d.startswith(".")]
+            for name in filenames:
+                path = os.path.join(dirpath, name)
+                if name.startswith(".") or not _candidate(path):
+                    continue
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                candidates.add(path)
+                # Size/mtime first: only new or changed files are opened
+                if _unchanged(con, "files", path, st):
+                    seen.add(path)
+                    continue
+                if _unchanged(con, "skipped", path, st):
+                    continue
+                if not is_transcript(path):
+                    _skip(con, path, st)
+                    continue
+                if add(con, path, st):
+                    stats["indexed"] += 1
+                    pending += 1
+                    if pending >= COMMIT_EVERY:
+                        con.commit()
+                        pending = 0
+                if _unchanged(con, "files", path, st):   # has a row: it had segments
+                    seen.add(path)
+        stats["seen"] += len(seen)
+        # '/' < '0': everything under root/ sorts in [root/, root0)
+        for (path,) in con.execute("SELECT path FROM files WHERE path >= ? AND path < ?",
+                                   (root + os.sep, root + chr(ord(os.sep) + 1))).fetchall():
+            if path not in seen:
+                remove(con, path)
+                stats["removed"] += 1
+        for (path,) in con.execute("SELECT path FROM skipped WHERE path >= ? AND path < ?",
+                                   (root + os.sep, root + chr(ord(os.sep) + 1))).fetchall():
+            if path not in candidates:
+                con.execute("DELETE FROM skipped WHERE path = ?", (path,))
+    con.commit()
+    return stats
+
+
+def fts_query(words: list[str]) -> str:
+    """Plain words -> an FTS5 query matching all of them (each quoted: no syntax errors)."""
+    return " ".join('"' + w.replace('"', '""') + '"' for w in " ".join(words).split())
+
+
+def search(con: sqlite3.Connection, query: str, limit: int = 50) -> list[dict]:
+    rows = con.execute(
+        "SELECT files.path, segments.start_ms, segments.end_ms, snippet(segments, 0, '[', ']', '...', 16) "
+        "FROM segments JOIN files ON files.id = segments.file_id "
+        "WHERE segments MATCH ? ORDER BY rank LIMIT ?", (query, limit)).fetchall()
+    return [{"path": p, "start_ms": int(a), "end_ms": int(b), "text": t} for p, a, b, t in rows]
+
+
+# ---------- CLI ----------
+
+def _ts(ms: int) -> str:
+    h, rem = divmod(ms, 3_600_000)
+    m, rem = divmod(rem, 60_000)
+    return f"{h:d}:{m:02d}:{rem / 1000:06.3f}"
+
+
+def _open() -> sqlite3.Connection | None:
+    try:
+        return connect()
+    except (IndexUnavailable, sqlite3.Error, OSError) as e:
+        print(f"Error: transcript index unavailable: {e}", file=sys.stderr)
+        return None
+
+
+def _cmd_update(args) -> int:
+    con = _open()
+    if con is None:
+        return 2
+    t0 = time.monotonic()
+    with con:
+        stats = update(con, args.paths)
+    print(f"{stats['seen']} transcript(s): {stats['indexed']} indexed, {stats['removed']} removed "
+          f"in {time.monotonic() - t0:.1f}s", file=sys.stderr)
+    return 0
+
+
+def _cmd_add(args) -> int:
+    if os.environ.get(INDEX_ENV) == "0":
+        return 0
+    con = _open()
+    if con is None:
+        return 2
+    with con:
+        for path in args.files:
+            try:
+                add(con, path)
+            except OSError as e:
+                print(f"Warn: not indexed: {e}", file=sys.stderr)
+    return 0
+
+
+def _cmd_search(args) -> int:
+    con = _open()
+    if con is None:
+        return 2
+    try:
+        hits = search(con, " ".join(args.query) if args.raw else fts_query(args.query), args.limit)
+    except sqlite3.OperationalError as e:
+        print(f"Error: bad query: {e}", file=sys.stderr)
+        return 2
+    for hit in hits:
+        if args.json:
+            print(json.dumps(hit))
+        else:
+            print(f"{hit['path']}\t{hit['start_ms']}\t{hit['end_ms']}\t{_ts(hit['start_ms'])}\t{hit['text']}")
+    return 0 if hits else 1
+
+
+def _cmd_status(args) -> int:
+    con = _open()
+    if con is None:
+        return 2
+    files, segments = con.execute("SELECT COUNT(*), COALESCE(SUM(cues), 0) FROM files").fetchone()
+    size = sum(os.path.getsize(p) for p in (db_path(), db_path() + "-wal") if os.path.exists(p))
+    print(f"{db_path()}: {files} transcript(s), {segments} segment(s), {size / 1e6:.1f} MB")
+    return 0
+
+
+def register(sub) -> None:
+    p = sub.add_parser("index", help="full-text search index of transcripts (SQLite FTS5)")
+    isub = p.add_subparsers(dest="index_command", required=True)
+    u = isub.add_parser("update", help="index new/changed .srt/.json under folders, drop vanished ones")
+    u.add_argument("paths", nargs="+")
+    u.set_defaults(func=_cmd_update)
+    a = isub.add_parser("add", help="index these transcripts now (used by transcribe.sh per job)")
+    a.add_argument("files", nargs="+")
+    a.set_defaults(func=_cmd_add)
+    s = isub.add_parser("search", help="'path<TAB>start ms<TAB>end ms<TAB>h:mm:ss<TAB>snippet' per hit")
+    s.add_argument("query", nargs="+")
+    s.add_argument("-n", "--limit", type=int, default=50)
+    s.add_argument("--raw", action="store_true", help="pass the query to FTS5 as is (AND/OR/NEAR, prefix*)")
+    s.add_argument("--json", action="store_true", help="one JSON object per hit")
+    s.set_defaults(func=_cmd_search)
+    isub.add_parser("status", help="database path and size").set_defaults(func=_cmd_status)
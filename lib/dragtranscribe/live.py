@@ -0,0 +1,82 @@
+# live.py — subtitles while whisper-cli is still running: <stem>.srt.partial + segment events
+#
+# whisper-cli writes its -osrt file only when it exits, so for a 2-hour file nothing appeared
+# for most of the run. It does print each segment as it is decoded,
+#   [00:01:02.340 --> 00:01:05.120]   text
+# (flushing stdout after each one). transcribe.sh pipes whisper-cli's stdout through
+# `dragtranscribe live --partial <stem>.srt.partial`, which passes every line on byte for byte
+# (whatever the encoding: lines are decoded, with replacement, only to be parsed),
+# appends each segment to the partial SRT (flushed, so players and `tail -f` see it at once)
+# and emits a `segment` event for the GUI's live feed. When whisper-cli finishes,
+# transcribe.sh copies its SRT over the partial file and renames that to <stem>.srt in one
+# step, so the .srt only ever appears complete. A SIGKILLed run's partial file is removed by
+# the next run's scratch janitor (scratch.py).
+import re
+import sys
+import time
+
+from . import events
+from .transcript import to_ms, write_srt
+
+_SEGMENT = re.compile(r"^\[(?:(\d+):)?(\d\d):(\d\d)[.,](\d{3})\s*-->\s*(?:(\d+):)?(\d\d):(\d\d)[.,](\d{3})\]\s*(.*)$")
+
+
+def parse_segment(line: str) -> tuple[int, int, str] | None:
+    """(start ms, end ms, text) of a whisper-cli progress line, else None."""
+    m = _SEGMENT.match(line.strip())
+    if not m or not m.group(9).strip():
+        return None
+    return to_ms(*m.group(1, 2, 3, 4)), to_ms(*m.group(5, 6, 7, 8)), m.group(9).strip()
+
+
+def follow(lines, out, partial: str, offset_ms: int = 0) -> int:
+    """Pass byte lines through to binary out, appending their segments to partial; returns the count."""
+    n = 0
+    t0 = time.monotonic()
+    with open(partial, "w", encoding="utf-8") as srt:
+        for line in lines:
+            out.write(line)
+            out.flush()
+            cue = parse_segment(line.decode("utf-8", "replace"))
+            if cue is None:
+                continue
+            start, end, text = cue[0] + offset_ms, cue[1] + offset_ms, cue[2]
+            n += 1
+            write_srt(srt, [(start, end, text)], first=n)
+            srt.flush()
+            if n == 1:
+                events.emit("first_segment", after_ms=int((time.monotonic() - t0) * 1000))
+            events.emit("segment", index=n, start_ms=start, end_ms=end, text=text)
+    return n
+
+
+# ---------- CLI ----------
+
+def _drain(lines, out) -> None:
+    """Keep passing lines on (or at least reading them) so whisper-cli never blocks or dies
+    on a closed pipe."""
+    for line in lines:
+        if out is None:
+            continue
+        try:
+            out.write(line)
+            out.flush()
+        except OSError:
+            out = None
+
+
+def _cmd_live(args) -> int:
+    stdin, stdout = sys.stdin.buffer, sys.stdout.buffer
+    try:
+        follow(stdin, stdout, args.partial, args.offset_ms)
+    except (OSError, ValueError) as e:
+        print(f"Warn: live subtitles stopped: {e}", file=sys.stderr)
+        _drain(stdin, stdout)
+    return 0
+
+
+def register(sub) -> None:
+    p = sub.add_parser("live", help="tee whisper-cli output into a live .srt.partial and segment events")
+    p.add_argument("--partial", required=True, help="SRT to append segments to as they are printed")
+    p.add_argument("--offset-ms", type=int, default=0, help="added to every timestamp")
+    p.set_defaults(func=_cmd_live)
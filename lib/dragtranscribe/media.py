@@ -0,0 +1,82 @@
+# media.py — which files are transcription jobs (mirrors the rules in bin/transcribe.sh)
+import os
+import wave
+from collections.abc import Callable, Iterator
+
+VIDEO_EXTS = (".mp4", ".mov", ".m4v", ".mkv", ".webm", ".avi")
+AUDIO_EXTS = (".wav", ".mp3", ".m4a", ".flac")
+
+
+def is_video_file(path: str) -> bool:
+    return path.lower().endswith(VIDEO_EXTS)
+
+
+def is_audio_file(path: str) -> bool:
+    return path.lower().endswith(AUDIO_EXTS)
+
+
+def is_media_file(path: str) -> bool:
+    return is_video_file(path) or is_audio_file(path)
+
+
+def is_whisper_wav(path: str) -> bool:
+    """True for 16 kHz mono 16-bit PCM WAVs, which whisper-cli can read as they are."""
+    try:
+        with wave.open(path, "rb") as w:
+            return w.getframerate() == 16000 and w.getnchannels() == 1 and w.getsampwidth() == 2
+    except (OSError, EOFError, wave.Error):
+        return False
+
+
+def should_skip_file(path: str) -> bool:
+    """True for our own outputs (<stem>_subbed.<video ext>, <stem>_burned.<video ext>)."""
+    base = os.path.basename(path).lower()
+    return any(base.endswith(suffix + ext) for suffix in ("_subbed", "_burned") for ext in VIDEO_EXTS)
+
+
+def srt_path(path: str) -> str:
+    return os.path.splitext(path)[0] + ".srt"
+
+
+def skip_reason(path: str) -> str | None:
+    """Reason a regular file is not a job (same reason strings as transcribe.sh events), else None."""
+    if should_skip_file(path):
+        return "subbed_file"
+    if not is_media_file(path):
+        return "not_video"
+    if os.path.exists(srt_path(path)):
+        return "srt_exists"
+    return None
+
+
+def walk_media(root: str, on_skip: Callable[[str, str], None] | None = None) -> Iterator[str]:
+    """Yield job paths under root as they are found (depth-first, streaming).
+
+    Uses os.scandir so the directory entries' cached type info avoids a stat per file;
+    directory symlinks are not followed (no cycles). on_skip(path, reason) is called for
+    media files that are skipped; other files are ignored silently, as in transcribe.sh.
+    """
+    stack = [root]
+    while stack:
+        d = stack.pop()
+        try:
+            with os.scandir(d) as it:
+                entries = sorted(it, key=lambda e: e.name)
+        except OSError:
+            continue
+        subdirs = []
+        for e in entries:
+            try:
+                if e.is_dir(follow_symlinks=False):
+                    subdirs.append(e.path)
+                    continue
+                if not e.is_file():
+                    continue
+            except OSError:
+                continue
+            reason = skip_reason(e.path)
+            if reason is None:
+                yield e.path
+            elif on_skip is not None and reason != "not_video":
+                on_skip(e.path, reason)
+        stack.extend(reversed(subdirs))
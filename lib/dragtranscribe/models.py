@@ -0,0 +1,262 @@
+# models.py — registry of ggml Whisper models and named speed/quality profiles
+#
+# Each ModelSpec describes one file from ggerganov/whisper.cpp on Hugging Face: download
+# size, quantization, multilingual vs English-only and expected peak RAM. Sizes and RAM
+# are nominal (whisper.cpp README; quantized RAM = f16 RAM minus the weight savings).
+# Real-time factors are measured: transcribe.sh records every run in
+# <models>/.model-stats.json and `dragtranscribe models list` reports the running average.
+import json
+import os
+import sys
+import time
+from dataclasses import dataclass
+
+HF_BASE = "https://huggingface.co/ggerganov/whisper.cpp/resolve/main/"
+STATS_FILE = ".model-stats.json"
+RTF_SMOOTHING = 0.3  # weight of the newest run in the moving average
+
+
+@dataclass(frozen=True)
+class ModelSpec:
+    name: str
+    size_mb: int
+    ram_mb: int
+    multilingual: bool = True
+    quant: str | None = None  # None = f16 weights
+
+    @property
+    def filename(self) -> str:
+        return f"ggml-{self.name}.bin"
+
+    @property
+    def url(self) -> str:
+        return HF_BASE + self.filename
+
+
+@dataclass(frozen=True)
+class Profile:
+    name: str
+    model: str
+    description: str
+
+
+REGISTRY: dict[str, ModelSpec] = {m.name: m for m in (
+    ModelSpec("tiny", 75, 273),
+    ModelSpec("tiny.en", 75, 273, multilingual=False),
+    ModelSpec("base", 142, 388),
+    ModelSpec("base.en", 142, 388, multilingual=False),
+    ModelSpec("small", 466, 852),
+    ModelSpec("small.en", 466, 852, multilingual=False),
+    ModelSpec("small-q5_1", 181, 570, quant="q5_1"),
+    ModelSpec("small.en-q5_1", 181, 570, multilingual=False, quant="q5_1"),
+    ModelSpec("medium", 1500, 2100),
+    ModelSpec("medium.en", 1500, 2100, multilingual=False),
+    ModelSpec("medium-q5_0", 514, 1120, quant="q5_0"),
+    ModelSpec("medium.en-q5_0", 514, 1120, multilingual=False, quant="q5_0"),
+    ModelSpec("large-v2", 2950, 3900),
+    ModelSpec("large-v2-q8_0", 1660, 2610, quant="q8_0"),
+    ModelSpec("large-v2-q5_0", 1080, 2030, quant="q5_0"),
+    ModelSpec("large-v3", 2950, 3900),
+    ModelSpec("large-v3-q5_0", 1080, 2030, quant="q5_0"),
+)}
+
+PROFILES: dict[str, Profile] = {p.name: p for p in (
+    Profile("fast", "small-q5_1", "quantized small model; quickest, lowest RAM"),
+    Profile("balanced", "large-v2-q5_0", "quantized large-v2; near-large quality at ~half the RAM"),
+    Profile("accurate", "large-v2", "full-precision large-v2 (the original default)"),
+)}
+
+DEFAULT_MODEL = "large-v2"
+
+# Language routing: English audio goes to the first installed English-only model (faster
+# and at least as accurate as the multilingual one at the same size); everything else goes
+# to the multilingual model with -tr. Overridden by $DRAGTRANSCRIBE_MODEL_EN.
+ENGLISH_ROUTE = ("medium.en", "small.en", "medium.en-q5_0", "small.en-q5_1", "base.en", "tiny.en")
+
+
+class UnknownModel(KeyError):
+    pass
+
+
+def bundle_dir() -> str:
+    return os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def model_dir() -> str:
+    return os.environ.get("MODEL_DIR") or os.path.join(bundle_dir(), "models")
+
+
+def lookup(name: str) -> ModelSpec:
+    """Accept a registry name ("large-v2-q5_0") or a file name ("ggml-large-v2-q5_0.bin")."""
+    base = os.path.basename(name)
+    if base.startswith("ggml-") and base.endswith(".bin"):
+        base = base[len("ggml-"):-len(".bin")]
+    try:
+        return REGISTRY[base]
+    except KeyError:
+        raise UnknownModel(name) from None
+
+
+def spec_for_profile(profile: str) -> ModelSpec:
+    if profile in PROFILES:
+        return REGISTRY[PROFILES[profile].model]
+    return lookup(profile)
+
+
+def path_for(spec: ModelSpec, directory: str | None = None) -> str:
+    return os.path.join(directory or model_dir(), spec.filename)
+
+
+def english_model(directory: str | None = None) -> ModelSpec | None:
+    """The preferred installed English-only model for the English route, if any."""
+    for name in ENGLISH_ROUTE:
+        if os.path.isfile(path_for(REGISTRY[name], directory)):
+            return REGISTRY[name]
+    return None
+
+
+# ---------- Measured stats ----------
+
+def _stats_path(directory: str | None = None) -> str:
+    return os.path.join(directory or model_dir(), STATS_FILE)
+
+
+def load_stats(directory: str | None = None) -> dict:
+    try:
+        with open(_stats_path(directory), encoding="utf-8") as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def save_stats(stats: dict, directory: str | None = None) -> None:
+    path = _stats_path(directory)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(stats, f, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def touch(model: str, directory: str | None = None) -> None:
+    """Mark a model as used now (the store's LRU order). Best effort."""
+    try:
+        name = lookup(model).name
+        stats = load_stats(directory)
+        stats.setdefault(name, {"runs": 0})["last_used"] = int(time.time())
+        save_stats(stats, directory)
+    except (UnknownModel, OSError):
+        pass
+
+
+def record_rss(model: str, rss_mb: float, directory: str | None = None) -> None:
+    """Fold a measured peak RSS into the model's estimate: rises at once, decays slowly."""
+    name = lookup(model).name
+    stats = load_stats(directory)
+    entry = stats.setdefault(name, {"runs": 0})
+    prev = entry.get("rss_mb")
+    entry["rss_mb"] = round(rss_mb if prev is None else max(rss_mb, prev + RTF_SMOOTHING * (rss_mb - prev)))
+    save_stats(stats, directory)
+
+
+def record_run(model: str, audio_seconds: float, wall_seconds: float, directory: str | None = None) -> dict:
+    """Fold one transcription run into the model's measured real-time factor."""
+    name = lookup(model).name
+    stats = load_stats(directory)
+    entry = stats.setdefault(name, {"runs": 0})
+    if audio_seconds > 0:
+        rtf = wall_seconds / audio_seconds
+        prev = entry.get("rtf")
+        entry["rtf"] = round(rtf if prev is None else prev + RTF_SMOOTHING * (rtf - prev), 4)
+    entry["runs"] = entry.get("runs", 0) + 1
+    entry["last_used"] = int(time.time())
+    save_stats(stats, directory)
+    return entry
+
+
+# ---------- CLI ----------
+
+def _cmd_list(args) -> int:
+    stats = load_stats()
+    print(f"{'model':<16}{'size':>8}{'RAM':>8}  {'quant':<6}{'lang':<6}{'RTF':>7}  present")
+    for spec in REGISTRY.values():
+        rtf = stats.get(spec.name, {}).get("rtf")
+        present = "yes" if os.path.isfile(path_for(spec)) else ""
+        print(f"{spec.name:<16}{spec.size_mb:>6}MB{spec.ram_mb:>6}MB  {spec.quant or 'f16':<6}"
+              f"{'multi' if spec.multilingual else 'en':<6}{'' if rtf is None else f'{rtf:.3f}':>7}  {present}")
+    print()
+    for p in PROFILES.values():
+        print(f"profile {p.name:<9} -> {p.model:<15} {p.description}")
+    return 0
+
+
+def _cmd_resolve(args) -> int:
+    try:
+        spec = spec_for_profile(args.profile)
+    except UnknownModel:
+        print(f"Error: unknown profile or model: {args.profile} "
+              f"(profiles: {', '.join(PROFILES)}; see 'dragtranscribe models list')", file=sys.stderr)
+        return 2
+    path = path_for(spec)
+    if not os.path.isfile(path) and args.fetch:
+        import http.client
+        from . import download, store
+        try:
+            path = store.ensure(spec.name, on_progress=store.progress_printer())
+        except (store.StoreFull, download.DownloadError, OSError, http.client.HTTPException) as e:
+            print(f"Error: could not fetch model {spec.name}: {e}", file=sys.stderr)
+            return 1
+    if not os.path.isfile(path):
+        print(f"Error: model {spec.name} is not installed ({path}).\n"
+              f"Fetch it with: bin/download_model.sh {spec.name}", file=sys.stderr)
+        return 1
+    print(path)
+    return 0
+
+
+def _cmd_english(args) -> int:
+    spec = english_model()
+    if spec is None:
+        return 1
+    print(path_for(spec))
+    return 0
+
+
+def _cmd_url(args) -> int:
+    try:
+        spec = spec_for_profile(args.model)
+    except UnknownModel:
+        print(f"Error: unknown model: {args.model}", file=sys.stderr)
+        return 2
+    print(f"{spec.url}\t{path_for(spec)}")
+    return 0
+
+
+def _cmd_record(args) -> int:
+    try:
+        record_run(args.model, args.audio_seconds, args.wall_seconds)
+    except UnknownModel:
+        return 0  # custom model files aren't tracked
+    except OSError as e:
+        print(f"Warn: could not record model stats: {e}", file=sys.stderr)
+    return 0
+
+
+def register(sub) -> None:
+    p = sub.add_parser("models", help="model registry and speed/quality profiles")
+    msub = p.add_subparsers(dest="models_command", required=True)
+    msub.add_parser("list", help="known models, measured RTF, profiles").set_defaults(func=_cmd_list)
+    r = msub.add_parser("resolve", help="print the installed model path for a profile or model name")
+    r.add_argument("profile")
+    r.add_argument("--fetch", action="store_true", help="download it (within the store quota) if missing")
+    r.set_defaults(func=_cmd_resolve)
+    msub.add_parser("english", help="print the installed English-only model used for the English route"
+                    ).set_defaults(func=_cmd_english)
+    u = msub.add_parser("url", help="print '<download url>\\t<install path>' for a profile or model")
+    u.add_argument("model")
+    u.set_defaults(func=_cmd_url)
+    rec = msub.add_parser("record", help="record a run's timing for the model's measured RTF")
+    rec.add_argument("model", help="model name or file path")
+    rec.add_argument("--audio-seconds", type=float, required=True)
+    rec.add_argument("--wall-seconds", type=float, required=True)
+    rec.set_defaults(func=_cmd_record)
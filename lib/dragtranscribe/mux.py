@@ -0,0 +1,237 @@
+# mux.py — embed the SRT into a copy of the source, in a container that can actually hold it
+#
+# The mux used to be a fixed `-c:v copy -c:a copy -c:s mov_text` into <stem>_subbed.mp4.
+# For VP9/Opus .webm and many .mkv/.avi sources that copy is invalid in MP4, and ffmpeg
+# only found out after reading and writing gigabytes. plan() decides up front from the
+# cached probe (probe.py), per stream:
+#   video  QuickTime-friendly codecs (H.264, HEVC, MPEG-4) -> MP4 + mov_text, copied;
+#          anything else -> MKV + SRT, copied (Matroska holds any codec)
+#   audio  copied when the container takes it, else AAC (cheap: audio only)
+# $DRAGTRANSCRIBE_MUX_CONTAINER=mp4|mkv forces the container; forcing MP4 for a codec it
+# can't carry transcodes that video to H.264 instead of failing. The output directory's
+# free space is checked against the source size before anything is written.
+#
+# The output is written to <output>.part<pid> in the same directory, with its index at the
+# front for progressive playback (MP4 +faststart: a second pass moving the moov atom; MKV:
+# cues written into reserved space after the header), fsynced, and renamed into place, so
+# an interrupted mux never leaves a half-written <stem>_subbed.* behind. The time spent on
+# each step is reported in a mux_finished event; `mux --bench` measures what fast-start +
+# fsync add per GB against a plain mux of the same file.
+import glob
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import time
+from dataclasses import dataclass, field
+
+from . import events, probe, scratch
+
+CONTAINER_ENV = "DRAGTRANSCRIBE_MUX_CONTAINER"
+MP4_VIDEO = {"h264", "hevc", "mpeg4"}
+MP4_AUDIO = {"aac", "alac", "mp3", "ac3", "eac3"}
+MKV_AUDIO_TRANSCODE = {"pcm_bluray", "pcm_dvd"}   # raw PCM flavours Matroska can't store
+SPACE_MARGIN = 64 * 1024 * 1024
+MKV_INDEX_PER_HOUR = 200 * 1024   # cue space reserved up front (~4x ffmpeg's suggested 50 kB/h)
+MKV_INDEX_MIN = 64 * 1024
+FFMPEG_FORMAT = {"mp4": "mp4", "mkv": "matroska"}
+
+
+class MuxError(Exception):
+    pass
+
+
+@dataclass
+class MuxPlan:
+    container: str                    # "mp4" or "mkv"
+    output: str
+    args: list[str] = field(default_factory=list)   # ffmpeg output options (maps + codecs)
+    notes: list[str] = field(default_factory=list)  # why a stream is not simply copied
+
+
+def plan(source: str, stem: str, container: str | None = None) -> MuxPlan:
+    """Container and per-stream copy/transcode choices for muxing source + one SRT input."""
+    info = probe.probe(source)
+    video = [s for s in (info["streams"] if info else []) if s["type"] == "video"]
+    audio = [s for s in (info["streams"] if info else []) if s["type"] == "audio"]
+    vcodec = video[0]["codec"] if video else None
+    chosen = (container or os.environ.get(CONTAINER_ENV) or "").lower()
+    auto = chosen not in ("mp4", "mkv")
+    if auto:
+        chosen = "mp4" if vcodec is None or vcodec in MP4_VIDEO else "mkv"
+    p = MuxPlan(chosen, f"{stem}.{chosen}")
+    if auto and chosen == "mkv":
+        p.notes.append(f"{vcodec} video can't be copied into MP4; writing MKV")
+    if info is None:
+        # Streams unknown (probe failed): the historical straight copy
+        p.args = ["-map", "0:v:0?", "-map", "0:a?", "-map", "1:0", "-c:v", "copy", "-c:a", "copy"]
+    else:
+        if video:
+            p.args += ["-map", f"0:{video[0]['index']}"]
+            if p.container == "mp4" and vcodec not in MP4_VIDEO:
+                p.args += ["-c:v", "libx264", "-preset", "veryfast", "-crf", "18", "-pix_fmt", "yuv420p"]
+                p.notes.append(f"video {vcodec} -> h264 (MP4 forced)")
+            else:
+                p.args += ["-c:v", "copy"]
+                if vcodec == "hevc" and p.container == "mp4":
+                    p.args += ["-tag:v", "hvc1"]  # QuickTime only plays hvc1-tagged HEVC
+        for i, s in enumerate(audio):
+            p.args += ["-map", f"0:{s['index']}"]
+            if (p.container == "mp4" and s["codec"] not in MP4_AUDIO) or \
+               (p.container == "mkv" and s["codec"] in MKV_AUDIO_TRANSCODE):
+                p.args += [f"-c:a:{i}", "aac", f"-b:a:{i}", "192k"]
+                p.notes.append(f"audio #{i} {s['codec']} -> aac")
+            else:
+                p.args += [f"-c:a:{i}", "copy"]
+        p.args += ["-map", "1:0"]
+    p.args += ["-c:s", "mov_text" if p.container == "mp4" else "srt",
+               "-metadata:s:s:0", "language=eng", "-metadata:s:s:0", "title=English"]
+    return p
+
+
+def preflight(source: str, p: MuxPlan) -> None:
+    """Raise MuxError if the output can't be written (e.g. not enough space for the copy)."""
+    # +faststart rewrites the file once more, so the temp copy needs room twice over
+    need = os.path.getsize(source) * (2 if p.container == "mp4" else 1) + SPACE_MARGIN
+    free = shutil.disk_usage(os.path.dirname(os.path.abspath(p.output))).free
+    if free < need:
+        raise MuxError(f"{os.path.dirname(p.output)} has {free / 1e9:.2f} GB free, "
+                       f"need ~{need / 1e9:.2f} GB for {os.path.basename(p.output)}")
+
+
+def _index_args(source: str, container: str) -> list[str]:
+    if container == "mp4":
+        return ["-movflags", "+faststart"]
+    hours = (probe.duration(source) or 3600.0) / 3600
+    return ["-reserve_index_space", str(int(max(MKV_INDEX_MIN, hours * MKV_INDEX_PER_HOUR)))]
+
+
+def _fsync_path(path: str) -> None:
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def commit(part: str, output: str, durable: bool = True) -> None:
+    """fsync part, rename it to output and fsync the directory (no torn or missing file)."""
+    if durable:
+        _fsync_path(part)
+    os.replace(part, output)
+    if durable:
+        _fsync_path(os.path.dirname(os.path.abspath(output)))
+
+
+def remove_stale_parts(output: str) -> None:
+    """Temp files (or burn-in segment dirs) of killed runs; SIGKILL can't be cleaned up after."""
+    for part in glob.glob(glob.escape(output) + ".part*"):
+        pid = part.rsplit(".part", 1)[1]
+        if pid.isdigit() and not scratch.pid_alive(int(pid)):
+            if os.path.isdir(part):
+                shutil.rmtree(part, ignore_errors=True)
+            else:
+                try:
+                    os.remove(part)
+                except OSError:
+                    pass
+
+
+def _run_ffmpeg(source: str, srt: str, p: MuxPlan, dest: str, extra: list[str]) -> None:
+    rc = subprocess.run(["ffmpeg", "-hide_banner", "-loglevel", "error", "-y", "-i", source, "-i", srt,
+                         *p.args, *extra, "-f", FFMPEG_FORMAT[p.container], dest]).returncode
+    if rc != 0:
+        raise MuxError(f"ffmpeg exited {rc}")
+
+
+def mux(source: str, srt: str, p: MuxPlan, *, faststart: bool = True, durable: bool = True) -> dict:
+    """Atomically write p.output = source + srt as a soft subtitle track; returns timings."""
+    preflight(source, p)
+    remove_stale_parts(p.output)
+    part = f"{p.output}.part{os.getpid()}"
+    t0 = time.monotonic()
+    try:
+        _run_ffmpeg(source, srt, p, part, _index_args(source, p.container) if faststart else [])
+        t1 = time.monotonic()
+        commit(part, p.output, durable)
+    finally:
+        try:
+            os.remove(part)
+        except FileNotFoundError:
+            pass
+    t2 = time.monotonic()
+    stats = {"container": p.container, "bytes": os.path.getsize(p.output), "mux_ms": int((t1 - t0) * 1000),
+             "fsync_ms": int((t2 - t1) * 1000), "faststart": faststart}
+    events.emit("mux_finished", path=p.output, **stats)
+    return stats
+
+
+def bench(source: str, srt: str, p: MuxPlan) -> dict:
+    """Seconds per GB that fast-start + fsync add over a plain, non-durable mux."""
+    plain_plan = MuxPlan(p.container, f"{p.output}.bench-plain", p.args)
+    fast_plan = MuxPlan(p.container, f"{p.output}.bench-fast", p.args)
+    try:
+        plain = mux(source, srt, plain_plan, faststart=False, durable=False)
+        fast = mux(source, srt, fast_plan)
+    finally:
+        for path in (plain_plan.output, fast_plan.output):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+    gb = max(fast["bytes"], 1) / 1e9
+    return {"gb": round(gb, 3), "plain_s": plain["mux_ms"] / 1000, "faststart_s": fast["mux_ms"] / 1000,
+            "fsync_s": fast["fsync_ms"] / 1000,
+            "added_s_per_gb": round((fast["mux_ms"] + fast["fsync_ms"] - plain["mux_ms"]) / 1000 / gb, 2)}
+
+
+# ---------- CLI ----------
+
+def _terminate(signum, frame):
+    raise SystemExit(128 + signum)
+
+
+def exit_on_sigterm() -> None:
+    """Turn SIGTERM (the app's Stop) into SystemExit so temp outputs are cleaned up."""
+    signal.signal(signal.SIGTERM, _terminate)
+
+
+def _cmd_mux(args) -> int:
+    p = plan(args.source, args.stem, args.container)
+    if args.plan:
+        print(f"{p.output}\t{' '.join(p.args)}")
+        for note in p.notes:
+            print(f"  {note}")
+        return 0
+    if not args.srt:
+        print("Error: an SRT to embed is required", file=sys.stderr)
+        return 2
+    exit_on_sigterm()
+    for note in p.notes:
+        print(f"Mux: {note}", file=sys.stderr)
+    try:
+        if args.bench:
+            r = bench(args.source, args.srt, p)
+            print(f"{r['gb']:.2f} GB: plain {r['plain_s']:.1f}s, fast-start {r['faststart_s']:.1f}s "
+                  f"+ fsync {r['fsync_s']:.1f}s -> {r['added_s_per_gb']:+.2f} s/GB")
+            return 0
+        mux(args.source, args.srt, p)
+    except (MuxError, OSError) as e:
+        print(f"Error: mux failed: {e}", file=sys.stderr)
+        return 1
+    print(p.output)
+    return 0
+
+
+def register(sub) -> None:
+    p = sub.add_parser("mux", help="embed an SRT as a soft subtitle track (MP4/mov_text or MKV/SRT)")
+    p.add_argument("source")
+    p.add_argument("srt", nargs="?")
+    p.add_argument("--stem", required=True, help="output path without extension; prints the final path")
+    p.add_argument("--container", choices=("mp4", "mkv"), default=None,
+                   help=f"force the container (default: ${CONTAINER_ENV}, else by codec)")
+    p.add_argument("--plan", action="store_true", help="only print the output path and ffmpeg options")
+    p.add_argument("--bench", action="store_true",
+                   help="mux twice (plain vs fast-start + fsync) and print the added seconds per GB")
+    p.set_defaults(func=_cmd_mux)
@@ -0,0 +1,189 @@
+# peers.py — fetch models from other DragTranscribe nodes on the LAN before the internet
+#
+# Any node can serve its verified models with `dragtranscribe peer serve`: plain HTTP over
+# models/, with Range support, and only files whose digest sidecar still matches (see
+# digest.py). The sidecar's SHA-256 is sent as the ETag. Fetchers try each base URL in
+# $DRAGTRANSCRIBE_PEERS (comma-separated, e.g. http://10.0.0.5:8737) with the normal
+# parallel-range downloader, then fall back to the origin URL. The expected digest is the
+# origin's advertised SHA-256 when the origin answers, else the caller's (e.g. $MODEL_SHA256),
+# else the peer's own ETag: peers on the LAN are trusted to that extent.
+import http.client
+import json
+import os
+import re
+import sys
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from . import digest, download, models
+
+PEERS_ENV = "DRAGTRANSCRIBE_PEERS"
+DEFAULT_PORT = 8737
+PEER_TIMEOUT = 5.0
+PEER_RETRIES = 2
+ORIGIN_PROBE_TIMEOUT = 5.0
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def configured() -> list[str]:
+    return [p.strip().rstrip("/") for p in os.environ.get(PEERS_ENV, "").split(",") if p.strip()]
+
+
+def peer_url(base: str, filename: str) -> str:
+    return f"{base}/models/{urllib.parse.quote(filename)}"
+
+
+def reference_sha256(url: str) -> str | None:
+    """The origin's advertised SHA-256, or None when it can't be reached (offline LAN)."""
+    try:
+        return download.probe(url, ORIGIN_PROBE_TIMEOUT)["sha256"]
+    except (OSError, http.client.HTTPException):
+        return None
+
+
+def fetch(url: str, dest: str, *, sha256: str | None = None, peers: list[str] | None = None,
+          **kwargs) -> str:
+    """download.download(url, dest) that tries LAN peers first; returns the SHA-256."""
+    peers = configured() if peers is None else peers
+    if peers and not sha256:
+        sha256 = reference_sha256(url)
+    name = os.path.basename(dest)
+    for base in peers:
+        src = peer_url(base, name)
+        try:
+            digest_hex = download.download(src, dest, sha256=sha256,
+                                           **{"timeout": PEER_TIMEOUT, "retries": PEER_RETRIES, **kwargs})
+            print(f"Fetched {name} from peer {base}", file=sys.stderr)
+            return digest_hex
+        except download.ChecksumMismatch as e:
+            print(f"Warn: peer {base} sent a bad copy of {name}: {e}", file=sys.stderr)
+        except (download.DownloadError, OSError, http.client.HTTPException) as e:
+            print(f"Warn: peer {base} unavailable for {name}: {e}", file=sys.stderr)
+    return download.download(url, dest, sha256=sha256, **kwargs)
+
+
+# ---------- Serving ----------
+
+class _PeerHandler(BaseHTTPRequestHandler):
+    server_version = "DragTranscribe-peer/1.0"
+    directory = ""  # set on the subclass built by make_server()
+
+    def do_HEAD(self):
+        self._serve(head=True)
+
+    def do_GET(self):
+        self._serve(head=False)
+
+    def log_message(self, fmt, *args):
+        print(f"peer {self.client_address[0]}: {fmt % args}", file=sys.stderr)
+
+    def _verified(self) -> list[dict]:
+        out = []
+        for spec in models.REGISTRY.values():
+            path = models.path_for(spec, self.directory)
+            if digest.check(path):
+                out.append({"name": spec.filename, "size": os.path.getsize(path),
+                            "sha256": digest.load(path)["sha256"]})
+        return out
+
+    def _serve(self, head: bool):
+        route = urllib.parse.urlsplit(self.path).path
+        if route in ("/models", "/models/"):
+            body = json.dumps(self._verified()).encode()
+            self._headers(200, len(body), {"Content-Type": "application/json"})
+            if not head:
+                self.wfile.write(body)
+            return
+        name = urllib.parse.unquote(route[len("/models/"):]) if route.startswith("/models/") else ""
+        path = os.path.join(self.directory, name)
+        # Only verified model files, never anything else in (or outside) models/
+        if not name or "/" in name or not name.endswith(".bin") or not digest.check(path):
+            self.send_error(404)
+            return
+        data = digest.load(path)
+        size = data["size"]
+        start, end, status = 0, size - 1, 200
+        extra = {"Content-Type": "application/octet-stream", "ETag": f'"{data["sha256"]}"'}
+        if self.headers.get("Range"):
+            m = _RANGE_RE.match(self.headers["Range"].strip())
+            if m and m.group(1):
+                start = int(m.group(1))
+                end = min(int(m.group(2)), size - 1) if m.group(2) else size - 1
+            elif m and m.group(2):
+                start = max(0, size - int(m.group(2)))
+            if not m or start > end:
+                self._headers(416, 0, {"Content-Range": f"bytes */{size}"})
+                return
+            status = 206
+            extra["Content-Range"] = f"bytes {start}-{end}/{size}"
+        self._headers(status, end - start + 1, extra)
+        if head:
+            return
+        with open(path, "rb") as f:
+            try:
+                self.connection.sendfile(f, start, end - start + 1)
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+    def _headers(self, status: int, length: int, extra: dict[str, str]):
+        self.send_response(status)
+        self.send_header("Content-Length", str(length))
+        self.send_header("Accept-Ranges", "bytes")
+        for k, v in extra.items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.flush()
+
+
+def make_server(directory: str, port: int = DEFAULT_PORT, bind: str = "") -> ThreadingHTTPServer:
+    handler = type("PeerHandler", (_PeerHandler,), {"directory": directory})
+    server = ThreadingHTTPServer((bind, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+# ---------- CLI ----------
+
+def _cmd_serve(args) -> int:
+    directory = models.model_dir()
+    server = make_server(directory, args.port, args.bind)
+    host, port = server.server_address[:2]
+    print(f"Serving verified models from {directory} on http://{host or '0.0.0.0'}:{port}/models/", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+def _cmd_list(args) -> int:
+    bases = args.peers or configured()
+    if not bases:
+        print(f"Error: no peers (set {PEERS_ENV} or pass URLs)", file=sys.stderr)
+        return 2
+    for base in bases:
+        base = base.rstrip("/")
+        try:
+            with download._open(base + "/models/", timeout=PEER_TIMEOUT) as resp:
+                listing = json.load(resp)
+        except (OSError, ValueError, http.client.HTTPException) as e:
+            print(f"{base}: unavailable ({e})")
+            continue
+        for m in listing:
+            print(f"{base}  {m['name']:<26}{m['size'] / 1e9:>7.2f} GB  {m['sha256']}")
+    return 0
+
+
+def register(sub) -> None:
+    p = sub.add_parser("peer", help="share verified models with other nodes on the LAN")
+    psub = p.add_subparsers(dest="peer_command", required=True)
+    s = psub.add_parser("serve", help="serve this node's verified models over HTTP (Range-capable)")
+    s.add_argument("--port", type=int, default=DEFAULT_PORT)
+    s.add_argument("--bind", default="", help="address to listen on (default: all interfaces)")
+    s.set_defaults(func=_cmd_serve)
+    ls = psub.add_parser("list", help="show the models peers are offering")
+    ls.add_argument("peers", nargs="*", help=f"peer base URLs (default: ${PEERS_ENV})")
+    ls.set_defaults(func=_cmd_list)
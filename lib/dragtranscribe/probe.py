@@ -0,0 +1,205 @@
+# probe.py — one ffprobe per media file, shared by every stage that needs its metadata
+#
+# Admission (duration), scratch sizing, and the mux preflight all need the same facts about
+# a source, and ffprobe on a network share can take seconds (it reads the container index
+# over the wire). probe() runs it once per (size, mtime) and keeps the parsed result in
+# $DRAGTRANSCRIBE_PROBE_CACHE (default: <user cache dir>/dragtranscribe/probe.json), so
+# later stages, processes, and re-runs read the cache instead. A changed file misses
+# because its size or mtime no longer match. Without ffprobe, the duration and stream
+# lines of ffmpeg's banner are parsed instead.
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import threading
+import time
+
+from . import media
+
+CACHE_ENV = "DRAGTRANSCRIBE_PROBE_CACHE"
+MAX_ENTRIES = 5000
+VERSION = 2  # 2: + start_time
+
+_lock = threading.Lock()
+_memo: dict[str, dict] = {}
+
+_BANNER_DURATION = re.compile(r"Duration: (\d+):(\d\d):(\d\d(?:\.\d+)?)")
+_BANNER_START = re.compile(r"Duration: [^,]*, start: (-?\d+(?:\.\d+)?)")
+_BANNER_STREAM = re.compile(r"Stream #\d+:(\d+)(?:\[\w+\])?(?:\((\w+)\))?: (Video|Audio|Subtitle|Data): (\w+)(.*)")
+
+
+def user_cache_dir() -> str:
+    """<user cache dir>/dragtranscribe (~/Library/Caches on macOS, else $XDG_CACHE_HOME or ~/.cache)."""
+    if os.environ.get("XDG_CACHE_HOME"):
+        root = os.environ["XDG_CACHE_HOME"]
+    elif sys.platform == "darwin":
+        root = os.path.expanduser("~/Library/Caches")
+    else:
+        root = os.path.expanduser("~/.cache")
+    return os.path.join(root, "dragtranscribe")
+
+
+def cache_path() -> str:
+    return os.environ.get(CACHE_ENV) or os.path.join(user_cache_dir(), "probe.json")
+
+
+def _load() -> dict:
+    try:
+        with open(cache_path(), encoding="utf-8") as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) and data.get("version") == VERSION else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def _save(key: str, entry: dict) -> None:
+    """Merge one entry into the on-disk cache (best effort; concurrent writers may drop one)."""
+    path = cache_path()
+    data = _load()
+    files = data.get("files", {})
+    files[key] = entry
+    if len(files) > MAX_ENTRIES:
+        for old in sorted(files, key=lambda k: files[k].get("probed_at", 0))[:len(files) - MAX_ENTRIES]:
+            del files[old]
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": VERSION, "files": files}, f, separators=(",", ":"))
+        os.replace(tmp, path)
+    except OSError:
+        pass
+
+
+def _num(value) -> float | None:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _from_ffprobe(path: str) -> dict | None:
+    out = subprocess.run(["ffprobe", "-v", "error", "-show_format", "-show_streams", "-of", "json", path],
+                         capture_output=True, text=True, timeout=60)
+    if out.returncode != 0:
+        return None
+    raw = json.loads(out.stdout or "{}")
+    fmt = raw.get("format", {})
+    streams = []
+    for s in raw.get("streams", []):
+        streams.append({
+            "index": s.get("index"),
+            "type": s.get("codec_type"),
+            "codec": s.get("codec_name"),
+            "language": (s.get("tags") or {}).get("language"),
+            "width": s.get("width"),
+            "height": s.get("height"),
+            "sample_rate": int(s["sample_rate"]) if s.get("sample_rate") else None,
+            "channels": s.get("channels"),
+            "sample_fmt": s.get("sample_fmt"),
+            "duration": _num(s.get("duration")),
+        })
+    return {"format": fmt.get("format_name"), "duration": _num(fmt.get("duration")),
+            "start_time": _num(fmt.get("start_time")), "streams": streams}
+
+
+def _from_banner(path: str) -> dict | None:
+    err = subprocess.run(["ffmpeg", "-hide_banner", "-i", path], capture_output=True,
+                         text=True, timeout=60).stderr
+    m = _BANNER_DURATION.search(err)
+    duration = int(m.group(1)) * 3600 + int(m.group(2)) * 60 + float(m.group(3)) if m else None
+    streams = []
+    for s in _BANNER_STREAM.finditer(err):
+        rest = s.group(5)
+        size = re.search(r", (\d{2,5})x(\d{2,5})", rest)
+        rate = re.search(r"(\d+) Hz", rest)
+        layout = re.search(r"Hz, (mono|stereo|[\d.]+)", rest)
+        fmt = re.search(r"Hz, [^,]+, (\w+)", rest)
+        channels = {"mono": 1, "stereo": 2}.get(layout.group(1)) if layout else None
+        streams.append({
+            "index": int(s.group(1)),
+            "type": s.group(3).lower(),
+            "codec": s.group(4),
+            "language": s.group(2) if s.group(2) not in (None, "und") else None,
+            "width": int(size.group(1)) if size else None,
+            "height": int(size.group(2)) if size else None,
+            "sample_rate": int(rate.group(1)) if rate else None,
+            "channels": channels,
+            "sample_fmt": fmt.group(1) if fmt else None,
+            "duration": None,
+        })
+    fmt_name = re.search(r"Input #0, ([\w,]+), from", err)
+    if duration is None and not streams:
+        return None
+    start = _BANNER_START.search(err)
+    return {"format": fmt_name.group(1) if fmt_name else None, "duration": duration,
+            "start_time": float(start.group(1)) if start else None, "streams": streams}
+
+
+def probe(path: str, refresh: bool = False) -> dict | None:
+    """Parsed format/stream info for path ({format, duration, start_time, streams}), or None if unreadable."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    key = os.path.realpath(path)
+    with _lock:
+        entry = _memo.get(key)
+        if entry is None and not refresh:
+            entry = _load().get("files", {}).get(key)
+        if (not refresh and entry and entry.get("size") == st.st_size
+                and entry.get("mtime_ns") == st.st_mtime_ns):
+            _memo[key] = entry
+            return entry["probe"]
+    try:
+        info = _from_ffprobe(path) if shutil.which("ffprobe") else _from_banner(path)
+    except (OSError, ValueError, subprocess.SubprocessError):
+        return None
+    if info is None:
+        return None
+    entry = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "probed_at": time.time(), "probe": info}
+    with _lock:
+        _memo[key] = entry
+        _save(key, entry)
+    return info
+
+
+def duration(path: str) -> float | None:
+    """Media duration in seconds (cached probe)."""
+    info = probe(path)
+    return info["duration"] if info else None
+
+
+def streams(path: str, kind: str | None = None) -> list[dict]:
+    """The probed streams of path, optionally only those of one type (video, audio, subtitle)."""
+    info = probe(path)
+    return [s for s in (info["streams"] if info else []) if kind is None or s["type"] == kind]
+
+
+# ---------- CLI ----------
+
+def _cmd_probe(args) -> int:
+    if args.whisper_wav:
+        return 0 if media.is_whisper_wav(args.path) else 1
+    info = probe(args.path, refresh=args.refresh)
+    if info is None:
+        print(f"Error: cannot probe {args.path}", file=sys.stderr)
+        return 1
+    if args.field == "duration":
+        print(info["duration"] if info["duration"] is not None else "")
+    else:
+        json.dump(info, sys.stdout)
+        print()
+    return 0
+
+
+def register(sub) -> None:
+    p = sub.add_parser("probe", help="cached ffprobe: format, duration and streams as JSON")
+    p.add_argument("path")
+    p.add_argument("--field", choices=("duration",), help="print just this value")
+    p.add_argument("--refresh", action="store_true", help="ignore the cache and probe again")
+    p.add_argument("--whisper-wav", action="store_true",
+                   help="only check the WAV header: exit 0 if whisper-cli can read the file as is")
+    p.set_defaults(func=_cmd_probe)
@@ -0,0 +1,343 @@
+# scheduler.py — memory-aware admission control for concurrent transcription jobs
+#
+# Every whisper-cli process holds its model (GBs for large-v2) plus the whole input as
+# float32 samples (64 KB per second of audio), so a few concurrent jobs can push a 16 GB
+# machine into swap. Before a job starts its peak RSS is estimated as
+#     learned model RSS (else the registry's nominal RAM) + duration * 16000 * 4 bytes
+# and it is admitted only when that fits into available memory (MemAvailable from
+# /proc/meminfo, vm_stat on macOS) minus what the running jobs have yet to grow into and a
+# reserve. The peak RSS of each job's process tree is sampled while it runs and fed back
+# into the model stats (models.record_rss), so the estimates follow what models really use.
+import os
+import subprocess
+import sys
+import threading
+import time
+from collections.abc import Callable
+
+from . import events, media, models, probe
+
+SAMPLE_BYTES_PER_SECOND = 16000 * 4   # whisper.cpp keeps the input as float32 mono 16 kHz
+JOB_OVERHEAD = 200 * 1024 * 1024      # ffmpeg, shell, helpers around the inference process
+DEFAULT_RESERVE = 1024 * 1024 * 1024  # never plan to use the last GB
+SAMPLE_INTERVAL = 0.5
+
+
+# ---------- Memory probes ----------
+
+def available_memory() -> int | None:
+    """Bytes the system can hand out without swapping, or None if unknown."""
+    try:
+        with open("/proc/meminfo", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    if sys.platform == "darwin":
+        try:
+            out = subprocess.run(["vm_stat"], capture_output=True, text=True, timeout=5).stdout
+        except (OSError, subprocess.SubprocessError):
+            return None
+        page = 4096
+        pages = 0
+        for line in out.splitlines():
+            if "page size of" in line:
+                page = int(line.split("page size of")[1].split()[0])
+            key, _, value = line.partition(":")
+            if key in ("Pages free", "Pages inactive", "Pages speculative", "Pages purgeable"):
+                pages += int(value.strip().rstrip("."))
+        return pages * page
+    return None
+
+
+def tree_rss(roots: list[int]) -> dict[int, int]:
+    """RSS in bytes of each root pid plus all of its descendants (one ps call)."""
+    try:
+        out = subprocess.run(["ps", "-A", "-o", "pid=,ppid=,rss="], capture_output=True,
+                             text=True, timeout=5).stdout
+    except (OSError, subprocess.SubprocessError):
+        return {}
+    children: dict[int, list[int]] = {}
+    rss: dict[int, int] = {}
+    for line in out.splitlines():
+        parts = line.split()
+        if len(parts) == 3 and all(p.isdigit() for p in parts):
+            pid, ppid, kb = map(int, parts)
+            children.setdefault(ppid, []).append(pid)
+            rss[pid] = kb * 1024
+    totals = {}
+    for root in roots:
+        total, stack = 0, [root]
+        while stack:
+            pid = stack.pop()
+            total += rss.get(pid, 0)
+            stack.extend(children.get(pid, ()))
+        totals[root] = total
+    return totals
+
+
+# ---------- Estimates ----------
+
+def model_rss(name: str, stats: dict | None = None) -> int:
+    """Learned peak RSS of the model alone (bytes), else the registry's nominal RAM."""
+    spec = models.lookup(name)
+    stats = models.load_stats() if stats is None else stats
+    mb = stats.get(spec.name, {}).get("rss_mb") or spec.ram_mb
+    return int(mb * 1024 * 1024)
+
+
+def job_models(profile: str | None = None) -> list[str]:
+    """Models a job may end up on before its language is known: multilingual + English route."""
+    en = os.environ.get("DRAGTRANSCRIBE_MODEL_EN", "")
+    names = []
+    for name in (profile or os.environ.get("MODEL_LARGE_V2") or models.DEFAULT_MODEL, en):
+        if name and name != "none":
+            try:
+                names.append(models.spec_for_profile(name).name)
+            except models.UnknownModel:
+                pass
+    if not profile and not en:
+        spec = models.english_model()
+        if spec is not None:
+            names.append(spec.name)
+    return names or [models.DEFAULT_MODEL]
+
+
+def resident_audio_s(duration: float) -> float:
+    """Seconds of audio a job holds in memory at once: all of it, or one chunked window."""
+    if os.environ.get("DRAGTRANSCRIBE_CHUNKED") == "1" or os.environ.get("DRAGTRANSCRIBE_PEAK_MB"):
+        from . import chunked  # transcribe.sh runs this job window by window
+        duration = min(duration, chunked.MAX_WINDOW_S if os.environ.get("DRAGTRANSCRIBE_PEAK_MB")
+                       else chunked.DEFAULT_WINDOW_S)
+    return duration
+
+
+def estimate(duration: float, model_names: list[str], stats: dict | None = None) -> int:
+    """Estimated peak RSS (bytes) of a job over duration seconds of media on the largest model."""
+    stats = models.load_stats() if stats is None else stats
+    return (max(model_rss(n, stats) for n in model_names)
+            + int(resident_audio_s(duration) * SAMPLE_BYTES_PER_SECOND) + JOB_OVERHEAD)
+
+
+# ---------- Admission ----------
+
+class _Job:
+    def __init__(self, key: str, estimate: int, duration: float):
+        self.key = key
+        self.estimate = estimate
+        self.duration = duration
+        self.pid: int | None = None
+        self.rss = 0
+        self.peak = 0
+
+
+class Admission:
+    """Admit jobs while their estimated peak RSS fits in available memory.
+
+    acquire() blocks until the job fits (a job is always admitted when nothing is running);
+    attach() tells the sampler which process tree to measure; release() returns the peak RSS.
+    """
+
+    def __init__(self, max_jobs: int = 1, reserve: int = DEFAULT_RESERVE,
+                 meminfo: Callable[[], int | None] = available_memory):
+        self.max_jobs = max(1, max_jobs)
+        self.reserve = reserve
+        self.meminfo = meminfo
+        self._cond = threading.Condition()
+        self._jobs: dict[str, _Job] = {}
+        self._sampler: threading.Thread | None = None
+
+    def fits(self, est: int) -> bool:
+        if not self._jobs:
+            return True
+        if len(self._jobs) >= self.max_jobs:
+            return False
+        avail = self.meminfo()
+        if avail is None:
+            return False  # can't see memory: don't add concurrency blindly
+        # Running jobs already use job.rss of what available memory reflects; reserve the rest.
+        pending = sum(max(0, j.estimate - j.rss) for j in self._jobs.values())
+        return est + pending + self.reserve <= avail
+
+    def acquire(self, key: str, est: int, duration: float = 0.0,
+                stop: Callable[[], bool] | None = None, on_wait: Callable[[], None] | None = None) -> bool:
+        with self._cond:
+            waited = False
+            while not self.fits(est):
+                if stop is not None and stop():
+                    return False
+                if not waited and on_wait is not None:
+                    on_wait()
+                waited = True
+                self._cond.wait(SAMPLE_INTERVAL * 2)
+            self._jobs[key] = _Job(key, est, duration)
+            if self._sampler is None:
+                self._sampler = threading.Thread(target=self._sample_loop, name="rss-sampler", daemon=True)
+                self._sampler.start()
+        events.emit("job_admitted", file=key, estimate_bytes=est, running=len(self._jobs))
+        return True
+
+    def attach(self, key: str, pid: int) -> None:
+        with self._cond:
+            if key in self._jobs:
+                self._jobs[key].pid = pid
+
+    def release(self, key: str) -> int:
+        with self._cond:
+            job = self._jobs.pop(key, None)
+            self._cond.notify_all()
+        return job.peak if job else 0
+
+    def running(self) -> int:
+        with self._cond:
+            return len(self._jobs)
+
+    def _sample_loop(self):
+        while True:
+            with self._cond:
+                if not self._jobs:
+                    self._sampler = None
+                    return
+                pids = [j.pid for j in self._jobs.values() if j.pid]
+            sizes = tree_rss(pids) if pids else {}
+            with self._cond:
+                for j in self._jobs.values():
+                    if j.pid in sizes:
+                        j.rss = sizes[j.pid]
+                        j.peak = max(j.peak, j.rss)
+                self._cond.notify_all()
+            time.sleep(SAMPLE_INTERVAL)
+
+
+def peak_model(names) -> str | None:
+    """Of the models a job loaded (detection, transcription), the one its process tree's peak
+    RSS is credited to: the largest by nominal RAM. None when none is in the registry."""
+    best = None
+    for name in names:
+        try:
+            spec = models.lookup(name) if name else None
+        except models.UnknownModel:
+            spec = None
+        if spec is not None and (best is None or spec.ram_mb > best.ram_mb):
+            best = spec
+    return best.name if best else None
+
+
+def learn(model: str, peak: int, duration: float) -> None:
+    """Feed a finished job's peak RSS back as the model's own RSS (audio buffer removed).
+
+    The same audio as estimate() is subtracted, and the result never drops below the model's
+    file size, so a job that died early (or sampled badly) cannot teach an absurd estimate.
+    """
+    if peak <= 0:
+        return
+    base = peak - int(resident_audio_s(duration) * SAMPLE_BYTES_PER_SECOND) - JOB_OVERHEAD
+    try:
+        floor = models.lookup(model).size_mb
+        models.record_rss(model, max(base / (1024 * 1024), floor))
+    except (models.UnknownModel, OSError):
+        pass
+
+
+# ---------- Batch runner ----------
+
+class BatchRunner:
+    """Run transcribe.sh over many files concurrently, as far as memory allows."""
+
+    def __init__(self, script: str, *, max_jobs: int, reserve: int = DEFAULT_RESERVE,
+                 profile: str | None = None, extra_args: list[str] | None = None):
+        self.script = script
+        self.admission = Admission(max_jobs, reserve)
+        self.profile = profile
+        self.args = (["-p", profile] if profile else []) + (extra_args or [])
+        self.threads = max(1, (os.cpu_count() or 4) // self.admission.max_jobs)
+        self.counts = {"processed": 0, "skipped": 0, "failed": 0}
+        self._lock = threading.Lock()
+
+    def run(self, jobs) -> dict:
+        names = job_models(self.profile)
+        stats = models.load_stats()
+        workers = []
+        for path in jobs:
+            duration = probe.duration(path) or 0.0
+            est = estimate(duration, names, stats)
+            self.admission.acquire(path, est, duration, on_wait=lambda: self._say(
+                f"⏳ waiting for memory ({est / 1e9:.1f} GB needed, {self.admission.running()} running)"))
+            t = threading.Thread(target=self._run_one, args=(path, duration), daemon=True)
+            t.start()
+            workers.append(t)
+        for t in workers:
+            t.join()
+        return self.counts
+
+    def _say(self, line: str) -> None:
+        with self._lock:
+            print(line, flush=True)
+
+    def _run_one(self, path: str, duration: float) -> None:
+        tag = os.path.basename(path)
+        seen = {"model": None, "skip": None}
+
+        def on_event(ev):
+            if ev.get("event") == "model_selected":
+                seen["model"] = peak_model((ev.get("model"), ev.get("detect_model")))
+            elif ev.get("event") == "skipped":
+                seen["skip"] = ev.get("reason")
+            events.forward(ev)
+
+        pipe = events.EventPipe()
+        env = {**os.environ, **pipe.env(), "WCLI_THREADS": os.environ.get("WCLI_THREADS", str(self.threads))}
+        rc = 1
+        try:
+            proc = subprocess.Popen([self.script, *self.args, path], stdout=subprocess.PIPE,
+                                    stderr=subprocess.STDOUT, text=True, errors="replace",
+                                    env=env, pass_fds=pipe.pass_fds)
+        except OSError as e:
+            pipe.close()
+            self._say(f"[{tag}] cannot start {self.script}: {e}")
+        else:
+            pipe.start(on_event)
+            self.admission.attach(path, proc.pid)
+            for line in proc.stdout:
+                self._say(f"[{tag}] {line.rstrip()}")
+            rc = proc.wait()
+            pipe.join()
+        peak = self.admission.release(path)
+        if rc == 0 and seen["model"] and not seen["skip"]:
+            learn(seen["model"], peak, duration)
+        key = "failed" if rc else ("skipped" if seen["skip"] else "processed")
+        with self._lock:
+            self.counts[key] += 1
+
+
+def _expand(paths: list[str]):
+    for p in paths:
+        if os.path.isdir(p):
+            yield from media.walk_media(p)
+        elif os.path.isfile(p):
+            yield p
+        else:
+            print(f"Warn: not found: {p}", file=sys.stderr)
+
+
+def _cmd_batch(args) -> int:
+    script = os.path.join(models.bundle_dir(), "bin", "transcribe.sh")
+    extra = ["-l", args.lang] if args.lang else []
+    runner = BatchRunner(script, max_jobs=args.jobs, reserve=int(args.reserve_gb * 1e9),
+                         profile=args.profile, extra_args=extra)
+    counts = runner.run(_expand(args.paths))
+    print(f"\nSummary: processed={counts['processed']}  skipped={counts['skipped']}  failed={counts['failed']}")
+    return 1 if counts["failed"] else 0
+
+
+def register(sub) -> None:
+    p = sub.add_parser("batch", help="transcribe many files concurrently with memory-aware admission")
+    p.add_argument("paths", nargs="+", help="files and/or folders")
+    p.add_argument("-j", "--jobs", type=int, default=int(os.environ.get("DRAGTRANSCRIBE_MAX_JOBS", "2")),
+                   help="upper bound on concurrent jobs (memory usually decides; default $DRAGTRANSCRIBE_MAX_JOBS or 2)")
+    p.add_argument("-p", "--profile", default=os.environ.get("DRAGTRANSCRIBE_PROFILE") or None)
+    p.add_argument("-l", "--lang", default=None, help="passed to transcribe.sh -l")
+    p.add_argument("--reserve-gb", type=float, default=DEFAULT_RESERVE / 1e9,
+                   help="memory to keep free beyond the jobs' estimates")
+    p.set_defaults(func=_cmd_batch)
@@ -0,0 +1,197 @@
+# scratch.py — where transcribe.sh puts its temporary WAV/SRT files
+#
+# Every transcribe.sh process works in its own directory, <root>/dragtranscribe-<pid>, so
+# leftovers can be attributed: a SIGKILLed run can't clean up after itself, but the janitor
+# (`dragtranscribe scratch clean`, run at every start) removes the directories of PIDs that
+# are no longer alive. Before each job, `scratch prepare` estimates the temp WAV's size from
+# the media duration (16 kHz mono s16 = 32 KB/s) and picks a root:
+#   RAM-backed  $DRAGTRANSCRIBE_RAM_SCRATCH (default /dev/shm where it exists; "none" = off),
+#               only if the file fits in its free space and in half of available memory
+#   disk        $DRAGTRANSCRIBE_SCRATCH_DIR, else $TMPDIR, else /tmp
+# Space other live runs have reserved but not yet written is subtracted first, so
+# concurrent jobs can't all pass the check and then fill the disk together. Files a run
+# grows outside its directory (the live <stem>.srt.partial) are listed in <dir>/.outputs,
+# so the janitor removes those along with the directory.
+import os
+import shutil
+import sys
+import tempfile
+
+from . import probe, scheduler
+
+PREFIX = "dragtranscribe-"
+RESERVATION = ".reserved"
+OUTPUTS = ".outputs"
+WAV_BYTES_PER_SECOND = 16000 * 2
+MARGIN = 64 * 1024 * 1024  # SRTs, chunk files, filesystem slack
+
+
+class NoScratchSpace(Exception):
+    pass
+
+
+def disk_root() -> str:
+    return os.environ.get("DRAGTRANSCRIBE_SCRATCH_DIR") or tempfile.gettempdir()
+
+
+def ram_root() -> str | None:
+    value = os.environ.get("DRAGTRANSCRIBE_RAM_SCRATCH")
+    if value == "none":
+        return None
+    if value:
+        return value
+    return "/dev/shm" if os.path.isdir("/dev/shm") and os.access("/dev/shm", os.W_OK) else None
+
+
+def pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _dir_size(path: str) -> int:
+    total = 0
+    try:
+        with os.scandir(path) as it:
+            for e in it:
+                try:
+                    if e.is_file(follow_symlinks=False):
+                        total += e.stat(follow_symlinks=False).st_blocks * 512
+                except OSError:
+                    pass
+    except OSError:
+        pass
+    return total
+
+
+def _owned_dirs(root: str):
+    """(pid, path) for every per-process scratch directory under root."""
+    try:
+        with os.scandir(root) as it:
+            for e in it:
+                pid = e.name[len(PREFIX):]
+                if e.name.startswith(PREFIX) and pid.isdigit() and e.is_dir(follow_symlinks=False):
+                    yield int(pid), e.path
+    except OSError:
+        return
+
+
+def _read_reservation(path: str) -> int:
+    try:
+        with open(os.path.join(path, RESERVATION), encoding="ascii") as f:
+            return int(f.read().strip() or 0)
+    except (OSError, ValueError):
+        return 0
+
+
+def pending_reservations(root: str, exclude_pid: int) -> int:
+    """Bytes other live runs under root have reserved but not written yet."""
+    return sum(max(0, _read_reservation(path) - _dir_size(path))
+               for pid, path in _owned_dirs(root) if pid != exclude_pid and pid_alive(pid))
+
+
+def free_for(root: str, pid: int) -> int:
+    return shutil.disk_usage(root).free - pending_reservations(root, pid)
+
+
+def choose(need: int, pid: int) -> str:
+    """The root to use for need bytes; raises NoScratchSpace when nothing fits."""
+    ram = ram_root()
+    if ram and os.path.isdir(ram):
+        avail = scheduler.available_memory()
+        if avail is not None and need <= avail // 2 and need + MARGIN <= free_for(ram, pid):
+            return ram
+    disk = disk_root()
+    free = free_for(disk, pid)
+    if need + MARGIN > free:
+        raise NoScratchSpace(f"{disk} has {free / 1e9:.2f} GB free (after other jobs' reservations), "
+                             f"need ~{(need + MARGIN) / 1e9:.2f} GB")
+    return disk
+
+
+def prepare(pid: int, need: int) -> str:
+    """Create (if needed) and return this run's scratch directory with need bytes reserved."""
+    path = os.path.join(choose(need, pid), f"{PREFIX}{pid}")
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    with open(os.path.join(path, RESERVATION), "w", encoding="ascii") as f:
+        f.write(str(need + MARGIN))
+    return path
+
+
+def _remove_outputs(path: str) -> int:
+    """Remove the in-place partial files a dead run listed; returns the bytes freed."""
+    freed = 0
+    try:
+        with open(os.path.join(path, OUTPUTS), encoding="utf-8") as f:
+            names = [line.rstrip("\n") for line in f]
+    except OSError:
+        return 0
+    for name in names:
+        if not name.endswith(".partial"):
+            continue  # only ever delete the files this mechanism exists for
+        try:
+            size = os.path.getsize(name)
+            os.remove(name)
+            freed += size
+        except OSError:
+            pass
+    return freed
+
+
+def clean(roots: list[str] | None = None) -> tuple[int, int]:
+    """Remove scratch directories of dead processes; returns (directories, bytes) reclaimed."""
+    roots = roots or [r for r in (disk_root(), ram_root()) if r]
+    dirs = reclaimed = 0
+    for root in dict.fromkeys(roots):
+        for pid, path in list(_owned_dirs(root)):
+            if pid_alive(pid):
+                continue
+            reclaimed += _dir_size(path) + _remove_outputs(path)
+            shutil.rmtree(path, ignore_errors=True)
+            dirs += 1
+    return dirs, reclaimed
+
+
+# ---------- CLI ----------
+
+def _cmd_prepare(args) -> int:
+    seconds = probe.duration(args.input) if args.input else None
+    if seconds is None:
+        # Unknown duration: assume the cap (chunked/detect clips) or an hour
+        seconds = args.seconds or 3600.0
+    elif args.seconds:
+        seconds = min(seconds, args.seconds)
+    need = int(seconds * WAV_BYTES_PER_SECOND) + 44
+    try:
+        print(prepare(args.pid, need))
+    except NoScratchSpace as e:
+        print(f"Error: not enough scratch space: {e}", file=sys.stderr)
+        return 1
+    except OSError as e:
+        print(f"Error: cannot create scratch directory: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+def _cmd_clean(args) -> int:
+    dirs, reclaimed = clean()
+    if dirs or args.verbose:
+        print(f"Scratch: reclaimed {reclaimed / 1e6:.1f} MB from {dirs} orphaned run(s)")
+    return 0
+
+
+def register(sub) -> None:
+    p = sub.add_parser("scratch", help="temp-space selection, preflight and orphan cleanup")
+    ssub = p.add_subparsers(dest="scratch_command", required=True)
+    pr = ssub.add_parser("prepare", help="print this run's scratch dir after a free-space preflight")
+    pr.add_argument("--pid", type=int, required=True, help="owning process (transcribe.sh's $$)")
+    pr.add_argument("--seconds", type=float, default=None, help="cap on the audio that will be extracted")
+    pr.add_argument("input", nargs="?", help="media file; its duration sizes the reservation")
+    pr.set_defaults(func=_cmd_prepare)
+    c = ssub.add_parser("clean", help="remove scratch dirs left by dead processes")
+    c.add_argument("-v", "--verbose", action="store_true")
+    c.set_defaults(func=_cmd_clean)
@@ -0,0 +1,226 @@
+# store.py — the models/ directory as a cache: disk quota, LRU eviction, fetch on demand
+#
+# With several models installed (tiny for detection, small.en, quantized and full large-v2)
+# models/ passes 10 GB quickly. When $DRAGTRANSCRIBE_MODEL_QUOTA_GB is set, the store keeps
+# the registry models under it: before every download (and on `dragtranscribe store gc`) it
+# evicts the least recently used models that nothing pins, and `models resolve --fetch`
+# downloads an evicted model again, through the resumable downloader (LAN peers first, see
+# peers.py), when a job needs it.
+#
+# Last use comes from the registry stats (models.record_run / models.touch), else the file's
+# mtime. Pinned models are never evicted: the default model, anything named in
+# $DRAGTRANSCRIBE_PINNED (comma-separated profiles or model names), the English route model
+# in $DRAGTRANSCRIBE_MODEL_EN, and whatever the caller is about to use.
+import http.client
+import os
+import shutil
+import sys
+import time
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
+
+from . import download, events, models, peers
+
+QUOTA_ENV = "DRAGTRANSCRIBE_MODEL_QUOTA_GB"
+PINNED_ENV = "DRAGTRANSCRIBE_PINNED"
+FREE_SPACE_MARGIN = 256 * 1024 * 1024  # leave this much of the disk free after a download
+
+
+class StoreFull(Exception):
+    pass
+
+
+@dataclass
+class StoredModel:
+    spec: models.ModelSpec
+    path: str
+    size: int
+    last_used: float
+
+
+def quota_bytes() -> int | None:
+    value = os.environ.get(QUOTA_ENV, "").strip()
+    if not value:
+        return None
+    try:
+        return int(float(value) * 1e9)
+    except ValueError:
+        print(f"Warn: ignoring invalid {QUOTA_ENV}={value!r}", file=sys.stderr)
+        return None
+
+
+def pinned(extra: Iterable[str] = ()) -> set[str]:
+    """Registry names that must not be evicted; unknown names are ignored."""
+    names = [models.DEFAULT_MODEL, os.environ.get("DRAGTRANSCRIBE_PROFILE", ""),
+             os.environ.get("MODEL_LARGE_V2", ""),  # the model transcribe.sh already resolved
+             os.environ.get("DRAGTRANSCRIBE_MODEL_EN", ""), *extra,
+             *os.environ.get(PINNED_ENV, "").split(",")]
+    out = set()
+    for name in names:
+        name = name.strip()
+        if not name or name == "none":
+            continue
+        try:
+            out.add(models.spec_for_profile(name).name)
+        except models.UnknownModel:
+            pass
+    return out
+
+
+def installed(directory: str | None = None) -> list[StoredModel]:
+    """Registry models present in the store, least recently used first."""
+    stats = models.load_stats(directory)
+    out = []
+    for spec in models.REGISTRY.values():
+        path = models.path_for(spec, directory)
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        last = stats.get(spec.name, {}).get("last_used") or st.st_mtime
+        out.append(StoredModel(spec, path, st.st_size, last))
+    out.sort(key=lambda m: m.last_used)
+    return out
+
+
+def usage(directory: str | None = None) -> int:
+    """Bytes used by everything in the store (models, sidecars, partial downloads)."""
+    total = 0
+    with os.scandir(directory or models.model_dir()) as it:
+        for e in it:
+            try:
+                if e.is_file(follow_symlinks=False):
+                    total += e.stat(follow_symlinks=False).st_size
+            except OSError:
+                pass
+    return total
+
+
+def plan_eviction(entries: list[StoredModel], need: int, keep: set[str]) -> list[StoredModel]:
+    """Least recently used unpinned entries whose removal frees at least need bytes.
+    entries must be LRU-ordered; raises StoreFull if the unpinned ones are not enough.
+    """
+    victims, freed = [], 0
+    for m in entries:
+        if freed >= need:
+            break
+        if m.spec.name in keep:
+            continue
+        victims.append(m)
+        freed += m.size
+    if freed < need:
+        raise StoreFull(f"need {need / 1e9:.2f} GB more, but only {freed / 1e9:.2f} GB is evictable "
+                        f"(pinned: {', '.join(sorted(keep)) or 'none'})")
+    return victims
+
+
+def evict(m: StoredModel) -> None:
+    for p in (m.path, m.path + ".digest.json", download.part_path(m.path), download.journal_path(m.path)):
+        try:
+            os.remove(p)
+        except FileNotFoundError:
+            pass
+    events.emit("model_evicted", model=m.spec.name, path=m.path, size=m.size)
+    print(f"Evicted {m.spec.name} ({m.size / 1e9:.2f} GB, last used "
+          f"{time.strftime('%Y-%m-%d', time.localtime(m.last_used))})", file=sys.stderr)
+
+
+def make_room(incoming: int, keep: Iterable[str] = (), directory: str | None = None,
+              quota: int | None = None) -> list[StoredModel]:
+    """Evict LRU models until incoming bytes fit under the quota and on the disk."""
+    directory = directory or models.model_dir()
+    quota = quota_bytes() if quota is None else quota
+    need = 0
+    if quota is not None:
+        need = max(need, usage(directory) + incoming - quota)
+    need = max(need, incoming + FREE_SPACE_MARGIN - shutil.disk_usage(directory).free)
+    if need <= 0:
+        return []
+    victims = plan_eviction(installed(directory), need, pinned(keep))
+    for m in victims:
+        evict(m)
+    return victims
+
+
+def ensure(name: str, keep: Iterable[str] = (), directory: str | None = None,
+           on_progress: Callable[[dict], None] | None = None) -> str:
+    """Path of the model for a profile/model name, downloading it (after making room) if needed."""
+    spec = models.spec_for_profile(name)
+    directory = directory or models.model_dir()
+    path = models.path_for(spec, directory)
+    if not os.path.isfile(path):
+        os.makedirs(directory, exist_ok=True)
+        part = download.part_path(path)
+        have = os.path.getsize(part) if os.path.exists(part) else 0
+        make_room(max(0, spec.size_mb * 1024 * 1024 - have), {spec.name, *keep}, directory)
+        print(f"Fetching {spec.name} ({spec.size_mb} MB) ...", file=sys.stderr)
+        peers.fetch(spec.url, path, on_progress=on_progress)
+    models.touch(spec.name, directory)
+    return path
+
+
+# ---------- CLI ----------
+
+def _cmd_status(args) -> int:
+    directory = models.model_dir()
+    quota = quota_bytes()
+    keep = pinned()
+    print(f"{'model':<16}{'size':>10}  {'last used':<17}pinned")
+    for m in reversed(installed(directory)):
+        print(f"{m.spec.name:<16}{m.size / 1e9:>8.2f}GB  "
+              f"{time.strftime('%Y-%m-%d %H:%M', time.localtime(m.last_used)):<17}"
+              f"{'yes' if m.spec.name in keep else ''}")
+    used = usage(directory)
+    print(f"\nstore: {used / 1e9:.2f} GB used" + (f" of {quota / 1e9:.2f} GB quota" if quota else " (no quota)"))
+    return 0
+
+
+def _cmd_gc(args) -> int:
+    quota = int(args.quota_gb * 1e9) if args.quota_gb is not None else quota_bytes()
+    if quota is None:
+        print(f"Error: no quota (set {QUOTA_ENV} or pass --quota-gb)", file=sys.stderr)
+        return 2
+    try:
+        evicted = make_room(0, directory=models.model_dir(), quota=quota)
+    except StoreFull as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    print(f"Evicted {len(evicted)} model(s); store now {usage(models.model_dir()) / 1e9:.2f} GB")
+    return 0
+
+
+def _cmd_fetch(args) -> int:
+    try:
+        print(ensure(args.model, on_progress=progress_printer()))
+    except models.UnknownModel:
+        print(f"Error: unknown model: {args.model}", file=sys.stderr)
+        return 2
+    except (StoreFull, download.DownloadError, OSError, http.client.HTTPException) as e:
+        print(f"Error: could not fetch {args.model}: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+def progress_printer(interval: float = 5.0) -> Callable[[dict], None]:
+    """Download progress lines on stderr (stdout is reserved for the resolved path)."""
+    last = {"t": 0.0}
+
+    def on_progress(p):
+        now = time.monotonic()
+        if now - last["t"] >= interval:
+            last["t"] = now
+            pct = f"{100 * p['downloaded'] / p['total']:.0f}%" if p["total"] else f"{p['downloaded'] / 1e6:.0f} MB"
+            print(f"⬇️  {pct}  {p['rate_bps'] / 1e6:.1f} MB/s", file=sys.stderr, flush=True)
+    return on_progress
+
+
+def register(sub) -> None:
+    p = sub.add_parser("store", help="model store: usage, quota eviction, fetch on demand")
+    ssub = p.add_subparsers(dest="store_command", required=True)
+    ssub.add_parser("status", help="installed models by last use, pins and quota").set_defaults(func=_cmd_status)
+    g = ssub.add_parser("gc", help="evict least recently used unpinned models down to the quota")
+    g.add_argument("--quota-gb", type=float, default=None, help=f"override ${QUOTA_ENV}")
+    g.set_defaults(func=_cmd_gc)
+    f = ssub.add_parser("fetch", help="install a model or profile, evicting others if needed")
+    f.add_argument("model")
+    f.set_defaults(func=_cmd_fetch)
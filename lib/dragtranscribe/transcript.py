@@ -0,0 +1,427 @@
+# transcript.py — compact in-memory transcripts and streaming SRT/VTT/JSON readers and writers
+#
+# Chunk stitching, HLS segmenting, format conversion and the search index all read and
+# rewrite transcripts. A list of dicts per segment or word costs ~400 bytes each, which for
+# multi-hour whisper-cli JSON with word timestamps is hundreds of MB. Here a Track keeps
+# start/end times in int64 arrays and all text in one UTF-8 arena (a bytearray plus offsets),
+# ~30 bytes per entry; a Transcript is a segment Track, a word Track, and the index of each
+# segment's first word. Entries are appended in start order, so the entries overlapping a
+# time range are found by binary search: bisect on the starts, and on the running maximum
+# of the ends (monotonic even when cues overlap).
+#
+# read_cues() parses SRT or WebVTT one cue at a time from a file object, write_srt()/
+# write_vtt() write from any iterable of cues, and read_whisper_json() yields the segments of
+# whisper-cli's -ojf output one by one, so no stage needs the whole file as a single string.
+# `dragtranscribe transcript bench` measures all of it on a synthetic 1M-word transcript.
+import array
+import bisect
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+from typing import Iterable, Iterator, TextIO
+
+Cue = tuple[int, int, str]   # (start ms, end ms, text)
+
+_TIMING = re.compile(r"(?:(\d+):)?(\d\d):(\d\d)[,.](\d{3})\s*-->\s*(?:(\d+):)?(\d\d):(\d\d)[,.](\d{3})")
+JSON_CHUNK = 1 << 20
+
+
+def to_ms(h, m, s, ms) -> int:
+    return ((int(h or 0) * 60 + int(m)) * 60 + int(s)) * 1000 + int(ms)
+
+
+def srt_ts(ms: int) -> str:
+    h, rem = divmod(ms, 3_600_000)
+    m, rem = divmod(rem, 60_000)
+    s, ms = divmod(rem, 1000)
+    return f"{h:02d}:{m:02d}:{s:02d},{ms:03d}"
+
+
+def vtt_ts(ms: int) -> str:
+    return srt_ts(ms).replace(",", ".")
+
+
+# ---------- Streaming I/O ----------
+
+def read_cues(f: TextIO) -> Iterator[Cue]:
+    """Cues of an SRT or WebVTT file, one at a time (numbers, ids, NOTE blocks skipped)."""
+    timing, lines = None, []
+    for line in f:
+        line = line.rstrip("\r\n")
+        if timing is None:
+            m = _TIMING.search(line)
+            if m:
+                timing = (to_ms(*m.group(1, 2, 3, 4)), to_ms(*m.group(5, 6, 7, 8)))
+        elif line.strip():
+            lines.append(line)
+        else:
+            if lines:
+                yield timing[0], timing[1], "\n".join(lines)
+            timing, lines = None, []
+    if timing is not None and lines:
+        yield timing[0], timing[1], "\n".join(lines)
+
+
+def write_srt(f: TextIO, cues: Iterable[Cue], first: int = 1) -> int:
+    """Write cues numbered from first; returns how many were written."""
+    n = 0
+    for n, (start, end, text) in enumerate(cues, 1):
+        f.write(f"{first + n - 1}\n{srt_ts(start)} --> {srt_ts(end)}\n{text}\n\n")
+    return n
+
+
+def write_vtt(f: TextIO, cues: Iterable[Cue], header: bool = True) -> int:
+    if header:
+        f.write("WEBVTT\n\n")
+    n = 0
+    for n, (start, end, text) in enumerate(cues, 1):
+        f.write(f"{vtt_ts(start)} --> {vtt_ts(end)}\n{text}\n\n")
+    return n
+
+
+def _transcription_array(f: TextIO) -> tuple[str, int] | None:
+    """(buffer, position just inside the top-level "transcription" array), else None.
+
+    Walks the top-level object key by key, decoding (and dropping) the other values, so a
+    "transcription" nested in them or inside a string never matches.
+    """
+    decoder = json.JSONDecoder()
+    buf, pos = "", 0
+
+    def peek(skip: str) -> str:
+        nonlocal buf, pos
+        while True:
+            while pos < len(buf) and buf[pos] in skip:
+                pos += 1
+            if pos < len(buf):
+                return buf[pos]
+            buf, pos = f.read(JSON_CHUNK), 0
+            if not buf:
+                return ""
+
+    def value():
+        nonlocal buf, pos
+        while True:
+            try:
+                v, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                end = None
+            if end is None or end == len(buf):   # cut off, or a number that may go on
+                more = f.read(JSON_CHUNK)
+                if more:
+                    buf, pos = buf[pos:] + more, 0
+                    continue
+                if end is None:
+                    raise json.JSONDecodeError("truncated JSON", buf, pos)
+            buf, pos = buf[end:], 0
+            return v
+
+    if peek(" \t\r\n\ufeff") != "{":
+        return None
+    pos += 1
+    while peek(" \t\r\n,") == '"':
+        key = value()
+        if peek(" \t\r\n") != ":":
+            return None
+        pos += 1
+        if key == "transcription":
+            return (buf, pos + 1) if peek(" \t\r\n") == "[" else None
+        peek(" \t\r\n")
+        value()
+    return None
+
+
+def is_whisper_json(f: TextIO) -> bool:
+    """True if the top level of the JSON in f has a "transcription" array."""
+    try:
+        return _transcription_array(f) is not None
+    except ValueError:
+        return False
+
+
+def read_whisper_json(f: TextIO) -> Iterator[dict]:
+    """The "transcription" segments of whisper-cli -oj/-ojf output, decoded one at a time."""
+    start = _transcription_array(f)
+    if start is None:
+        return
+    buf, pos = start
+    decoder = json.JSONDecoder()
+    while True:
+        while pos < len(buf) and buf[pos] in " \t\r\n,":
+            pos += 1
+        if pos == len(buf):
+            buf, pos = f.read(JSON_CHUNK), 0
+            if not buf:
+                return
+            continue
+        if buf[pos] == "]":
+            return
+        try:
+            seg, pos = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            more = f.read(JSON_CHUNK)
+            if not more:
+                raise
+            buf, pos = buf[pos:] + more, 0
+            continue
+        yield seg
+        if pos > JSON_CHUNK:
+            buf, pos = buf[pos:], 0
+
+
+def json_cue(seg: dict) -> Cue | None:
+    offsets = seg.get("offsets") or {}
+    text = (seg.get("text") or "").strip()
+    if not text or "from" not in offsets:
+        return None
+    return int(offsets["from"]), int(offsets.get("to", offsets["from"])), text
+
+
+def json_words(seg: dict) -> Iterator[Cue]:
+    """Words of a -ojf segment: its tokens merged at leading spaces, special tokens dropped."""
+    word = None
+    for tok in seg.get("tokens") or []:
+        text, offsets = tok.get("text") or "", tok.get("offsets") or {}
+        if text.startswith("[_") or "from" not in offsets:
+            continue
+        if word is None or text.startswith(" "):
+            if word is not None and word[2].strip():
+                yield word[0], word[1], word[2].strip()
+            word = [offsets["from"], offsets.get("to", offsets["from"]), text]
+        else:
+            word[1] = offsets.get("to", word[1])
+            word[2] += text
+    if word is not None and word[2].strip():
+        yield word[0], word[1], word[2].strip()
+
+
+# ---------- Columnar storage ----------
+
+class Track:
+    """Timed text entries in columns: start/end arrays (ms) and a UTF-8 text arena."""
+
+    __slots__ = ("starts", "ends", "_max_end", "_arena", "_offsets")
+
+    def __init__(self):
+        self.starts = array.array("q")
+        self.ends = array.array("q")
+        self._max_end = array.array("q")   # running max of ends, for overlap search
+        self._arena = bytearray()
+        self._offsets = array.array("Q", [0])
+
+    def append(self, start: int, end: int, text: str) -> None:
+        if self.starts and start < self.starts[-1]:
+            raise ValueError(f"entry at {start} ms is before the previous one ({self.starts[-1]} ms)")
+        self.starts.append(start)
+        self.ends.append(end)
+        self._max_end.append(max(end, self._max_end[-1]) if self._max_end else end)
+        self._arena += text.encode("utf-8")
+        self._offsets.append(len(self._arena))
+
+    def extend(self, cues: Iterable[Cue]) -> None:
+        for start, end, text in cues:
+            self.append(start, end, text)
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def text(self, i: int) -> str:
+        return self._arena[self._offsets[i]:self._offsets[i + 1]].decode("utf-8")
+
+    def __getitem__(self, i: int) -> Cue:
+        if i < 0:
+            i += len(self.starts)
+        return self.starts[i], self.ends[i], self.text(i)
+
+    def __iter__(self) -> Iterator[Cue]:
+        for i in range(len(self.starts)):
+            yield self[i]
+
+    def overlapping(self, start_ms: int, end_ms: int) -> list[int]:
+        """Indices of the entries that overlap [start_ms, end_ms)."""
+        lo = bisect.bisect_right(self._max_end, start_ms)
+        hi = bisect.bisect_left(self.starts, end_ms)
+        return [i for i in range(lo, hi) if self.ends[i] > start_ms]
+
+    def at(self, t_ms: int) -> list[int]:
+        """Indices of the entries showing at t_ms."""
+        return self.overlapping(t_ms, t_ms + 1)
+
+    def shift(self, offset_ms: int) -> None:
+        for col in (self.starts, self.ends, self._max_end):
+            for i in range(len(col)):
+                col[i] += offset_ms
+
+    def nbytes(self) -> int:
+        return sum(c.itemsize * len(c) for c in (self.starts, self.ends, self._max_end, self._offsets)) \
+            + len(self._arena)
+
+
+class Transcript:
+    """Segments and (optional) words; words_of(i) gives segment i's words."""
+
+    __slots__ = ("segments", "words", "_first_word")
+
+    def __init__(self):
+        self.segments = Track()
+        self.words = Track()
+        self._first_word = array.array("q", [0])
+
+    def add(self, start: int, end: int, text: str, words: Iterable[Cue] = ()) -> None:
+        self.segments.append(start, end, text)
+        self.words.extend(words)
+        self._first_word.append(len(self.words))
+
+    def words_of(self, i: int) -> range:
+        return range(self._first_word[i], self._first_word[i + 1])
+
+    def __len__(self) -> int:
+        return len(self.segments)
+
+    def nbytes(self) -> int:
+        return self.segments.nbytes() + self.words.nbytes() + self._first_word.itemsize * len(self._first_word)
+
+    @classmethod
+    def load(cls, path: str, words: bool = True) -> "Transcript":
+        """From .srt/.vtt, or whisper-cli .json (with word timings from -ojf tokens)."""
+        t = cls()
+        with open(path, encoding="utf-8", errors="replace") as f:
+            if path.endswith(".json"):
+                for seg in read_whisper_json(f):
+                    cue = json_cue(seg)
+                    if cue:
+                        t.add(*cue, words=json_words(seg) if words else ())
+            else:
+                for cue in read_cues(f):
+                    t.add(*cue)
+        return t
+
+    def save(self, path: str) -> None:
+        """Write the segments as SRT or WebVTT (by extension) via a temp file and rename."""
+        tmp = f"{path}.tmp.{os.getpid()}"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                (write_vtt if path.endswith(".vtt") else write_srt)(f, self.segments)
+            os.replace(tmp, path)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+
+# ---------- Benchmark ----------
+
+def _synthetic_json(f: TextIO, n_words: int, per_segment: int = 12) -> None:
+    rng = random.Random(1)
+    vocab = "the a of to and speech model window subtitle river mountain signal".split()
+    f.write('{"model": {"type": "bench"}, "transcription": [')
+    t = 0
+    for s in range(0, n_words, per_segment):
+        toks, words = [], []
+        for _ in range(min(per_segment, n_words - s)):
+            w = rng.choice(vocab)
+            d = rng.randint(150, 450)
+            toks.append({"text": " " + w, "offsets": {"from": t, "to": t + d}, "p": 0.9})
+            words.append(w)
+            t += d
+        seg = {"offsets": {"from": toks[0]["offsets"]["from"], "to": t},
+               "text": " " + " ".join(words), "tokens": toks}
+        f.write(("," if s else "") + json.dumps(seg))
+    f.write("]}\n")
+
+
+def _peak(fn) -> tuple[object, float, int]:
+    import tracemalloc
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - t0
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def bench(n_words: int, queries: int = 100_000) -> list[tuple[str, str]]:
+    """(name, result) rows for a synthetic n_words transcript with token timings.
+
+    Loads are timed under tracemalloc (slower than normal runs, the same for both loaders).
+    """
+    rows = []
+    with tempfile.TemporaryDirectory(prefix="dragtranscribe-bench-") as d:
+        src = os.path.join(d, "bench.json")
+        with open(src, "w", encoding="utf-8") as f:
+            _synthetic_json(f, n_words)
+        rows.append(("whisper JSON", f"{os.path.getsize(src) / 1e6:.0f} MB, {n_words:,} words"))
+
+        t, secs, peak = _peak(lambda: Transcript.load(src))
+        rows.append(("load -> columnar", f"{secs:.2f}s, peak {peak / 1e6:.0f} MB, "
+                                         f"resident {t.nbytes() / 1e6:.0f} MB"))
+
+        def naive():
+            with open(src, encoding="utf-8") as f:
+                data = json.load(f)
+            return [{"start": s["offsets"]["from"], "end": s["offsets"]["to"], "text": s["text"],
+                     "words": [{"start": w[0], "end": w[1], "text": w[2]} for w in json_words(s)]}
+                    for s in data["transcription"]]
+        _, secs, peak = _peak(naive)
+        rows.append(("json.load -> dicts", f"{secs:.2f}s, peak {peak / 1e6:.0f} MB"))
+
+        srt = os.path.join(d, "bench.srt")
+        t0 = time.perf_counter()
+        t.save(srt)
+        rows.append(("write SRT", f"{time.perf_counter() - t0:.2f}s, {len(t):,} cues"))
+        t0 = time.perf_counter()
+        with open(srt, encoding="utf-8") as f:
+            n = sum(1 for _ in read_cues(f))
+        rows.append(("stream-parse SRT", f"{time.perf_counter() - t0:.2f}s, {n:,} cues"))
+
+        rng = random.Random(2)
+        end = t.words.ends[-1] if len(t.words) else 0
+        spans = [(s, s + 5000) for s in (rng.randrange(max(end, 1)) for _ in range(queries))]
+        t0 = time.perf_counter()
+        hits = sum(len(t.words.overlapping(a, b)) for a, b in spans)
+        us = (time.perf_counter() - t0) / queries * 1e6
+        rows.append(("5 s range lookup (words)", f"{us:.1f} us/query, {hits / queries:.1f} hits/query"))
+    return rows
+
+
+# ---------- CLI ----------
+
+def _cmd_convert(args) -> int:
+    tmp = f"{args.output}.tmp.{os.getpid()}"
+    try:
+        with open(args.source, encoding="utf-8", errors="replace") as f, \
+                open(tmp, "w", encoding="utf-8") as out:
+            cues = (c for c in map(json_cue, read_whisper_json(f)) if c) if args.source.endswith(".json") \
+                else read_cues(f)
+            n = (write_vtt if args.output.endswith(".vtt") else write_srt)(out, cues)
+        os.replace(tmp, args.output)
+    except (OSError, ValueError) as e:
+        print(f"Error: convert failed: {e}", file=sys.stderr)
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        return 1
+    print(f"{n} cue(s) -> {args.output}", file=sys.stderr)
+    return 0
+
+
+def _cmd_bench(args) -> int:
+    for name, result in bench(args.words, args.queries):
+        print(f"{name:<26} {result}")
+    return 0
+
+
+def register(sub) -> None:
+    p = sub.add_parser("transcript", help="convert transcripts (streaming) and benchmark the transcript model")
+    tsub = p.add_subparsers(dest="transcript_command", required=True)
+    c = tsub.add_parser("convert", help="SRT/VTT/whisper JSON -> SRT or VTT (by the output extension)")
+    c.add_argument("source")
+    c.add_argument("output")
+    c.set_defaults(func=_cmd_convert)
+    b = tsub.add_parser("bench", help="load/write/parse/lookup timings and memory on a synthetic transcript")
+    b.add_argument("--words", type=int, default=1_000_000)
+    b.add_argument("--queries", type=int, default=100_000)
+    b.set_defaults(func=_cmd_bench)
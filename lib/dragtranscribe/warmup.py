@@ -0,0 +1,235 @@
+# warmup.py — pull the Whisper model into the page cache ahead of the first job
+#
+# A cold read of ggml-large-v2.bin (~3 GB, worse on NAS-hosted installs) is paid by the
+# first job after boot. The warm-up service streams the file through the page cache at low
+# I/O priority — readahead hints (posix_fadvise WILLNEED where available) plus sequential
+# reads of only the windows mincore() reports as missing — then keeps checking residency
+# and re-warms once memory pressure has evicted part of it.
+import ctypes
+import ctypes.util
+import mmap
+import os
+import sys
+import threading
+import time
+from collections.abc import Callable
+
+from . import events, models
+
+WINDOW = 8 * 1024 * 1024
+DEFAULT_INTERVAL = 60.0
+DEFAULT_THRESHOLD = 0.90
+
+
+# ---------- Platform helpers ----------
+
+def _load_libc():
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        libc.mmap.restype = ctypes.c_void_p
+        libc.mmap.argtypes = [ctypes.c_void_p, ctypes.c_size_t, ctypes.c_int, ctypes.c_int,
+                              ctypes.c_int, ctypes.c_int64]
+        libc.munmap.argtypes = [ctypes.c_void_p, ctypes.c_size_t]
+        libc.mincore.argtypes = [ctypes.c_void_p, ctypes.c_size_t, ctypes.c_void_p]
+        return libc
+    except (OSError, AttributeError):
+        return None
+
+
+_libc = _load_libc()
+_MAP_FAILED = ctypes.c_void_p(-1).value
+_INCORE = bytes((b & 1) for b in range(256))
+
+
+def lower_io_priority() -> None:
+    """Best effort: make the calling thread's disk reads yield to foreground work."""
+    if sys.platform == "darwin" and _libc is not None:
+        try:
+            # setiopolicy_np(IOPOL_TYPE_DISK, IOPOL_SCOPE_THREAD, IOPOL_THROTTLE)
+            _libc.setiopolicy_np(0, 1, 3)
+        except AttributeError:
+            pass
+    elif hasattr(os, "setpriority") and hasattr(threading, "get_native_id"):
+        # On Linux nice applies per thread, and the I/O schedulers derive best-effort
+        # I/O priority from it when none is set explicitly.
+        try:
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 19)
+        except OSError:
+            pass
+
+
+def resident_pages(fd: int, size: int) -> bytes | None:
+    """One byte per page (1 = in page cache), or None where mincore() is unavailable."""
+    if _libc is None or size <= 0:
+        return None
+    addr = _libc.mmap(None, size, mmap.PROT_READ, mmap.MAP_SHARED, fd, 0)
+    if addr in (None, _MAP_FAILED):
+        return None
+    try:
+        npages = (size + mmap.PAGESIZE - 1) // mmap.PAGESIZE
+        vec = (ctypes.c_ubyte * npages)()
+        if _libc.mincore(addr, size, vec) != 0:
+            return None
+        return bytes(vec).translate(_INCORE)
+    finally:
+        _libc.munmap(addr, size)
+
+
+def residency(path: str) -> dict:
+    """{"total", "resident", "fraction"} for path; resident/fraction are None if unknown."""
+    size = os.path.getsize(path)
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        pages = resident_pages(fd, size)
+    finally:
+        os.close(fd)
+    if pages is None:
+        return {"total": size, "resident": None, "fraction": None}
+    resident = min(size, pages.count(1) * mmap.PAGESIZE)
+    return {"total": size, "resident": resident, "fraction": resident / size if size else 1.0}
+
+
+def warm(path: str, stop: threading.Event | None = None, max_bytes_per_s: float | None = None) -> int:
+    """Read the non-resident parts of path into the page cache; returns bytes read."""
+    size = os.path.getsize(path)
+    fd = os.open(path, os.O_RDONLY)
+    read = 0
+    try:
+        pages = resident_pages(fd, size)
+        per_window = WINDOW // mmap.PAGESIZE
+        buf = bytearray(WINDOW)
+        t0 = time.monotonic()
+        for i, off in enumerate(range(0, size, WINDOW)):
+            if stop is not None and stop.is_set():
+                break
+            if pages is not None and 0 not in pages[i * per_window:(i + 1) * per_window]:
+                continue
+            length = min(WINDOW, size - off)
+            if hasattr(os, "posix_fadvise"):
+                os.posix_fadvise(fd, off, length, os.POSIX_FADV_WILLNEED)
+            if hasattr(os, "preadv"):
+                n = os.preadv(fd, [memoryview(buf)[:length]], off)
+            else:
+                n = len(os.pread(fd, length, off))
+            read += n
+            if max_bytes_per_s:
+                ahead = read / max_bytes_per_s - (time.monotonic() - t0)
+                if ahead > 0:
+                    time.sleep(ahead)
+    finally:
+        os.close(fd)
+    return read
+
+
+# ---------- Service ----------
+
+class WarmupService:
+    """Background thread: warm the model once it exists, then re-warm whenever its resident
+    fraction drops below threshold. on_status(dict) gets the residency after each pass.
+    """
+
+    def __init__(self, path: str, *, interval: float = DEFAULT_INTERVAL,
+                 threshold: float = DEFAULT_THRESHOLD, max_bytes_per_s: float | None = None,
+                 on_status: Callable[[dict], None] | None = None):
+        self.path = path
+        self.interval = interval
+        self.threshold = threshold
+        self.max_bytes_per_s = max_bytes_per_s
+        self.on_status = on_status
+        self.stop_event = threading.Event()
+        self.thread: threading.Thread | None = None
+        self.last_status: dict | None = None
+
+    def start(self) -> "WarmupService":
+        self.thread = threading.Thread(target=self._loop, name="model-warmup", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.stop_event.set()
+
+    def run_once(self) -> dict | None:
+        if not os.path.isfile(self.path):
+            return None
+        status = residency(self.path)
+        unknown = status["fraction"] is None
+        # Without mincore() eviction can't be observed, so only the first pass warms.
+        if (unknown and self.last_status is None) or (not unknown and status["fraction"] < self.threshold):
+            t0 = time.monotonic()
+            nread = warm(self.path, self.stop_event, self.max_bytes_per_s)
+            status = residency(self.path)
+            status.update(warmed_bytes=nread, duration_ms=int((time.monotonic() - t0) * 1000))
+        status["path"] = self.path
+        self.last_status = status
+        events.emit("model_residency", **status)
+        if self.on_status is not None:
+            self.on_status(status)
+        return status
+
+    def _loop(self):
+        lower_io_priority()
+        while not self.stop_event.is_set():
+            try:
+                self.run_once()
+            except OSError:
+                pass
+            self.stop_event.wait(self.interval)
+
+
+# ---------- CLI ----------
+
+def _describe(st: dict) -> str:
+    if st.get("fraction") is None:
+        return f"{st['path']}: residency unknown on this platform"
+    line = f"{st['path']}: {100 * st['fraction']:.1f}% resident ({st['resident'] / 1e9:.2f} of {st['total'] / 1e9:.2f} GB)"
+    if st.get("warmed_bytes"):
+        line += f", warmed {st['warmed_bytes'] / 1e9:.2f} GB in {st['duration_ms'] / 1000:.1f}s"
+    return line
+
+
+def _cmd_warmup(args) -> int:
+    if args.status:
+        if not os.path.isfile(args.model):
+            print(f"Error: model not found: {args.model}", file=sys.stderr)
+            return 1
+        print(_describe({**residency(args.model), "path": args.model}))
+        return 0
+    seen = {"first": True}
+
+    def on_status(st):
+        # In --watch mode only report the first check and passes that actually re-warmed.
+        if seen["first"] or "warmed_bytes" in st:
+            print(_describe(st), flush=True)
+        seen["first"] = False
+
+    svc = WarmupService(args.model, interval=args.interval, threshold=args.threshold,
+                        max_bytes_per_s=args.max_mb_s * 1e6 if args.max_mb_s else None,
+                        on_status=on_status)
+    if not args.watch:
+        lower_io_priority()
+        if svc.run_once() is None:
+            print(f"Error: model not found: {args.model}", file=sys.stderr)
+            return 1
+        return 0
+    svc.start()
+    try:
+        while svc.thread.is_alive():
+            svc.thread.join(1.0)
+    except KeyboardInterrupt:
+        svc.stop()
+    return 0
+
+
+def default_model_path() -> str:
+    return os.environ.get("MODEL_LARGE_V2") or models.path_for(models.REGISTRY[models.DEFAULT_MODEL])
+
+
+def register(sub) -> None:
+    p = sub.add_parser("warmup", help="load the model into the page cache (optionally keep it warm)")
+    p.add_argument("--model", default=default_model_path())
+    p.add_argument("--status", action="store_true", help="only report how much of the model is resident")
+    p.add_argument("--watch", action="store_true", help="keep running; re-warm after memory pressure")
+    p.add_argument("--interval", type=float, default=DEFAULT_INTERVAL, help="seconds between residency checks")
+    p.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="re-warm below this resident fraction")
+    p.add_argument("--max-mb-s", type=float, default=None, help="cap the warm-up read rate")
+    p.set_defaults(func=_cmd_warmup)